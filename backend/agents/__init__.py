@@ -2,7 +2,7 @@
 Agent modules for the multi-agent system.
 """
 from .catalog_agent import catalog_agent
-from .support_agent import support_agent
+from .support_agent import support_agent, asupport_agent
 from .pricing_agent import pricing_agent
 
-__all__ = ["catalog_agent", "support_agent", "pricing_agent"]
+__all__ = ["catalog_agent", "support_agent", "asupport_agent", "pricing_agent"]
@@ -1,11 +1,22 @@
 """
 Catalog Agent: Normalizes product data and detects issues.
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
-from llm_config import get_llm
+from llm_config import describe_model, get_chain, get_llm
+from llm_cache import describe_prompt, with_llm_cache
+from catalog_store import FINGERPRINT_FIELDS, fingerprint, get_catalog_store, normalizer_key, product_key
+from batching import chunk_by_token_budget, get_bool_env, get_int_env, get_max_concurrency, run_batches
+from dedup import group_duplicates, with_coalescing
+from agents.duplicate_index import detect_duplicates
+from prompt_packing import (
+    get_batch_token_budget, get_token_counter, pack_records, prompt_overhead_tokens, serialize_record
+)
+from logger import get_logger
+
+
+logger = get_logger(__name__)
 
 
 class CatalogAnalysis(BaseModel):
@@ -15,30 +26,8 @@ class CatalogAnalysis(BaseModel):
     confidence_score: float = Field(description="Overall confidence 0-1")
 
 
-def catalog_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Analyzes and normalizes product catalog data.
-    Detects missing attributes, duplicates, and inconsistencies.
-    """
-    print("\n--- 📦 Catalog Agent: Normalizing Product Data ---")
-    
-    products = state.get("product_data", [])
-    
-    if not products:
-        return {
-            "normalized_catalog": [],
-            "catalog_issues": [{"type": "error", "message": "No product data provided"}],
-            "schema_validation_passed": False
-        }
-    
-    # Initialize LLM (supports both OpenAI and Azure)
-    # Note: temperature will be auto-adjusted for GPT-5
-    # For Azure, model parameter is ignored (uses deployment name from env)
-    llm = get_llm(temperature=0)
-    
-    # Create prompt
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a product catalog normalization expert.
+CATALOG_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a product catalog normalization expert.
 Analyze the product data and:
 1. Normalize attributes (fix spelling, standardize units)
 2. Detect missing or inconsistent information
@@ -63,38 +52,256 @@ CRITICAL: Each issue MUST have:
 - suggestion: (optional) How to fix it
 
 Return ONLY valid JSON, no other text."""),
-        ("user", "Products to analyze:\n{products}")
-    ])
+    ("user", "Products to analyze:\n{products}")
+])
+
+
+def catalog_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analyzes and normalizes product catalog data.
+    Detects missing attributes, duplicates, and inconsistencies.
+    
+    Only products that are new or whose raw row changed since the last run
+    are sent to the LLM; the rest are reused from the catalog store. Products
+    with identical content under different IDs are sent once and the result
+    is copied to each of them. Near-duplicates across the whole catalog are
+    reported as "duplicate" issues by a local similarity index.
+    """
+    logger.info("--- 📦 Catalog Agent: Normalizing Product Data ---")
+    
+    products = state.get("product_data", [])
+    
+    if not products:
+        return {
+            "normalized_catalog": [],
+            "catalog_issues": [{"type": "error", "message": "No product data provided"}],
+            "schema_validation_passed": False
+        }
     
-    # Create chain
-    parser = JsonOutputParser(pydantic_object=CatalogAnalysis)
-    chain = prompt | llm | parser
+    merchant_id = str(state.get("merchant_id", "unknown"))
+    keys = [product_key(p) for p in products]
+    # A new prompt or model invalidates every stored result
+    normalizer = normalizer_key(describe_prompt(CATALOG_PROMPT), describe_model())
+    fingerprints = [fingerprint(p, normalizer) for p in products]
     
-    try:
-        # Run analysis
-        result = chain.invoke({"products": str(products[:5])})  # Limit for token efficiency
+    # Reuse stored results for products whose raw row and normalizer have not changed
+    store = get_catalog_store()
+    stored = store.load(merchant_id, [k for k in keys if k is not None]) if store else {}
+    
+    outputs: Dict[int, Tuple[List[Dict], List[Dict], float]] = {}
+    pending = []
+    for position, (key, fp) in enumerate(zip(keys, fingerprints)):
+        entry = stored.get(key) if key is not None else None
+        if entry and entry["fingerprint"] == fp:
+            outputs[position] = (entry["normalized"], entry["issues"], entry["confidence"])
+        else:
+            pending.append(position)
+    
+    logger.info("Reusing %d unchanged products, %d new or changed", len(outputs), len(pending))
+    
+    # Representative position -> positions of products with the same content
+    duplicates: Dict[int, List[int]] = {}
+    if pending and get_bool_env("INPUT_DEDUP_ENABLED", True):
+        pending, duplicates = group_duplicates(products, pending, FINGERPRINT_FIELDS)
+        if duplicates:
+            logger.info("Collapsed %d duplicate products into their first occurrence",
+                        sum(len(d) for d in duplicates.values()))
+    
+    extras: List[Tuple[int, List[Dict], List[Dict]]] = []
+    failed_batches = 0
+    failed_positions = set()
+    
+    if pending:
+        # Initialize LLM (supports both OpenAI and Azure)
+        # Note: temperature will be auto-adjusted for GPT-5
+        # For Azure, model parameter is ignored (uses deployment name from env)
+        llm = get_llm(temperature=0)
         
-        normalized = result.get("normalized_products", [])
-        issues = result.get("issues", [])
-        confidence = result.get("confidence_score", 0.8)
+        # Shared chain (built once per LLM client)
+        chain = get_chain(CATALOG_PROMPT, llm, CatalogAnalysis)
         
-        # Determine if schema validation passed
-        schema_passed = confidence > 0.6 and len([i for i in issues if i.get("type") == "critical"]) == 0
+        # Serve unchanged inputs from the persistent response cache
+        chain = with_llm_cache(chain, CATALOG_PROMPT, llm)
         
-        print(f"✓ Normalized {len(normalized)} products")
-        print(f"✓ Found {len(issues)} issues")
-        print(f"✓ Confidence: {confidence:.2f}")
+        # Identical batches in flight (e.g. from another merchant) share one call
+        chain = with_coalescing(chain, CATALOG_PROMPT, llm)
         
-        return {
-            "normalized_catalog": normalized,
-            "catalog_issues": issues,
-            "schema_validation_passed": schema_passed
-        }
+        # Split the new/changed products into token-budgeted batches
+        # (compact JSON lines, counted with the model tokenizer)
+        batches = chunk_by_token_budget(
+            [products[i] for i in pending],
+            max_tokens=get_batch_token_budget(
+                "CATALOG_BATCH_TOKENS", 3000, prompt_overhead_tokens(CATALOG_PROMPT)
+            ),
+            serialize=serialize_record,
+            max_items=get_int_env("CATALOG_BATCH_MAX_ITEMS", 25) or None,
+            count_tokens=get_token_counter()
+        )
+        max_concurrency = get_max_concurrency()
+        logger.info("Normalizing %d products in %d batches (max %d in flight)",
+                    len(pending), len(batches), max_concurrency)
         
-    except Exception as e:
-        print(f"✗ Catalog Agent Error: {e}")
-        return {
-            "normalized_catalog": products,  # Fallback to raw data
-            "catalog_issues": [{"type": "error", "message": str(e)}],
-            "schema_validation_passed": False
-        }
+        results = run_batches(
+            chain,
+            [{"products": pack_records(batch)} for batch in batches],
+            max_concurrency=max_concurrency
+        )
+        
+        to_save = []
+        offset = 0
+        for batch, result in zip(batches, results):
+            positions = pending[offset:offset + len(batch)]
+            offset += len(batch)
+            
+            if isinstance(result, Exception) or not isinstance(result, dict):
+                failed_batches += 1
+                error = result if isinstance(result, Exception) else ValueError(f"Expected dict, got {type(result)}")
+                logger.error("✗ Catalog Agent Error: %s", error)
+                failed_positions.update(positions)
+                for position in positions:
+                    raw = products[position]
+                    # Fallback to raw data (RecordTable views are copied so state stays serializable)
+                    outputs[position] = ([raw if isinstance(raw, dict) else dict(raw)], [], 0.0)
+                extras.append((positions[0], [], [{"type": "error", "message": str(error)}]))
+                continue
+            
+            attributed, leftover_products, leftover_issues = attribute_batch_result(
+                result, positions, keys
+            )
+            confidence = float(result.get("confidence_score", 0.8))
+            for position in positions:
+                normalized, issues = attributed[position]
+                outputs[position] = (normalized, issues, confidence)
+                # Only products the LLM returned a row for are safe to reuse
+                if normalized and keys[position] is not None:
+                    to_save.append((keys[position], fingerprints[position], normalized, issues, confidence))
+            if leftover_products or leftover_issues:
+                extras.append((positions[0], leftover_products, leftover_issues))
+        
+        for representative, copies in duplicates.items():
+            normalized, issues, confidence = outputs[representative]
+            for position in copies:
+                raw = products[position]
+                if representative in failed_positions:
+                    outputs[position] = ([raw if isinstance(raw, dict) else dict(raw)], [], 0.0)
+                    continue
+                normalized_copy = relabel_rows(normalized, raw)
+                issues_copy = relabel_rows(issues, raw)
+                outputs[position] = (normalized_copy, issues_copy, confidence)
+                if normalized_copy and keys[position] is not None:
+                    to_save.append((keys[position], fingerprints[position], normalized_copy, issues_copy, confidence))
+        
+        if store:
+            store.save(merchant_id, to_save)
+    
+    # Near-duplicates across the whole catalog; each LLM batch only sees its own products
+    duplicate_issues = detect_duplicates(products, keys)
+    if duplicate_issues:
+        logger.info("Flagged %d near-duplicate products", len(duplicate_issues))
+    for position, issue in duplicate_issues:
+        extras.append((position, [], [issue]))
+    
+    return assemble_catalog_update(len(products), outputs, extras, failed_batches)
+
+
+def relabel_rows(rows: List[Dict[str, Any]], product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Copy a duplicate's normalized rows or issues over to another product's ID."""
+    pid = product.get("product_id", product.get("id"))
+    if not isinstance(pid, (int, str)):
+        # numpy scalars from columnar rows
+        pid = str(pid)
+    relabeled = []
+    for row in rows:
+        row = dict(row)
+        for field in ("product_id", "id"):
+            if field in row:
+                row[field] = str(pid) if isinstance(row[field], str) else pid
+        relabeled.append(row)
+    return relabeled
+
+
+def attribute_batch_result(
+    result: Dict[str, Any],
+    positions: List[int],
+    keys: List[Optional[str]]
+) -> Tuple[Dict[int, Tuple[List[Dict], List[Dict]]], List[Dict], List[Dict]]:
+    """
+    Assign a batch's normalized rows and issues back to the products they describe.
+    Rows and issues that cannot be matched to a product ID in the batch are
+    returned separately so they are still reported for this run.
+    """
+    attributed = {position: ([], []) for position in positions}
+    by_key = {}
+    for position in positions:
+        if keys[position] is not None:
+            by_key.setdefault(keys[position], position)
+    
+    leftover_products = []
+    for row in result.get("normalized_products", []):
+        position = by_key.get(product_key(row))
+        if position is None:
+            leftover_products.append(row)
+        else:
+            attributed[position][0].append(row)
+    
+    leftover_issues = []
+    for issue in result.get("issues", []):
+        pid = issue.get("product_id")
+        position = by_key.get(str(pid)) if pid is not None else None
+        if position is None:
+            leftover_issues.append(issue)
+        else:
+            attributed[position][1].append(issue)
+    
+    return attributed, leftover_products, leftover_issues
+
+
+def assemble_catalog_update(
+    total: int,
+    outputs: Dict[int, Tuple[List[Dict], List[Dict], float]],
+    extras: List[Tuple[int, List[Dict], List[Dict]]],
+    failed_batches: int
+) -> Dict[str, Any]:
+    """
+    Merge per-product results back into a single state update in input order.
+    A failed batch falls back to its raw rows and contributes an error issue
+    instead of failing the whole run.
+    """
+    extras_at: Dict[int, List[Tuple[List[Dict], List[Dict]]]] = {}
+    for position, extra_products, extra_issues in extras:
+        extras_at.setdefault(position, []).append((extra_products, extra_issues))
+    
+    normalized = []
+    issues = []
+    confidence_sum = 0.0
+    
+    for position in range(total):
+        product_rows, product_issues, product_confidence = outputs[position]
+        normalized.extend(product_rows)
+        issues.extend(product_issues)
+        confidence_sum += product_confidence
+        for extra_products, extra_issues in extras_at.get(position, []):
+            normalized.extend(extra_products)
+            issues.extend(extra_issues)
+    
+    # Weight each product equally; products from failed batches count as zero confidence
+    confidence = confidence_sum / total if total else 0.0
+    
+    # Determine if schema validation passed
+    schema_passed = (
+        failed_batches == 0
+        and confidence > 0.6
+        and len([i for i in issues if i.get("type") == "critical"]) == 0
+    )
+    
+    logger.info("✓ Normalized %d products", len(normalized))
+    logger.info("✓ Found %d issues", len(issues))
+    logger.info("✓ Confidence: %.2f", confidence)
+    if failed_batches:
+        logger.error("✗ %d batches failed", failed_batches)
+    
+    return {
+        "normalized_catalog": normalized,
+        "catalog_issues": issues,
+        "schema_validation_passed": schema_passed
+    }
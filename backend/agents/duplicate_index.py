@@ -0,0 +1,244 @@
+"""
+Duplicate Index: Near-duplicate product detection across the whole catalog.
+The Catalog Agent LLM only sees one batch of products at a time, so listings
+duplicated across batches are never compared. This index hashes every
+product's title, attributes and description into a MinHash signature and
+buckets the signatures with LSH banding, so similar products meet in a bucket
+without comparing every pair (near-linear in the catalog size).
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from batching import get_bool_env, get_float_env, get_int_env
+from columnar import column_values
+
+
+DUPLICATE_FIELDS = ("title", "attributes", "description")
+
+# Byte n-grams; short enough to survive typos and word reordering
+SHINGLE_SIZE = 3
+
+# Products are hashed in chunks to bound the shingle arrays held in memory
+CHUNK_PRODUCTS = 50_000
+
+# Added per bin of distance when an empty bin borrows a neighbour's value
+DENSIFY_OFFSET = 0x9E3779B1
+
+# Joins product texts so a whole chunk is normalized in one pass
+_RECORD_SEPARATOR = "\x1e"
+_SEPARATOR_BYTE = ord(_RECORD_SEPARATOR)
+_SPACE = ord(" ")
+
+# Byte -> normalized byte: ASCII letters and digits are kept, other ASCII
+# becomes a space, UTF-8 bytes of non-ASCII characters are kept as they are
+_BYTE_MAP = np.full(256, _SPACE, dtype=np.uint8)
+for _byte in b"abcdefghijklmnopqrstuvwxyz0123456789":
+    _BYTE_MAP[_byte] = _byte
+_BYTE_MAP[0x80:] = np.arange(0x80, 0x100, dtype=np.uint8)
+_BYTE_MAP[_SEPARATOR_BYTE] = _SEPARATOR_BYTE
+
+
+def product_texts(products: Sequence, fields: Sequence[str] = DUPLICATE_FIELDS) -> List[str]:
+    """Text each product is compared on: its string fields joined by spaces."""
+    columns = [column_values(products, field) for field in fields]
+    return [" ".join(value for value in values if isinstance(value, str)) for values in zip(*columns)]
+
+
+def encode_texts(texts: Sequence[str], max_bytes: int = 500) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Normalized UTF-8 bytes of all texts back to back, and each text's length.
+    Texts are case-folded, ASCII punctuation becomes a single space, and each
+    text is cut to max_bytes.
+    """
+    joined = _RECORD_SEPARATOR.join(text.replace(_RECORD_SEPARATOR, " ") for text in texts)
+    data = _BYTE_MAP[np.frombuffer(joined.casefold().encode("utf-8"), dtype=np.uint8)]
+
+    # Collapse runs of spaces into one and drop the ones at the start of a text ...
+    blank = (data == _SPACE) | (data == _SEPARATOR_BYTE)
+    data = data[(data != _SPACE) | ~np.r_[True, blank[:-1]]]
+    # ... and the one left at the end of a text
+    ends_text = np.r_[data[1:] == _SEPARATOR_BYTE, True]
+    data = data[(data != _SPACE) | ~ends_text]
+
+    separators = data == _SEPARATOR_BYTE
+    owner = np.cumsum(separators)
+    starts = np.r_[0, np.flatnonzero(separators) + 1]
+    keep = ~separators & (np.arange(len(data)) - starts[owner] < max_bytes)
+    return data[keep], np.bincount(owner[keep], minlength=len(texts))
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """64-bit finalizer (splitmix64) so nearby shingle codes hash far apart."""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def _shingles(data: np.ndarray, lengths: np.ndarray, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed byte n-grams of every text and the index of the text each belongs
+    to (non-decreasing). Texts shorter than SHINGLE_SIZE have none.
+    """
+    ends = np.cumsum(lengths)
+    # A shingle may start anywhere except in the last SHINGLE_SIZE - 1 bytes of its text
+    valid = np.ones(len(data), dtype=bool)
+    for back in range(1, SHINGLE_SIZE):
+        valid[ends[lengths >= back] - back] = False
+    count = max(len(data) - SHINGLE_SIZE + 1, 0)
+    codes = np.full(count, seed, dtype=np.uint64)
+    wide = data.astype(np.uint64)
+    for shift in range(SHINGLE_SIZE):
+        codes = (codes << np.uint64(8)) | wide[shift:shift + count]
+    owner = np.repeat(np.arange(len(lengths)), lengths)
+    return _mix(codes[valid[:count]]), owner[valid]
+
+
+def minhash_signatures(
+    texts: Sequence[str],
+    num_perm: int = 64,
+    seed: int = 1,
+    max_bytes: int = 500
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    MinHash signature (num_perm uint32 values) of each text's shingle set and
+    a mask of the texts that had any shingles. The fraction of equal values
+    between two signatures estimates the Jaccard similarity of the sets.
+
+    Uses one-permutation hashing: each shingle is hashed once and the hash
+    picks one of num_perm bins, which keeps its minimum. Bins a short text
+    left empty borrow the next filled bin's value (rotation densification),
+    so the cost is one hash per shingle instead of num_perm.
+    """
+    empty = np.uint64(1 << 32)
+    signatures = np.zeros((len(texts), num_perm), dtype=np.uint32)
+    present = np.zeros(len(texts), dtype=bool)
+    columns = np.arange(num_perm)
+
+    for chunk_start in range(0, len(texts), CHUNK_PRODUCTS):
+        chunk = texts[chunk_start:chunk_start + CHUNK_PRODUCTS]
+        hashes, owner = _shingles(*encode_texts(chunk, max_bytes), seed)
+        bins = owner * num_perm + ((hashes >> np.uint64(32)) % np.uint64(num_perm)).astype(np.int64)
+        mins = np.full(len(chunk) * num_perm, empty, dtype=np.uint64)
+        np.minimum.at(mins, bins, hashes & np.uint64(0xFFFFFFFF))
+        mins = mins.reshape(len(chunk), num_perm)
+
+        filled = mins != empty
+        rows = filled.any(axis=1)
+        present[chunk_start:chunk_start + len(chunk)] = rows
+        # Index of the next filled bin at or after each bin, wrapping around
+        doubled = np.where(np.concatenate([filled, filled], axis=1), np.arange(2 * num_perm), 2 * num_perm)
+        following = np.minimum.accumulate(doubled[:, ::-1], axis=1)[:, ::-1][:, :num_perm]
+        following = np.minimum(following, 2 * num_perm - 1)
+        borrowed = np.take_along_axis(np.concatenate([mins, mins], axis=1), following, axis=1)
+        # Offset by the distance so a borrowed value differs from its source bin
+        densified = borrowed + np.uint64(DENSIFY_OFFSET) * (following - columns).astype(np.uint64)
+        signatures[chunk_start:chunk_start + len(chunk)] = np.where(rows[:, None], densified, 0).astype(np.uint32)
+    return signatures, present
+
+
+def lsh_candidate_pairs(signatures: np.ndarray, rows: np.ndarray, bands: int) -> np.ndarray:
+    """
+    Pairs (i, j), i < j, of the given signature rows that share a bucket in
+    at least one LSH band. Members of a bucket are paired with their
+    neighbour in the bucket only, so a large bucket costs linear work; the
+    neighbour chains still connect the whole bucket.
+    """
+    width = signatures.shape[1] // bands
+    weights = np.random.default_rng(0).integers(1, 1 << 63, size=width, dtype=np.uint64) | np.uint64(1)
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    for band in range(bands):
+        values = signatures[rows, band * width:(band + 1) * width].astype(np.uint64)
+        keys = _mix((values * weights).sum(axis=1) + np.uint64(band))
+        order = np.argsort(keys, kind="stable")
+        same = keys[order[1:]] == keys[order[:-1]]
+        pairs.append(np.stack([rows[order[:-1][same]], rows[order[1:][same]]], axis=1))
+    pairs = np.concatenate(pairs)
+    pairs.sort(axis=1)
+    # The same pair often shares several bands; dedupe on one int64 key per pair
+    count = len(signatures)
+    unique = np.unique(pairs[:, 0] * count + pairs[:, 1])
+    return np.stack([unique // count, unique % count], axis=1)
+
+
+def estimated_similarity(signatures: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+    """Estimated Jaccard similarity of each pair of signature rows."""
+    if not len(pairs):
+        return np.empty(0)
+    return (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+
+
+def _connected_groups(count: int, pairs: np.ndarray) -> List[List[int]]:
+    """Groups of two or more indices connected by pairs (union-find)."""
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The earlier product stays the root, so it becomes the canonical listing
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in np.unique(pairs).tolist():
+        groups.setdefault(find(i), []).append(i)
+    return sorted(groups.values())
+
+
+def find_duplicate_clusters(
+    products: Sequence,
+    threshold: Optional[float] = None,
+    num_perm: Optional[int] = None,
+    bands: Optional[int] = None
+) -> Tuple[List[List[int]], np.ndarray]:
+    """
+    Positions of near-duplicate products grouped into clusters (each sorted,
+    first position = canonical listing) and the MinHash signatures used.
+
+    Environment Variables:
+    - DUPLICATE_SIMILARITY: Estimated Jaccard similarity that counts as a duplicate (default: 0.7)
+    - DUPLICATE_MINHASH_PERMUTATIONS: Signature length (default: 64)
+    - DUPLICATE_LSH_BANDS: LSH bands; more bands find less similar pairs (default: 16)
+    - DUPLICATE_TEXT_MAX_BYTES: Bytes of each product's normalized text compared (default: 500)
+    """
+    if threshold is None:
+        threshold = get_float_env("DUPLICATE_SIMILARITY", 0.7)
+    num_perm = num_perm or get_int_env("DUPLICATE_MINHASH_PERMUTATIONS", 64)
+    bands = max(1, min(bands or get_int_env("DUPLICATE_LSH_BANDS", 16), num_perm))
+
+    texts = product_texts(products)
+    signatures, present = minhash_signatures(texts, num_perm, max_bytes=get_int_env("DUPLICATE_TEXT_MAX_BYTES", 500))
+    pairs = lsh_candidate_pairs(signatures, np.flatnonzero(present), bands)
+    pairs = pairs[estimated_similarity(signatures, pairs) >= threshold]
+    return _connected_groups(len(texts), pairs), signatures
+
+
+def detect_duplicates(products: Sequence, keys: Sequence[Optional[str]]) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    One "duplicate" catalog issue per non-canonical member of each cluster,
+    paired with that product's position; keys are the products' string IDs
+    (DUPLICATE_DETECTION_ENABLED, default: true).
+    """
+    if not len(products) or not get_bool_env("DUPLICATE_DETECTION_ENABLED", True):
+        return []
+    clusters, signatures = find_duplicate_clusters(products)
+    issues = []
+    for cluster in clusters:
+        canonical = cluster[0]
+        pairs = np.array([(canonical, member) for member in cluster[1:]])
+        for member, similarity in zip(cluster[1:], estimated_similarity(signatures, pairs).tolist()):
+            issues.append((member, {
+                "type": "duplicate",
+                "product_id": keys[member],
+                "duplicate_of": keys[canonical],
+                "cluster_size": len(cluster),
+                "similarity": round(similarity, 2),
+                "message": f"Possible duplicate of product {keys[canonical]} (similarity {similarity:.2f})",
+                "suggestion": "Merge the listings or make their titles and descriptions distinct"
+            }))
+    return issues
@@ -0,0 +1,227 @@
+"""
+Message Pre-Classifier: Deterministic local tier in front of the Support Agent LLM.
+Labels obvious customer messages with a weighted lexicon of general intent
+cues so only ambiguous messages need to be sent to the model.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+import numpy as np
+from columnar import column_values
+
+
+CLASS_LABELS = ["Complaint", "Inquiry", "Suggestion", "Transactional Request"]
+
+# term -> (complaint, inquiry, suggestion, transactional, sentiment)
+LEXICON = {
+    # Complaints
+    "refund": (3.0, 0, 0, 0.5, -1.0),
+    "refunded": (2.0, 0, 0, 0.5, -0.5),
+    "broken": (2.5, 0, 0, 0, -2.0),
+    "broke": (2.5, 0, 0, 0, -2.0),
+    "damaged": (2.5, 0, 0, 0, -2.0),
+    "defective": (2.0, 0, 0, 0, -1.5),
+    "leaking": (2.5, 0, 0, 0, -2.0),
+    "ridiculous": (4.0, 0, 0, 0, -2.5),
+    "terrible": (3.0, 0, 0, 0, -2.5),
+    "worst": (3.0, 0, 0, 0, -2.5),
+    "awful": (3.0, 0, 0, 0, -2.5),
+    "scam": (3.0, 0, 0, 0, -3.0),
+    "disappointed": (2.5, 0, 0, 0, -2.0),
+    "unacceptable": (3.0, 0, 0, 0, -2.5),
+    "horrible": (3.0, 0, 0, 0, -2.5),
+    "useless": (2.5, 0, 0, 0, -2.0),
+    "faulty": (2.5, 0, 0, 0, -2.0),
+    "overcharged": (2.5, 0, 0, 0, -2.0),
+    "overpriced": (2.0, 0, 0, 0, -1.5),
+    "cheap": (2.5, 0, 0, 0, -2.0),
+    "poor": (2.0, 0, 0, 0, -1.5),
+    "bad": (2.0, 0, 0, 0, -1.5),
+    "complaint": (3.0, 0, 0, 0, -1.0),
+    "problem": (1.5, 0, 0, 0, -1.0),
+    "missing": (1.5, 0, 0, 0, -1.0),
+    "late": (1.5, 0, 0, 0, -1.0),
+    "delayed": (1.5, 0, 0, 0, -1.0),
+    "wrong": (1.5, 0, 0, 0, -1.0),
+    # Inquiries
+    "?": (0, 1.0, 0, 0, 0),
+    "how": (0, 2.5, 0, 0, 0),
+    "when": (0, 2.0, 0, 0, 0),
+    "wondering": (0, 2.5, 0, 0, 0),
+    "where": (0, 1.0, 0, 0, 0),
+    "where's": (0, 1.0, 0, 0, 0),
+    "what": (0, 1.0, 0, 0, 0),
+    "why": (0, 1.0, 0, 0, 0),
+    "which": (0, 1.0, 0, 0, 0),
+    "question": (0, 2.5, 0, 0, 0),
+    "does": (0, 1.0, 0, 0, 0),
+    "track": (0, 1.5, 0, 0.5, 0),
+    "help": (0, 0.5, 0, 0.5, 0),
+    "could": (0, 0.5, 0, 0, 0),
+    # Suggestions
+    "wish": (0, 0, 3.0, 0, 0),
+    "suggest": (0, 0, 3.0, 0, 0),
+    "suggestion": (0, 0, 3.0, 0, 0),
+    "idea": (0, 0, 2.5, 0, 0),
+    "consider": (0, 0, 2.0, 0, 0),
+    "add": (0, 0, 2.5, 0, 0),
+    "should": (0, 0, 1.0, 0, 0),
+    "more": (0, 0, 1.0, 0, 0),
+    "fyi": (0, 0, 1.0, 0, 0),
+    # Transactional requests
+    "change": (0, 0, 0, 2.5, 0),
+    "size": (0, 0, 0, 1.5, 0),
+    "exchange": (0, 0, 0, 3.0, 0),
+    "cancel": (0, 0, 0, 3.0, -0.5),
+    "return": (0, 0, 0, 2.0, 0),
+    "replace": (0, 0, 0, 2.0, 0),
+    "swap": (0, 0, 0, 2.5, 0),
+    "reschedule": (0, 0, 0, 2.5, 0),
+    "invoice": (0, 0, 0, 2.0, 0),
+    "address": (0, 0, 0, 1.5, 0),
+    # Sentiment-only terms
+    "amazing": (0, 0, 0, 0, 2.5),
+    "love": (0, 0, 0, 0, 2.5),
+    "excellent": (0, 0, 0, 0, 2.5),
+    "great": (0, 0, 0, 0, 2.0),
+    "best": (0, 0, 0, 0, 2.0),
+    "good": (0, 0, 0, 0, 1.0),
+    "perfect": (0, 0, 0, 0, 1.5),
+    "perfectly": (0, 0, 0, 0, 1.5),
+    "soft": (0, 0, 0, 0, 1.0),
+    "happy": (0, 0, 0, 0, 2.0),
+    "works": (0, 0, 0, 0, 2.0),
+    "working": (0, 0, 0, 0, 2.0),
+    "thanks": (0, 0, 0, 0, 1.0),
+    "clear": (0, 0, 0, 0, 0.5),
+}
+
+# Tokens that negate the next NEGATION_WINDOW tokens: a negated term loses its
+# class cues and flips its sentiment, and a negated positive term ("not
+# working", "don't love", "stopped working") counts as a complaint cue of the
+# same strength
+NEGATORS = {
+    "not", "no", "never", "don't", "dont", "isn't", "isnt", "doesn't", "didn't", "won't", "can't", "cannot",
+    "wasn't", "aren't", "weren't", "hasn't", "haven't", "stopped"
+}
+NEGATION_WINDOW = 2
+
+# Questions in a strongly negative message are mostly rhetorical ("Where's my
+# order?? This is ridiculous."); their inquiry score is halved
+RHETORICAL_SENTIMENT = -2.0
+
+# Minimum winning class score before a label is trusted
+MIN_CLASS_SCORE = 2.0
+
+_VOCAB = {term: i for i, term in enumerate(LEXICON)}
+_WEIGHTS = np.array(list(LEXICON.values()), dtype=np.float64)
+_TOKEN_RE = re.compile(r"[a-z0-9']+|\?+")
+
+
+@lru_cache(maxsize=4096)
+def _encode(text: str) -> Tuple[Tuple[int, ...], Tuple[float, ...]]:
+    """Map a message to lexicon indices and the sentiment sign of each hit."""
+    text = text.lower().replace("’", "'").replace("‘", "'")
+    indices = []
+    signs = []
+    negate_for = 0
+
+    for token in _TOKEN_RE.findall(text):
+        if token.startswith("?"):
+            token = "?"
+        if token in NEGATORS:
+            negate_for = NEGATION_WINDOW
+            continue
+        index = _VOCAB.get(token)
+        if index is not None:
+            indices.append(index)
+            signs.append(-1.0 if negate_for else 1.0)
+        negate_for = max(negate_for - 1, 0)
+
+    return tuple(indices), tuple(signs)
+
+
+def score_messages(texts: List[str]) -> np.ndarray:
+    """
+    Score messages against the lexicon.
+    Returns an (n, 5) array: four class scores followed by a sentiment score.
+    Identical texts are encoded once and scored with one scatter-add.
+    """
+    unique_ids: Dict[str, int] = {}
+    inverse = np.fromiter(
+        (unique_ids.setdefault(text, len(unique_ids)) for text in texts),
+        dtype=np.int64,
+        count=len(texts)
+    )
+
+    rows = []
+    cols = []
+    signs = []
+    for row, text in enumerate(unique_ids):
+        indices, token_signs = _encode(text)
+        rows.extend([row] * len(indices))
+        cols.extend(indices)
+        signs.extend(token_signs)
+
+    scores = np.zeros((len(unique_ids), _WEIGHTS.shape[1]))
+    if cols:
+        weights = _WEIGHTS[cols]
+        negated = np.asarray(signs) < 0
+        weights[negated, :4] = 0.0
+        weights[negated, 0] = np.maximum(weights[negated, 4], 0.0)
+        weights[negated, 4] *= -1.0
+        np.add.at(scores, np.asarray(rows), weights)
+        scores[scores[:, 4] <= RHETORICAL_SENTIMENT, 1] *= 0.5
+
+    return scores[inverse]
+
+
+def preclassify_messages(
+    messages: List[Dict[str, Any]],
+    min_confidence: float = 0.6
+) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """
+    Label confident messages locally.
+
+    Returns:
+        (classified, ambiguous_positions) where classified entries carry the
+        original list position, the message_classifications entry and a
+        numeric sentiment in [-1, 1]; ambiguous_positions index the messages
+        that should be forwarded to the LLM.
+    """
+    if not messages:
+        return [], []
+
+    texts = [str(text) for text in column_values(messages, "message", "")]
+    scores = score_messages(texts)
+    class_scores = scores[:, :4]
+    sentiment_scores = scores[:, 4]
+
+    ordered = np.sort(class_scores, axis=1)
+    top = ordered[:, -1]
+    runner_up = ordered[:, -2]
+    confidence = np.divide(top - runner_up, top, out=np.zeros_like(top), where=top > 0)
+    confident = (top >= MIN_CLASS_SCORE) & (confidence >= min_confidence)
+
+    labels = np.argmax(class_scores, axis=1)
+    sentiment_labels = np.where(
+        sentiment_scores >= 1.0, "positive",
+        np.where(sentiment_scores <= -1.0, "negative", "neutral")
+    )
+    sentiment_values = np.clip(sentiment_scores / 2.5, -1.0, 1.0)
+
+    classified = []
+    for position in np.flatnonzero(confident):
+        message = messages[position]
+        classified.append({
+            "position": int(position),
+            "classification": {
+                "id": str(message.get("message_id", message.get("id", position))),
+                "type": CLASS_LABELS[labels[position]],
+                "sentiment": str(sentiment_labels[position]),
+            },
+            "sentiment": float(sentiment_values[position]),
+        })
+
+    ambiguous = np.flatnonzero(~confident).tolist()
+    return classified, ambiguous
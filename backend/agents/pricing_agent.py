@@ -1,7 +1,66 @@
 """
 Pricing Agent: Generates rule-based pricing recommendations.
 """
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Optional
+import pandas as pd
+from agents.pricing_engine import as_number, price_products_vectorized
+from agents.product_sentiment import sentiment_for
+from columnar import RecordTable, column_values
+from data_loader import parse_numeric_column
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def build_pricing_index(pricing_context: List[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Index competitor prices by product ID for O(1) lookups.
+    Built once per run by the coordinator and shared with the Pricing Agent and
+    validator via state["pricing_index"].
+    IDs are compared as strings; the first row with a price for a product wins.
+    Uses competitor_price, else the midpoint of a competitor_avg_price range
+    parsed by the data loader; rows with neither are skipped.
+    """
+    index = {}
+    rows = zip(
+        column_values(pricing_context, "product_id"),
+        column_values(pricing_context, "competitor_price"),
+        column_values(pricing_context, "competitor_avg_price_mid")
+    )
+    for pid, competitor_price, range_mid in rows:
+        if pid is None:
+            continue
+        key = str(pid)
+        if key in index:
+            continue
+        price = as_number(competitor_price)
+        if price is None:
+            price = as_number(range_mid)
+        if price is not None:
+            index[key] = price
+    return index
+
+
+def parse_catalog_prices(products: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Parse text prices and costs with the data loader's numeric parser.
+    The normalized catalog is LLM output and may carry "49.99 USD" or
+    "unknown"; such rows are copied with floats (NaN when unparseable).
+    Rows that are already numeric, and RecordTables, are returned as is.
+    """
+    if isinstance(products, RecordTable):
+        return products
+    parsed = list(products)
+    for field in ("price", "cost"):
+        positions = [i for i, value in enumerate(column_values(parsed, field)) if isinstance(value, str)]
+        if not positions:
+            continue
+        values = parse_numeric_column(pd.Series([parsed[i][field] for i in positions]))["mid"].tolist()
+        for position, value in zip(positions, values):
+            parsed[position] = {**parsed[position], field: value}
+    return parsed
 
 
 def pricing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
@@ -11,32 +70,66 @@ def pricing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
     
     Hard Constraints:
     - Cannot reduce prices below cost
-    - Cannot increase prices if sentiment is negative
+    - Cannot increase prices if sentiment is negative (the product's own
+      sentiment when the Support Agent linked messages to products)
     - Must explain every decision
     """
-    print("\n--- 💰 Pricing Agent: Calculating Pricing Proposals ---")
+    logger.info("--- 💰 Pricing Agent: Calculating Pricing Proposals ---")
     
     products = state.get("normalized_catalog", state.get("product_data", []))
     pricing_context = state.get("pricing_context", [])
     sentiment = state.get("sentiment_score", 0.0)
+    product_sentiment = state.get("product_sentiment")
     
     if not products:
-        print("✗ No products to price")
+        logger.warning("✗ No products to price")
         return {"pricing_proposals": []}
     
+    # The coordinator indexes the pricing context it loads; build it for other callers
+    pricing_index = state.get("pricing_index")
+    if pricing_index is None:
+        pricing_index = build_pricing_index(pricing_context)
+    
+    # Products without a parseable price were flagged at load time; never price them from 0
+    products = parse_catalog_prices(products)
+    keep = [i for i, price in enumerate(column_values(products, "price")) if as_number(price) is not None]
+    if len(keep) < len(products):
+        logger.warning("⚠️  Skipped %d products without a parseable price", len(products) - len(keep))
+        products = products.take(keep) if isinstance(products, RecordTable) else [products[i] for i in keep]
+    
+    # PRICING_ENGINE selects the per-product loop (default) or the columnar engine
+    engine = os.getenv("PRICING_ENGINE", "loop").lower()
+    if engine == "vectorized":
+        proposals = price_products_vectorized(products, pricing_index, sentiment, product_sentiment)
+    else:
+        proposals = price_products_loop(products, pricing_index, sentiment, product_sentiment)
+    
+    logger.info("✓ Generated %d pricing proposals", len(proposals))
+    
+    return {"pricing_proposals": proposals, "pricing_index": pricing_index}
+
+
+def price_products_loop(
+    products: List[Dict[str, Any]],
+    pricing_index: Dict[str, float],
+    sentiment: float,
+    product_sentiment: Optional[Dict[str, Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Apply the pricing rule chain one product at a time.
+    With product_sentiment, each product is gated by its own score (see sentiment_for).
+    """
     proposals = []
     
     for product in products:
-        product_id = product.get("id", "unknown")
+        product_id = product.get("id", product.get("product_id", "unknown"))
         current_price = float(product.get("price", 0))
-        cost = float(product.get("cost", current_price * 0.5))
+        cost = as_number(product.get("cost"))
+        if cost is None:
+            cost = current_price * 0.5
         
         # Find competitor pricing
-        competitor_price = None
-        for ctx in pricing_context:
-            if ctx.get("product_id") == product_id:
-                competitor_price = float(ctx.get("competitor_price", 0))
-                break
+        competitor_price = pricing_index.get(str(product_id))
         
         # Rule-based pricing logic
         proposed_price = current_price
@@ -51,8 +144,9 @@ def pricing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
                 reasoning.append("Adjusted to match competitor pricing")
         
         # Signal 2: Sentiment constraint
-        signals_used.append(f"sentiment: {sentiment:.2f}")
-        if sentiment < 0:
+        product_score = sentiment_for(product_sentiment, product_id, sentiment)
+        signals_used.append(f"sentiment: {product_score:.2f}")
+        if product_score < 0:
             # Negative sentiment: cannot increase price
             if proposed_price > current_price:
                 proposed_price = current_price
@@ -93,6 +187,4 @@ def pricing_agent(state: Dict[str, Any]) -> Dict[str, Any]:
         
         proposals.append(proposal)
     
-    print(f"✓ Generated {len(proposals)} pricing proposals")
-    
-    return {"pricing_proposals": proposals}
+    return proposals
@@ -0,0 +1,139 @@
+"""
+Pricing Engine: Columnar implementation of the Pricing Agent rule chain.
+
+Applies the same rules as price_products_loop (competitor undercut,
+per-product sentiment gate, +10% margin, 1.05x cost floor, HOLD/INCREASE/DECREASE) as
+NumPy array operations over price/cost/competitor columns, and produces
+identical proposals including reasoning and signals_used.
+"""
+from typing import Dict, Any, List, Optional
+import numpy as np
+from columnar import RecordTable, column_values
+from agents.product_sentiment import sentiment_for
+
+
+REASON_COMPETITOR = "Adjusted to match competitor pricing"
+REASON_BLOCKED = "Price increase blocked due to negative sentiment"
+REASON_MARGIN = "Standard margin adjustment (+10%)"
+REASON_HOLD = "No changes recommended"
+
+
+def as_number(value: Any) -> Optional[float]:
+    """Return value as a float, or None if it is missing, NaN or not a number."""
+    if value is None:
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if number != number else number
+
+
+def price_products_vectorized(
+    products: List[Dict[str, Any]],
+    pricing_index: Dict[str, float],
+    sentiment: float,
+    product_sentiment: Optional[Dict[str, Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Apply the pricing rule chain to whole columns at once.
+    With product_sentiment, each product is gated by its own score (see sentiment_for).
+    """
+    count = len(products)
+    if count == 0:
+        return []
+
+    # --- Column extraction ---
+    # A RecordTable is read column by column without building per-row views
+    if isinstance(products, RecordTable):
+        id_column = "id" if "id" in products.columns else "product_id"
+        product_ids = column_values(products, id_column, "unknown")
+    else:
+        product_ids = [p.get("id", p.get("product_id", "unknown")) for p in products]
+    current_values = [float(price) for price in column_values(products, "price", 0)]
+    current = np.array(current_values, dtype=np.float64)
+    cost_values = [as_number(c) for c in column_values(products, "cost")]
+    cost = np.array(
+        [c if c is not None else price * 0.5 for c, price in zip(cost_values, current_values)],
+        dtype=np.float64
+    )
+
+    competitor_values = [pricing_index.get(str(pid)) for pid in product_ids]
+    has_competitor = np.fromiter((c is not None for c in competitor_values), dtype=bool, count=count)
+    competitor = np.fromiter(
+        (c if c is not None else 0.0 for c in competitor_values), dtype=np.float64, count=count
+    )
+    # Mirrors `if competitor_price:` — missing and 0.0 are falsy, NaN is truthy
+    competitor_truthy = has_competitor & (competitor != 0)
+
+    # --- Signal 1: Competitor pricing ---
+    proposed = current.copy()
+    with np.errstate(invalid="ignore"):
+        undercut = competitor_truthy & (competitor < current * 0.95)
+    proposed = np.where(undercut, np.minimum(proposed, competitor + 5), proposed)
+
+    # --- Signal 2: Sentiment constraint ---
+    if product_sentiment is None:
+        sentiments = np.full(count, sentiment, dtype=np.float64)
+    else:
+        sentiments = np.fromiter(
+            (sentiment_for(product_sentiment, pid, sentiment) for pid in product_ids), dtype=np.float64, count=count
+        )
+    negative = sentiments < 0
+    blocked = negative & (proposed > current)
+    proposed = np.where(blocked, current, proposed)
+    with np.errstate(invalid="ignore"):
+        margin = ~negative & (~competitor_truthy | (competitor > current))
+    proposed = np.where(margin, np.minimum(proposed * 1.10, current * 1.10), proposed)
+
+    # --- Hard Constraint: Cost floor ---
+    cost_floor = cost * 1.05  # Minimum 5% margin
+    floored = proposed < cost_floor
+    proposed = np.where(floored, cost_floor, proposed)
+
+    # --- Status ---
+    hold = proposed == current
+    increase = ~hold & (proposed > current)
+    status = np.where(hold, "HOLD", np.where(increase, "INCREASE", "DECREASE"))
+
+    # --- Assemble proposals ---
+    # Reasoning before the cost floor only depends on which rules fired, so it
+    # is looked up per rule combination instead of rebuilt per product.
+    rule_code = undercut.astype(np.int8) | (blocked.astype(np.int8) << 1) | (margin.astype(np.int8) << 2)
+    reasons_by_code = [
+        tuple(reason for bit, reason in ((1, REASON_COMPETITOR), (2, REASON_BLOCKED), (4, REASON_MARGIN)) if code & bit)
+        for code in range(8)
+    ]
+    sentiment_values = sentiments.tolist()
+    signal_texts = {value: f"sentiment: {value:.2f}" for value in set(sentiment_values)}
+    competitor_signals = iter([f"competitor_price: ${c:.2f}" for c in competitor[competitor_truthy].tolist()])
+    floor_texts = iter([f"${f:.2f}" for f in cost_floor[floored].tolist()])
+
+    rows = zip(
+        column_values(products, "name", "Unknown"), product_ids, current.tolist(), proposed.tolist(), cost.tolist(), status.tolist(),
+        rule_code.tolist(), competitor_truthy.tolist(), floored.tolist(), sentiment_values
+    )
+    proposals = []
+    for name, pid, current_i, proposed_i, cost_i, status_i, code, truthy, floored_i, sentiment_i in rows:
+        sentiment_signal = signal_texts[sentiment_i]
+        signals_used = [next(competitor_signals), sentiment_signal] if truthy else [sentiment_signal]
+        reasons = reasons_by_code[code]
+        if floored_i:
+            floor_text = next(floor_texts)
+            reasons = reasons + (f"Price raised to cost floor ({floor_text})",)
+            signals_used.append(f"cost_floor: {floor_text}")
+        if not reasons and status_i == "HOLD":
+            reasons = (REASON_HOLD,)
+
+        proposals.append({
+            "product_id": pid,
+            "product_name": name,
+            "current_price": current_i,
+            "proposed_price": round(proposed_i, 2),
+            "status": status_i,
+            "reasoning": " | ".join(reasons),
+            "signals_used": signals_used,
+            "cost": cost_i
+        })
+
+    return proposals
@@ -0,0 +1,204 @@
+"""
+Product Sentiment: Per-product sentiment and complaint counts for pricing.
+Links customer messages to catalog products through a keyword index built
+from product titles, then aggregates the classified messages per product,
+so one product's complaints gate price increases on that product only
+instead of on the whole catalog.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from batching import get_int_env
+from columnar import column_values
+
+
+# Product fields indexed for linking (first non-empty wins)
+TITLE_FIELDS = ("title", "name")
+
+# Classification sentiment label -> score
+SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+# Title words too generic to identify a product
+STOPWORDS = frozenset((
+    "the", "and", "for", "with", "new", "pro", "premium", "professional", "set", "pack", "size",
+    "color", "edition", "model", "style", "classic", "original", "best", "quality", "item", "product"
+))
+
+_WORD = re.compile(r"[^\W\d_]{3,}")
+# Hyphens inside words are dropped so "T-Shirt" and "tshirt" match
+_HYPHEN = re.compile(r"(?<=\w)-(?=\w)")
+
+
+def _tokens(text: Any) -> List[str]:
+    """Casefolded title/message words of 3+ letters, singularized, without stopwords."""
+    if not isinstance(text, str):
+        return []
+    words = []
+    for word in _WORD.findall(_HYPHEN.sub("", text.casefold())):
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        if word not in STOPWORDS:
+            words.append(word)
+    return words
+
+
+class ProductKeywordIndex:
+    """
+    Inverted index word -> product entities over catalog titles.
+
+    Products whose titles have the same words are one entity (a catalog
+    often lists the same product under many IDs). A message is linked to the
+    entities it scores highest on, i.e. to every product ID of those
+    entities; each shared title word adds 1 / (entities carrying it), so
+    distinctive words outweigh common ones. Words carried by more than max_fanout entities are
+    not indexed, and a message whose best score is shared by more than
+    max_links entities is left unlinked as ambiguous. Lookups cost
+    O(words in the message).
+    """
+
+    def __init__(self, products: Sequence, max_fanout: Optional[int] = None, max_links: Optional[int] = None):
+        self.max_fanout = max_fanout or get_int_env("PRODUCT_LINK_MAX_FANOUT", 25)
+        self.max_links = max_links or get_int_env("PRODUCT_LINK_MAX_MATCHES", 3)
+        ids = column_values(products, "product_id")
+        fallback_ids = column_values(products, "id")
+        titles = [None] * len(ids)
+        for field in TITLE_FIELDS:
+            for position, value in enumerate(column_values(products, field)):
+                if titles[position] is None and isinstance(value, str) and value.strip():
+                    titles[position] = value
+
+        # entity -> product IDs; words -> entity for titles with the same words
+        self.entities: List[List[str]] = []
+        entity_of: Dict[Tuple[str, ...], int] = {}
+        # Listings often repeat titles verbatim; tokenize each distinct title once
+        entity_of_title: Dict[Any, Optional[int]] = {}
+        postings: Dict[str, List[int]] = {}
+        self._known_ids = set()
+        for position, (pid, fallback, title) in enumerate(zip(ids, fallback_ids, titles)):
+            product_id = str(pid if pid is not None else fallback if fallback is not None else position)
+            self._known_ids.add(product_id)
+            if title in entity_of_title:
+                entity = entity_of_title[title]
+            else:
+                words = tuple(sorted(set(_tokens(title))))
+                entity = entity_of.get(words) if words else None
+                if words and entity is None:
+                    entity = entity_of[words] = len(self.entities)
+                    self.entities.append([])
+                    for word in words:
+                        postings.setdefault(word, []).append(entity)
+                entity_of_title[title] = entity
+            if entity is not None:
+                self.entities[entity].append(product_id)
+        self.postings = {word: hits for word, hits in postings.items() if len(hits) <= self.max_fanout}
+
+    def match(self, text: Any) -> List[int]:
+        """Entities a message mentions (best keyword score, unless ambiguous)."""
+        scores: Dict[int, float] = {}
+        for word in set(_tokens(text)):
+            hits = self.postings.get(word)
+            if hits:
+                weight = 1.0 / len(hits)
+                for entity in hits:
+                    scores[entity] = scores.get(entity, 0.0) + weight
+        if not scores:
+            return []
+        best = max(scores.values())
+        matches = [entity for entity, score in scores.items() if score == best]
+        if len(matches) > self.max_links:
+            return []
+        return sorted(matches)
+
+    def catalog_id(self, product_id: Any) -> Optional[str]:
+        """str(product_id) if it names a catalog product, else None."""
+        if product_id is None:
+            return None
+        key = str(product_id)
+        return key if key in self._known_ids else None
+
+    def link(self, text: Any, product_id: Any = None) -> List[str]:
+        """Product IDs a message is about: its own product_id if it names a catalog product, else keyword matches."""
+        key = self.catalog_id(product_id)
+        if key is not None:
+            return [key]
+        return [pid for entity in self.match(text) for pid in self.entities[entity]]
+
+
+def aggregate_product_sentiment(
+    products: Sequence,
+    messages: Sequence,
+    classifications: Iterable[Dict[str, Any]],
+    index: Optional[ProductKeywordIndex] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Map str(product_id) -> {"sentiment", "messages", "complaints"} over the
+    classified messages linked to each product. sentiment is the mean of the
+    linked messages' labels (-1 to 1). Products no message mentions are
+    absent; messages without a classification are skipped.
+    """
+    index = index or ProductKeywordIndex(products)
+    by_id = {str(c.get("id")): c for c in classifications}
+    ids = column_values(messages, "message_id")
+    fallback_ids = column_values(messages, "id")
+    product_refs = column_values(messages, "product_id")
+    texts = column_values(messages, "message", "")
+
+    # Totals [sentiment sum, messages, complaints] per entity, and per product
+    # for messages that name their product_id; entities fan out at the end
+    entity_totals: Dict[int, List[float]] = {}
+    product_totals: Dict[str, List[float]] = {}
+    # Support exports repeat the same texts a lot; match each distinct text once
+    matched: Dict[Any, List[int]] = {}
+    for position, (message_id, fallback, product_ref, text) in enumerate(zip(ids, fallback_ids, product_refs, texts)):
+        if message_id is None:
+            message_id = fallback if fallback is not None else position
+        classification = by_id.get(str(message_id))
+        if classification is None:
+            continue
+        score = SENTIMENT_VALUES.get(str(classification.get("sentiment", "")).lower(), 0.0)
+        complaint = 1 if classification.get("type") == "Complaint" else 0
+        key = index.catalog_id(product_ref)
+        if key is not None:
+            targets = [(product_totals, key)]
+        else:
+            entities = matched.get(text)
+            if entities is None:
+                entities = matched[text] = index.match(text)
+            targets = [(entity_totals, entity) for entity in entities]
+        for totals, key in targets:
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = [0.0, 0, 0]
+            total[0] += score
+            total[1] += 1
+            total[2] += complaint
+
+    for entity, (score, count, complaints) in entity_totals.items():
+        for pid in index.entities[entity]:
+            total = product_totals.get(pid)
+            if total is None:
+                total = product_totals[pid] = [0.0, 0, 0]
+            total[0] += score
+            total[1] += count
+            total[2] += complaints
+
+    return {
+        pid: {"sentiment": round(score / count, 3), "messages": count, "complaints": complaints}
+        for pid, (score, count, complaints) in product_totals.items()
+    }
+
+
+def sentiment_for(
+    product_sentiment: Optional[Dict[str, Dict[str, Any]]],
+    product_id: Any,
+    sentiment: float
+) -> float:
+    """
+    Sentiment that gates pricing for one product. Without a per-product map
+    (older states, PRODUCT_SENTIMENT_ENABLED=false) this is the merchant-wide
+    score; with one, the product's own score, or neutral if no message
+    mentions it.
+    """
+    if product_sentiment is None:
+        return sentiment
+    entry = product_sentiment.get(str(product_id))
+    return entry["sentiment"] if entry else 0.0
@@ -0,0 +1,275 @@
+"""
+Spike Detector: Streaming complaint-spike detection for the Support Agent.
+Consumes classified messages in time order and keeps sliding-window complaint
+counts per channel and per topic in ring buffers. Each series compares its
+current window against an exponentially weighted baseline of the time before
+it (z-score), so spikes are judged relative to the merchant's normal
+complaint level instead of by the LLM.
+"""
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import pandas as pd
+from batching import get_float_env, get_int_env
+from columnar import column_values
+
+
+# Message fields read as the arrival time (epoch seconds or date strings)
+TIMESTAMP_FIELDS = ("timestamp", "created_at", "sent_at")
+
+# topic -> words that put a message in it (first match wins)
+TOPIC_KEYWORDS = {
+    "delivery": ("delivery", "delivered", "shipping", "shipment", "arrived", "late", "delayed", "tracking", "courier"),
+    "refund": ("refund", "refunded", "return", "returned", "money", "chargeback"),
+    "quality": ("broke", "broken", "damaged", "defective", "leaking", "stopped", "quality", "cheap", "itchy"),
+    "pricing": ("price", "prices", "pricing", "expensive", "increasing", "overpriced", "discount"),
+    "account": ("account", "login", "password", "payment", "charged", "card"),
+}
+
+_WORD = re.compile(r"[^\W_]+")
+_TOPIC_BY_WORD = {word: topic for topic, words in TOPIC_KEYWORDS.items() for word in words}
+
+# The whole-stream series; only this one may flag a spike before its baseline is warm
+OVERALL = ("all", "")
+
+
+def message_topic(text: Any) -> str:
+    """Topic of a message from TOPIC_KEYWORDS, "other" if no keyword matches."""
+    if not isinstance(text, str):
+        return "other"
+    for word in _WORD.findall(text.casefold()):
+        topic = _TOPIC_BY_WORD.get(word)
+        if topic:
+            return topic
+    return "other"
+
+
+class _Series:
+    """Ring buffer of per-bucket counts for one channel/topic plus its EWMA baseline."""
+
+    __slots__ = ("complaints", "totals", "window_complaints", "window_total", "mean", "var", "samples")
+
+    def __init__(self, buckets: int):
+        self.complaints = [0] * buckets
+        self.totals = [0] * buckets
+        self.window_complaints = 0
+        self.window_total = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.samples = 0
+
+
+class ComplaintSpikeDetector:
+    """
+    Sliding-window complaint counter with baseline-relative spike flags.
+
+    Time is split into buckets of bucket_seconds; each series keeps the last
+    window_buckets buckets in a ring. A bucket that slides out of the window
+    is folded into an EWMA mean/variance of complaints per bucket (the
+    baseline), so the baseline never includes the window it is compared
+    with. A series is spiking when its window has at least min_complaints
+    and sits z_threshold standard deviations above the window the baseline
+    predicts. Until min_baseline_buckets buckets have left the window, only
+    the overall series can spike, when complaints exceed ratio_threshold of
+    its window.
+
+    observe() is O(1) per event; closing a bucket costs O(series), and a
+    long gap is capped at the steps needed for the baseline to settle.
+    Events older than the current bucket count toward the current bucket.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: Optional[float] = None,
+        window_buckets: Optional[int] = None,
+        alpha: Optional[float] = None,
+        z_threshold: Optional[float] = None,
+        min_complaints: Optional[int] = None,
+        min_baseline_buckets: Optional[int] = None,
+        ratio_threshold: Optional[float] = None,
+        min_std: float = 1.0
+    ):
+        self.bucket_seconds = (bucket_seconds if bucket_seconds is not None
+                               else get_float_env("SPIKE_BUCKET_SECONDS", 60.0))
+        self.window_buckets = max(1, window_buckets if window_buckets is not None
+                                  else get_int_env("SPIKE_WINDOW_BUCKETS", 15))
+        self.alpha = alpha if alpha is not None else get_float_env("SPIKE_EWMA_ALPHA", 0.02)
+        self.z_threshold = z_threshold if z_threshold is not None else get_float_env("SPIKE_Z_THRESHOLD", 4.0)
+        self.min_complaints = min_complaints if min_complaints is not None else get_int_env("SPIKE_MIN_COMPLAINTS", 5)
+        self.min_baseline_buckets = (min_baseline_buckets if min_baseline_buckets is not None
+                                     else get_int_env("SPIKE_MIN_BASELINE_BUCKETS", 30))
+        self.ratio_threshold = (ratio_threshold if ratio_threshold is not None
+                                else get_float_env("SPIKE_COMPLAINT_RATIO", 0.5))
+        self.min_std = min_std
+        if self.bucket_seconds <= 0:
+            raise ValueError(f"bucket_seconds must be positive, got {self.bucket_seconds}")
+        if not 0.0 < self.alpha < 1.0:
+            raise ValueError(f"alpha must be between 0 and 1, got {self.alpha}")
+        # Zero-count steps after which the baseline has decayed to within 0.1% of zero
+        self._settle_steps = self.window_buckets + math.ceil(math.log(1e-3) / math.log(1.0 - self.alpha))
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._bucket: Optional[int] = None
+        self._slot = 0
+        # Buckets closed so far; the ring holds real buckets once this reaches window_buckets
+        self._closed = 0
+        self.events = 0
+        self.episodes: List[Dict[str, Any]] = []
+        self._spiking: Dict[Tuple[str, str], bool] = {}
+
+    def _get(self, key: Tuple[str, str]) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(self.window_buckets)
+        return series
+
+    def observe(self, timestamp: float, is_complaint: bool, channel: str = "", topic: str = "") -> None:
+        """Count one classified message."""
+        bucket = int(timestamp // self.bucket_seconds)
+        if self._bucket is None:
+            self._bucket = bucket
+        elif bucket > self._bucket:
+            self._advance(bucket)
+        complaint = 1 if is_complaint else 0
+        slot = self._slot
+        for key in (OVERALL, ("channel", channel), ("topic", topic)):
+            series = self._series.get(key)
+            if series is None:
+                series = self._get(key)
+            series.totals[slot] += 1
+            series.window_total += 1
+            series.complaints[slot] += complaint
+            series.window_complaints += complaint
+        self.events += 1
+
+    def _advance(self, bucket: int) -> None:
+        """Close buckets up to (not including) bucket."""
+        steps = min(bucket - self._bucket, self._settle_steps)
+        alpha = self.alpha
+        for step in range(steps):
+            closing = self._bucket + step
+            self._record_episodes(closing)
+            slot = (self._slot + 1) % self.window_buckets
+            self._closed += 1
+            full = self._closed >= self.window_buckets
+            for series in self._series.values():
+                leaving = series.complaints[slot]
+                if full:
+                    # The oldest bucket leaves the window and joins the baseline (EWMA
+                    # mean/variance; a plain running average until 1/alpha buckets are in)
+                    rate = max(alpha, 1.0 / (series.samples + 1))
+                    diff = leaving - series.mean
+                    increment = rate * diff
+                    series.mean += increment
+                    series.var = (1.0 - rate) * (series.var + diff * increment)
+                    series.samples += 1
+                series.window_complaints -= leaving
+                series.window_total -= series.totals[slot]
+                series.complaints[slot] = 0
+                series.totals[slot] = 0
+            self._slot = slot
+        self._bucket = bucket
+
+    def _is_spiking(self, key: Tuple[str, str], series: _Series) -> Tuple[bool, float]:
+        # A window sums window_buckets buckets: scale the per-bucket baseline to match,
+        # with the variance at least the mean, as for Poisson counts
+        expected = series.mean * self.window_buckets
+        std = math.sqrt(max(series.var, series.mean) * self.window_buckets)
+        z = (series.window_complaints - expected) / max(std, self.min_std)
+        if series.window_complaints < self.min_complaints:
+            return False, z
+        if series.samples >= self.min_baseline_buckets:
+            return z >= self.z_threshold, z
+        if key == OVERALL:
+            return series.window_complaints > self.ratio_threshold * series.window_total, z
+        return False, z
+
+    def _record_episodes(self, bucket: int) -> None:
+        """Note series that started spiking in the window ending with bucket."""
+        for key, series in self._series.items():
+            spiking, z = self._is_spiking(key, series)
+            if spiking and not self._spiking.get(key):
+                self.episodes.append(self._describe(key, series, z, bucket))
+            self._spiking[key] = spiking
+
+    def _describe(self, key: Tuple[str, str], series: _Series, z: float, bucket: int) -> Dict[str, Any]:
+        return {
+            "series": "all" if key == OVERALL else f"{key[0]}:{key[1]}",
+            "window_end": (bucket + 1) * self.bucket_seconds,
+            "complaints": series.window_complaints,
+            "messages": series.window_total,
+            "baseline": round(series.mean * self.window_buckets, 2),
+            "z_score": round(z, 2)
+        }
+
+    def current_spikes(self) -> List[Dict[str, Any]]:
+        """Series spiking in the current window, most anomalous first."""
+        spikes = []
+        for key, series in self._series.items():
+            spiking, z = self._is_spiking(key, series)
+            if spiking:
+                spikes.append(self._describe(key, series, z, self._bucket))
+        return sorted(spikes, key=lambda spike: -spike["z_score"])
+
+    def velocity(self) -> float:
+        """Complaint share of the current overall window on the 0-10 complaint_velocity scale."""
+        series = self._series.get(OVERALL)
+        if series is None or not series.window_total:
+            return 0.0
+        return 10.0 * series.window_complaints / series.window_total
+
+
+def message_timestamps(messages: Sequence) -> List[float]:
+    """
+    Arrival time of each message in epoch seconds. Messages without a
+    parseable time take the previous message's time (the first one: 0), so a
+    timestamp-free export is one burst at a fixed time.
+    """
+    for field in TIMESTAMP_FIELDS:
+        values = column_values(messages, field)
+        if any(value is not None for value in values):
+            break
+    else:
+        return [0.0] * len(messages)
+    raw = pd.Series(values, dtype=object)
+    seconds = pd.to_numeric(raw, errors="coerce").astype(float)
+    text = raw[seconds.isna() & raw.notna()]
+    if len(text):
+        parsed = pd.to_datetime(text, errors="coerce", utc=True, format="mixed").dropna()
+        seconds[parsed.index] = (parsed - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)
+    return seconds.ffill().fillna(0.0).tolist()
+
+
+def detect_complaint_spikes(
+    messages: Sequence,
+    classifications: Iterable[Dict[str, Any]],
+    detector: Optional[ComplaintSpikeDetector] = None
+) -> Dict[str, Any]:
+    """
+    Stream classified messages through a ComplaintSpikeDetector in time order
+    and return the deterministic spike flag, velocity and spiking series.
+    Messages without a classification (failed batches) are skipped.
+    """
+    detector = detector or ComplaintSpikeDetector()
+    is_complaint = {str(c.get("id")): c.get("type") == "Complaint" for c in classifications}
+    ids = column_values(messages, "message_id")
+    fallback_ids = column_values(messages, "id")
+    channels = column_values(messages, "channel", "")
+    texts = column_values(messages, "message", "")
+    timestamps = message_timestamps(messages)
+
+    order = sorted(range(len(ids)), key=timestamps.__getitem__)
+    for position in order:
+        message_id = ids[position] if ids[position] is not None else fallback_ids[position]
+        complaint = is_complaint.get(str(message_id if message_id is not None else position))
+        if complaint is None:
+            continue
+        detector.observe(timestamps[position], complaint, str(channels[position] or ""), message_topic(texts[position]))
+
+    spikes = detector.current_spikes()
+    return {
+        "spike_detected": bool(spikes),
+        "complaint_velocity": round(detector.velocity(), 2),
+        "spikes": spikes,
+        "episodes": detector.episodes,
+        "events": detector.events
+    }
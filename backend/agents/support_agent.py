@@ -1,11 +1,31 @@
 """
 Support Agent: Analyzes customer messages and detects sentiment/spikes.
 """
-from typing import Dict, Any, List
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
-from llm_config import get_llm
+from llm_config import get_chain, get_llm
+from llm_cache import with_llm_cache
+from batching import (
+    chunk_by_token_budget, get_int_env, get_float_env, get_bool_env,
+    get_max_concurrency, stream_batches, run_sync
+)
+from dedup import group_duplicates, with_coalescing
+from prompt_packing import (
+    get_batch_token_budget, get_token_counter, pack_records, prompt_overhead_tokens, serialize_record
+)
+from agents.message_preclassifier import preclassify_messages
+from agents.spike_detector import detect_complaint_spikes
+from agents.product_sentiment import aggregate_product_sentiment
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Fields that make two messages the same request for the LLM
+MESSAGE_DEDUP_FIELDS = ("message",)
 
 
 class SupportAnalysis(BaseModel):
@@ -17,30 +37,8 @@ class SupportAnalysis(BaseModel):
     spike_detected: bool = Field(description="Anomaly spike detected")
 
 
-def support_agent(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Analyzes customer messages to classify intent and detect sentiment trends.
-    Detects viral complaint spikes that trigger safety throttling.
-    """
-    print("\n--- 🎧 Support Agent: Analyzing Customer Messages ---")
-    
-    messages = state.get("customer_messages", [])
-    
-    if not messages:
-        return {
-            "support_summary": {"status": "no_data"},
-            "sentiment_score": 0.0,
-            "complaint_spike_detected": False
-        }
-    
-    # Initialize LLM (supports both OpenAI and Azure)
-    # Note: temperature will be auto-adjusted for GPT-5
-    # For Azure, model parameter is ignored (uses deployment name from env)
-    llm = get_llm(temperature=0)
-    
-    # Create prompt with explicit JSON format for GPT-5
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", """You are a customer support analyst.
+SUPPORT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a customer support analyst.
 Classify each message as: Inquiry, Complaint, Suggestion, or Transactional Request.
 Analyze sentiment and detect anomalies.
 
@@ -60,92 +58,317 @@ Rules:
 - complaint_velocity: number between 0 and 10
 - spike_detected: boolean (true or false)
 - Return ONLY valid JSON, no other text"""),
-        ("user", "Customer messages:\n{messages}")
-    ])
-    
-    # Create chain
-    parser = JsonOutputParser(pydantic_object=SupportAnalysis)
-    chain = prompt | llm | parser
-    
-    try:
-        # Run analysis with better error handling
-        messages_str = str(messages[:20])  # Limit for efficiency
-        print(f"Analyzing {len(messages[:20])} messages...")
-        
-        # Debug: Show what we're sending
-        print(f"Debug: Sending {len(messages_str)} characters to LLM")
+    ("user", "Customer messages:\n{messages}")
+])
+
+
+class SupportAggregator:
+    """
+    Incrementally merges per-batch support analyses.
+    Batch-level scores are weighted by the number of messages in the batch,
+    so the final figures describe the whole message set. Classifications are
+    keyed by the input position of the message they label to keep input
+    order; one whose ID matches no message in its batch is kept at the
+    batch's first position.
+    """
+
+    def __init__(self, total_messages: int):
+        self.total_messages = total_messages
+        self.segments: Dict[int, List[Dict[str, str]]] = {}
+        self.analyzed_messages = 0
+        self.preclassified_messages = 0
+        self.sentiment_sum = 0.0
+        self.velocity_sum = 0.0
+        self.spike_weight = 0
+        self.complaint_count = 0
+        self.classified_count = 0
+        self.topic_counts: Counter = Counter()
+        self.errors: List[Exception] = []
+
+    def add(self, positions: List[int], batch: List[Dict[str, Any]], result: Dict[str, Any]) -> None:
+        """Merge one successful LLM batch analysis."""
+        classifications = result.get("message_classifications", [])
+        weight = len(batch)
         
-        # Try to invoke the LLM
-        try:
-            result = chain.invoke({"messages": messages_str})
-        except Exception as llm_error:
-            print(f"✗ LLM Invocation Error: {type(llm_error).__name__}")
-            print(f"✗ Error message: {str(llm_error)}")
-            
-            # Check for specific Azure OpenAI errors
-            error_str = str(llm_error).lower()
-            if "api version" in error_str or "version" in error_str:
-                print("⚠️  Possible API version issue. Try using 2024-02-15-preview")
-            elif "deployment" in error_str:
-                print("⚠️  Possible deployment name issue. Check AZURE_OPENAI_DEPLOYMENT_NAME")
-            elif "authentication" in error_str or "401" in error_str:
-                print("⚠️  Authentication error. Check AZURE_OPENAI_API_KEY")
-            elif "temperature" in error_str:
-                print("⚠️  Temperature parameter issue with GPT-5")
+        by_id = {str(message.get("message_id")): position for position, message in zip(positions, batch)}
+        for classification in classifications:
+            position = by_id.get(str(classification.get("id")), positions[0])
+            self.segments.setdefault(position, []).append(classification)
+        self.analyzed_messages += weight
+        self.sentiment_sum += float(result.get("overall_sentiment", 0.0)) * weight
+        self.velocity_sum += float(result.get("complaint_velocity", 0.0)) * weight
+        if bool(result.get("spike_detected", False)):
+            self.spike_weight += weight
+        self.complaint_count += len([c for c in classifications if c.get("type") == "Complaint"])
+        self.classified_count += len(classifications)
+        self.topic_counts.update(result.get("trending_topics", []))
+
+    def add_local(self, classified: List[Dict[str, Any]]) -> None:
+        """Merge messages labelled by the local pre-classifier."""
+        for entry in classified:
+            classification = entry["classification"]
+            is_complaint = classification["type"] == "Complaint"
             
-            raise  # Re-raise to be caught by outer exception handler
-        
-        # Debug: Show what we got back
-        print(f"Debug: Received result type: {type(result)}")
-        print(f"Debug: Result keys: {result.keys() if isinstance(result, dict) else 'N/A'}")
-        
-        # Validate result structure
-        if not isinstance(result, dict):
-            print(f"✗ Invalid result type: {type(result)}")
-            print(f"✗ Result content: {result}")
-            raise ValueError(f"Expected dict, got {type(result)}")
-        
-        classifications = result.get("message_classifications", [])
-        sentiment = float(result.get("overall_sentiment", 0.0))
-        velocity = float(result.get("complaint_velocity", 0.0))
-        topics = result.get("trending_topics", [])
-        spike = bool(result.get("spike_detected", False))
+            self.segments[entry["position"]] = [classification]
+            self.analyzed_messages += 1
+            self.preclassified_messages += 1
+            self.sentiment_sum += entry["sentiment"]
+            self.velocity_sum += 10.0 if is_complaint else 0.0
+            self.complaint_count += int(is_complaint)
+            self.classified_count += 1
+
+    def add_duplicates(self, result: Dict[str, Any], duplicates: List[Tuple[int, Optional[Dict[str, str]]]]) -> None:
+        """
+        Merge repeated messages that were collapsed into a batch member before
+        the LLM call. Each counts like one more message of that batch and
+        takes over the member's classification.
+        """
+        for position, classification in duplicates:
+            self.analyzed_messages += 1
+            self.sentiment_sum += float(result.get("overall_sentiment", 0.0))
+            self.velocity_sum += float(result.get("complaint_velocity", 0.0))
+            if bool(result.get("spike_detected", False)):
+                self.spike_weight += 1
+            if classification is not None:
+                self.segments[position] = [classification]
+                self.complaint_count += int(classification.get("type") == "Complaint")
+                self.classified_count += 1
+
+    def add_error(self, positions: List[int], batch: List[Dict[str, Any]], error: Exception) -> None:
+        """Record a failed batch."""
+        self.errors.append(error)
+
+    def finalize(self) -> Dict[str, Any]:
+        """Compute whole-set figures from everything merged so far."""
+        analyzed = self.analyzed_messages
+        sentiment = self.sentiment_sum / analyzed if analyzed else 0.0
+        velocity = self.velocity_sum / analyzed if analyzed else 0.0
+        complaint_ratio = self.complaint_count / self.classified_count if self.classified_count else 0
         
-        # Additional spike detection logic
-        complaint_count = len([c for c in classifications if c.get("type") == "Complaint"])
-        complaint_ratio = complaint_count / len(classifications) if classifications else 0
+        # The LLM spike flag counts only if batches covering most messages raised it
+        spike = analyzed > 0 and self.spike_weight / analyzed > 0.5
         
         # Trigger spike if velocity > 7 OR complaint ratio > 50%
         spike_detected = spike or velocity > 7.0 or complaint_ratio > 0.5
         
-        print(f"✓ Classified {len(classifications)} messages")
-        print(f"✓ Sentiment: {sentiment:.2f}")
-        print(f"✓ Complaint Velocity: {velocity:.1f}/10")
-        print(f"✓ Spike Detected: {spike_detected}")
+        classifications = []
+        for position in sorted(self.segments):
+            classifications.extend(self.segments[position])
         
-        summary = {
+        return {
             "classifications": classifications,
             "sentiment": sentiment,
             "velocity": velocity,
-            "topics": topics,
-            "total_messages": len(messages),
-            "complaint_count": complaint_count
+            "topics": [topic for topic, _ in self.topic_counts.most_common(5)],
+            "total_messages": self.total_messages,
+            "analyzed_messages": analyzed,
+            "preclassified_messages": self.preclassified_messages,
+            "complaint_count": self.complaint_count,
+            "complaint_ratio": complaint_ratio,
+            "failed_batches": len(self.errors),
+            "spike_detected": spike_detected
         }
-        
+
+
+def explain_llm_error(llm_error: Exception) -> None:
+    """Log the error with hints for common Azure OpenAI configuration errors."""
+    logger.error("✗ LLM Invocation Error: %s: %s", type(llm_error).__name__, llm_error)
+    
+    # Check for specific Azure OpenAI errors
+    error_str = str(llm_error).lower()
+    if "api version" in error_str or "version" in error_str:
+        logger.warning("⚠️  Possible API version issue. Try using 2024-02-15-preview")
+    elif "deployment" in error_str:
+        logger.warning("⚠️  Possible deployment name issue. Check AZURE_OPENAI_DEPLOYMENT_NAME")
+    elif "authentication" in error_str or "401" in error_str:
+        logger.warning("⚠️  Authentication error. Check AZURE_OPENAI_API_KEY")
+    elif "temperature" in error_str:
+        logger.warning("⚠️  Temperature parameter issue with GPT-5")
+
+
+async def asupport_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Analyzes customer messages to classify intent and detect sentiment trends.
+    Detects viral complaint spikes that trigger safety throttling.
+    
+    Obvious messages are labelled by the local pre-classifier; the rest
+    are split into batches that are classified concurrently by the LLM and
+    merged as each batch completes. The spike flag and complaint velocity
+    come from the streaming spike detector over the classified messages,
+    and messages that mention catalog products are aggregated per product
+    for the pricing and validation nodes.
+    """
+    logger.info("--- 🎧 Support Agent: Analyzing Customer Messages ---")
+    
+    messages = state.get("customer_messages", [])
+    
+    if not messages:
         return {
-            "support_summary": summary,
-            "sentiment_score": sentiment,
-            "complaint_spike_detected": spike_detected
+            "support_summary": {"status": "no_data"},
+            "sentiment_score": 0.0,
+            "complaint_velocity": 0.0,
+            "complaint_spike_detected": False,
+            "product_sentiment": {}
         }
-        
-    except Exception as e:
-        print(f"✗ Support Agent Error: {e}")
-        print(f"✗ Error type: {type(e).__name__}")
-        import traceback
-        print(f"✗ Traceback:")
-        traceback.print_exc()
+    
+    aggregator = SupportAggregator(total_messages=len(messages))
+    
+    # Local tier: label obvious messages without calling the LLM
+    if get_bool_env("SUPPORT_PRECLASSIFIER_ENABLED", True):
+        classified, ambiguous = preclassify_messages(
+            messages,
+            min_confidence=get_float_env("SUPPORT_PRECLASSIFIER_MIN_CONFIDENCE", 0.6)
+        )
+        aggregator.add_local(classified)
+        logger.info("Pre-classified %d messages locally, %d ambiguous messages go to the LLM",
+                    len(classified), len(ambiguous))
+    else:
+        ambiguous = list(range(len(messages)))
+    
+    if ambiguous:
+        await classify_with_llm(messages, ambiguous, aggregator)
+    
+    if not aggregator.analyzed_messages:
+        e = aggregator.errors[0]
+        logger.error("✗ Support Agent Error: %s", e)
         return {
-            "support_summary": {"error": str(e), "error_type": type(e).__name__},
+            "support_summary": {
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "spikes": [],
+                "spike_episodes": []
+            },
             "sentiment_score": 0.0,
-            "complaint_spike_detected": False
+            "complaint_velocity": 0.0,
+            "complaint_spike_detected": False,
+            "product_sentiment": {}
         }
+    
+    summary = aggregator.finalize()
+    spike_detected = summary.pop("spike_detected")
+    
+    # Deterministic spike flag and velocity from per-channel/topic sliding windows
+    if get_bool_env("SPIKE_DETECTOR_ENABLED", True):
+        spikes = detect_complaint_spikes(messages, summary["classifications"])
+        spike_detected = spikes["spike_detected"]
+        summary["velocity"] = spikes["complaint_velocity"]
+        summary["spikes"] = spikes["spikes"]
+        summary["spike_episodes"] = spikes["episodes"]
+    
+    updates = {}
+    products = state.get("product_data")
+    if products is not None and get_bool_env("PRODUCT_SENTIMENT_ENABLED", True):
+        product_sentiment = aggregate_product_sentiment(products, messages, summary["classifications"])
+        summary["products_mentioned"] = len(product_sentiment)
+        updates["product_sentiment"] = product_sentiment
+        logger.info("✓ Linked messages to %d products", len(product_sentiment))
+    
+    logger.info("✓ Classified %d messages", len(summary["classifications"]))
+    logger.info("✓ Sentiment: %.2f", summary["sentiment"])
+    logger.info("✓ Complaint Velocity: %.1f/10", summary["velocity"])
+    logger.info("✓ Spike Detected: %s", spike_detected)
+    if summary["failed_batches"]:
+        logger.error("✗ %d batches failed", summary["failed_batches"])
+    
+    return {
+        "support_summary": summary,
+        "sentiment_score": summary["sentiment"],
+        "complaint_velocity": summary["velocity"],
+        "complaint_spike_detected": spike_detected,
+        **updates
+    }
+
+
+async def classify_with_llm(
+    messages: List[Dict[str, Any]],
+    positions: List[int],
+    aggregator: SupportAggregator
+) -> None:
+    """Classify the messages at the given positions through the LLM in concurrent batches."""
+    # Initialize LLM (supports both OpenAI and Azure)
+    # Note: temperature will be auto-adjusted for GPT-5
+    # For Azure, model parameter is ignored (uses deployment name from env)
+    llm = get_llm(temperature=0)
+    
+    # Shared chain (built once per LLM client)
+    chain = get_chain(SUPPORT_PROMPT, llm, SupportAnalysis)
+    
+    # Serve unchanged inputs from the persistent response cache
+    chain = with_llm_cache(chain, SUPPORT_PROMPT, llm)
+    
+    # Identical batches in flight (e.g. from another merchant) share one call
+    chain = with_coalescing(chain, SUPPORT_PROMPT, llm)
+    
+    # Verbatim repeats (after case/whitespace normalization) are classified once
+    duplicates: Dict[int, List[int]] = {}
+    if get_bool_env("INPUT_DEDUP_ENABLED", True):
+        positions, duplicates = group_duplicates(messages, positions, MESSAGE_DEDUP_FIELDS)
+        if duplicates:
+            logger.info("Collapsed %d repeated messages into their first occurrence",
+                        sum(len(d) for d in duplicates.values()))
+    
+    pending = [messages[i] for i in positions]
+    batches = chunk_by_token_budget(
+        pending,
+        max_tokens=get_batch_token_budget(
+            "SUPPORT_BATCH_TOKENS", 3000, prompt_overhead_tokens(SUPPORT_PROMPT)
+        ),
+        serialize=serialize_record,
+        max_items=get_int_env("SUPPORT_BATCH_MAX_ITEMS", 20) or None,
+        count_tokens=get_token_counter()
+    )
+    
+    # Input positions of the messages in each batch
+    batch_positions = []
+    offset = 0
+    for batch in batches:
+        batch_positions.append(positions[offset:offset + len(batch)])
+        offset += len(batch)
+    
+    max_concurrency = get_max_concurrency()
+    logger.info("Analyzing %d messages in %d batches (max %d in flight)...",
+                len(pending), len(batches), max_concurrency)
+    
+    inputs = [{"messages": pack_records(batch)} for batch in batches]
+    
+    async for index, result in stream_batches(chain, inputs, max_concurrency=max_concurrency):
+        batch = batches[index]
+        members = batch_positions[index]
+        if isinstance(result, Exception):
+            explain_llm_error(result)
+            aggregator.add_error(members, batch, result)
+        elif not isinstance(result, dict):
+            logger.error("✗ Invalid result type: %s", type(result))
+            aggregator.add_error(members, batch, ValueError(f"Expected dict, got {type(result)}"))
+        else:
+            aggregator.add(members, batch, result)
+            if duplicates:
+                aggregator.add_duplicates(result, fan_out_classifications(
+                    messages, members, duplicates, result
+                ))
+
+
+def fan_out_classifications(
+    messages: List[Dict[str, Any]],
+    positions: List[int],
+    duplicates: Dict[int, List[int]],
+    result: Dict[str, Any]
+) -> List[Tuple[int, Optional[Dict[str, str]]]]:
+    """Copy each batch member's classification to its collapsed repeats, under their own IDs."""
+    by_id = {str(c.get("id")): c for c in result.get("message_classifications", [])}
+    copies = []
+    for representative in positions:
+        if representative not in duplicates:
+            continue
+        classification = by_id.get(str(messages[representative].get("message_id")))
+        for position in duplicates[representative]:
+            if classification is None:
+                copies.append((position, None))
+            else:
+                copies.append((position, {**classification, "id": str(messages[position].get("message_id"))}))
+    return copies
+
+
+def support_agent(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Synchronous entry point for the Support Agent (see asupport_agent)."""
+    return run_sync(asupport_agent(state))
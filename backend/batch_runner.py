@@ -0,0 +1,250 @@
+"""
+Multi-merchant batch runner.
+
+Runs the workflow for every merchant in a manifest with a bounded number of
+graph runs in flight. Each merchant gets its own initial state and writes its
+report to <output_dir>/<merchant_id>-<hash>.json as soon as it finishes, so a
+crashed or interrupted run resumes by skipping merchants that already have a
+report. Failed merchants are recorded in <merchant_id>-<hash>.error.json and
+retried on the next run. When the graph has a checkpointer (CHECKPOINT_ENABLED=true),
+merchants that were mid-run resume from their last completed node.
+
+Manifest: a CSV or JSON-lines file with a merchant_id column/key and an
+optional data_dir pointing at that merchant's products_raw.csv,
+customer_messages.csv and pricing_context.csv (defaults to DATA_DIR).
+
+Usage:
+    cd backend
+    python batch_runner.py merchants.csv --output reports/ --concurrency 8
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from batching import get_int_env
+from checkpointer import checkpoint_config
+from logger import get_logger, log_context
+
+
+logger = get_logger(__name__)
+
+# Characters allowed in report file names; everything else becomes "_"
+_UNSAFE_NAME_RE = re.compile(r"[^\w.-]")
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """
+    Read merchant entries from a CSV or JSON-lines manifest.
+    Entries without a merchant_id are skipped; duplicate IDs keep the first entry.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            entries = [json.loads(line) for line in f if line.strip()]
+        else:
+            entries = list(csv.DictReader(f))
+
+    merchants = {}
+    for entry in entries:
+        merchant_id = str(entry.get("merchant_id") or "").strip()
+        if merchant_id and merchant_id not in merchants:
+            merchants[merchant_id] = {
+                "merchant_id": merchant_id,
+                "data_dir": str(entry.get("data_dir") or "").strip()
+            }
+    return list(merchants.values())
+
+
+def report_path(output_dir: str, merchant_id: str, suffix: str = ".json") -> str:
+    """
+    Report file for a merchant: the sanitized ID plus a short hash of the raw
+    ID, so IDs that sanitize alike ("a/b", "a:b", "a_b") never share a file.
+    """
+    digest = hashlib.sha1(merchant_id.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_dir, f"{_UNSAFE_NAME_RE.sub('_', merchant_id)}-{digest}{suffix}")
+
+
+def write_json(path: str, payload: Dict[str, Any]) -> None:
+    """Write atomically so a crash never leaves a half-written report behind."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def initial_state(entry: Dict[str, str]) -> Dict[str, Any]:
+    """Fresh state for one merchant; the coordinator loads its data."""
+    state = {"merchant_id": entry["merchant_id"]}
+    if entry.get("data_dir"):
+        state["data_dir"] = entry["data_dir"]
+    return state
+
+
+class BatchProgress:
+    """Counts finished merchants and prints progress with throughput."""
+
+    def __init__(self, total: int, skipped: int):
+        self.total = total
+        self.skipped = skipped
+        self.completed = 0
+        self.failed = 0
+        self.durations: List[float] = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Merchants finished per minute in this run."""
+        done = self.completed + self.failed
+        return done / self.elapsed * 60 if self.elapsed > 0 else 0.0
+
+    def record(self, merchant_id: str, duration: float, error: Optional[Exception] = None) -> None:
+        self.durations.append(duration)
+        if error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+        done = self.skipped + self.completed + self.failed
+        if error is None:
+            logger.info("[%d/%d] %s ✓ (%.1fs, %.1f merchants/min)",
+                        done, self.total, merchant_id, duration, self.throughput)
+        else:
+            logger.error("[%d/%d] %s ✗ %s: %s (%.1fs, %.1f merchants/min)",
+                         done, self.total, merchant_id, type(error).__name__, error, duration, self.throughput)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "merchants_per_minute": round(self.throughput, 2),
+            "mean_merchant_seconds": round(sum(self.durations) / len(self.durations), 3) if self.durations else 0.0
+        }
+
+
+async def run_merchant(
+    app,
+    entry: Dict[str, str],
+    output_dir: str,
+    progress: BatchProgress,
+    run_id: str = ""
+) -> None:
+    """Run the graph for one merchant and write its report (or error) file."""
+    merchant_id = entry["merchant_id"]
+    error_path = report_path(output_dir, merchant_id, ".error.json")
+    checkpointer = getattr(app, "checkpointer", None)
+    config = checkpoint_config(merchant_id, run_id) if checkpointer else None
+    start = time.perf_counter()
+    try:
+        snapshot = await app.aget_state(config) if config else None
+        if snapshot and snapshot.next:
+            # Interrupted earlier in this run: continue from the last completed node
+            logger.info("↻ Resuming %s at %s", merchant_id, ", ".join(snapshot.next))
+            result = await app.ainvoke(None, config)
+        elif snapshot and snapshot.values.get("final_report"):
+            # Finished before the report could be written
+            result = snapshot.values
+        else:
+            result = await app.ainvoke(initial_state(entry), config)
+    except Exception as e:
+        duration = time.perf_counter() - start
+        write_json(error_path, {"merchant_id": merchant_id, "error": f"{type(e).__name__}: {e}",
+                                "duration_seconds": round(duration, 3)})
+        progress.record(merchant_id, duration, e)
+        return
+
+    duration = time.perf_counter() - start
+    write_json(report_path(output_dir, merchant_id), {
+        "merchant_id": merchant_id,
+        "duration_seconds": round(duration, 3),
+        "final_report": result.get("final_report", {}),
+        "catalog_issues": len(result.get("catalog_issues", [])),
+        "sentiment_score": result.get("sentiment_score"),
+        "complaint_spike_detected": result.get("complaint_spike_detected", False)
+    })
+    if os.path.exists(error_path):
+        os.remove(error_path)
+    if config:
+        # The report is the durable result; the run's checkpoints are no longer needed
+        await checkpointer.adelete_thread(config["configurable"]["thread_id"])
+    progress.record(merchant_id, duration)
+
+
+async def run_batch(
+    entries: List[Dict[str, str]],
+    output_dir: str,
+    concurrency: Optional[int] = None,
+    app=None,
+    run_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Run every manifest entry that has no report yet, at most concurrency
+    (BATCH_MERCHANT_CONCURRENCY, default 4) merchants at a time.
+    run_id names the checkpoints of this batch (default: derived from
+    output_dir, so re-running into the same directory resumes them).
+    Returns the run summary, also written to <output_dir>/_summary.json.
+    """
+    if app is None:
+        from graph import app
+    concurrency = max(concurrency or get_int_env("BATCH_MERCHANT_CONCURRENCY", 4), 1)
+    if run_id is None:
+        run_id = hashlib.sha1(os.path.abspath(output_dir).encode("utf-8")).hexdigest()[:12]
+    os.makedirs(output_dir, exist_ok=True)
+
+    pending = [e for e in entries if not os.path.exists(report_path(output_dir, e["merchant_id"]))]
+    progress = BatchProgress(total=len(entries), skipped=len(entries) - len(pending))
+    logger.info("🏭 Batch run: %d merchants, %d already done, %d to run (%d at a time)",
+                len(entries), progress.skipped, len(pending), concurrency)
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for entry in pending:
+        queue.put_nowait(entry)
+
+    async def worker() -> None:
+        while not queue.empty():
+            entry = queue.get_nowait()
+            # Every log record of this merchant's run carries its merchant_id and run_id
+            with log_context(merchant_id=entry["merchant_id"], run_id=run_id):
+                await run_merchant(app, entry, output_dir, progress, run_id)
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(pending)))))
+
+    summary = progress.summary()
+    write_json(os.path.join(output_dir, "_summary.json"), summary)
+    logger.info("📊 Batch finished: %d completed, %d failed, %d skipped in %.1fs (%.1f merchants/min)",
+                summary["completed"], summary["failed"], summary["skipped"],
+                summary["elapsed_seconds"], summary["merchants_per_minute"])
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV or JSON-lines file with merchant_id[, data_dir]")
+    parser.add_argument("--output", default="reports", help="Directory for per-merchant reports")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="Merchants in flight (default: BATCH_MERCHANT_CONCURRENCY or 4)")
+    parser.add_argument("--run-id", default=None,
+                        help="Checkpoint run ID (default: derived from --output)")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    summary = asyncio.run(run_batch(
+        load_manifest(args.manifest), args.output, args.concurrency, run_id=args.run_id
+    ))
+    sys.exit(1 if summary["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Batching helpers for running LLM chains over full datasets.
+Splits record lists into token-budgeted chunks and runs them with a bounded
+number of requests in flight.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Rough characters-per-token ratio for English/JSON payloads
+CHARS_PER_TOKEN = 4
+
+
+def get_int_env(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        logger.warning("⚠️  Invalid value for %s: %r. Using default %s.", name, value, default)
+        return default
+
+
+def get_float_env(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("⚠️  Invalid value for %s: %r. Using default %s.", name, value, default)
+        return default
+
+
+def get_bool_env(name: str, default: bool) -> bool:
+    """Read a true/false setting from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_max_concurrency() -> int:
+    """Maximum number of LLM requests allowed in flight (LLM_MAX_CONCURRENCY)."""
+    return max(get_int_env("LLM_MAX_CONCURRENCY", 4), 1)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used to size batches."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_by_token_budget(
+    records: List[Dict[str, Any]],
+    max_tokens: int,
+    serialize: Callable[[Any], str] = str,
+    max_items: Optional[int] = None,
+    count_tokens: Callable[[str], int] = estimate_tokens
+) -> List[List[Dict[str, Any]]]:
+    """
+    Split records into consecutive batches whose serialized size, measured
+    with count_tokens, stays within max_tokens. A single record larger than
+    the budget gets its own batch.
+    Input order is preserved across and within batches.
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+
+    for record in records:
+        record_tokens = count_tokens(serialize(record))
+        over_budget = current and current_tokens + record_tokens > max_tokens
+        over_count = max_items is not None and len(current) >= max_items
+        if over_budget or over_count:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(record)
+        current_tokens += record_tokens
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def run_batches(chain, inputs: List[Dict[str, Any]], max_concurrency: Optional[int] = None) -> List[Any]:
+    """
+    Run a chain over many inputs with at most max_concurrency calls in flight.
+    Results are returned in input order; failed batches are returned as the
+    raised exception so callers can degrade per batch.
+    """
+    if not inputs:
+        return []
+    return chain.batch(
+        inputs,
+        config={"max_concurrency": max_concurrency or get_max_concurrency()},
+        return_exceptions=True
+    )
+
+
+async def stream_batches(
+    chain,
+    inputs: List[Dict[str, Any]],
+    max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run a chain over many inputs through the async API and yield
+    (index, result) pairs as each call completes. At most max_concurrency
+    calls are in flight; failures are yielded as the raised exception.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or get_max_concurrency())
+
+    async def run_one(index: int, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        async with semaphore:
+            try:
+                return index, await chain.ainvoke(payload)
+            except Exception as e:
+                return index, e
+
+    tasks = [asyncio.ensure_future(run_one(i, payload)) for i, payload in enumerate(inputs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def run_sync(coro):
+    """
+    Run a coroutine from synchronous code.
+    Uses a helper thread when called from inside a running event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome["result"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
@@ -0,0 +1,98 @@
+"""
+Benchmark: list-of-dicts vs columnar (RecordTable) AgentState payloads.
+
+Writes synthetic products and pricing CSVs, then in a separate process per
+mode loads them the way the coordinator does and runs the pricing path
+(build_pricing_index + pricing_agent with the vectorized engine). Reports
+load time, node time, checkpoint size of product_data and peak RSS.
+
+Usage:
+    cd backend
+    python benchmarks/bench_columnar_state.py --rows 100000 500000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from data_loader import load_sample_data
+
+TITLES = ["Slim Fit T-shirt", "Coffee Press", "Ceramic Mug", "Yoga Mat", "Desk Lamp", "Cook Set"]
+
+
+def write_csvs(data_dir: str, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    with open(os.path.join(data_dir, "products_raw.csv"), "w") as products, \
+            open(os.path.join(data_dir, "pricing_context.csv"), "w") as pricing:
+        products.write("product_id,title,category,price,cost,attributes,description\n")
+        pricing.write("product_id,competitor_avg_price,trend\n")
+        for i in range(rows):
+            price = round(rng.uniform(10, 300), 2)
+            products.write(
+                f"{i},{rng.choice(TITLES)},Kitchen,{price},{round(price * 0.55, 2)},"
+                f"color=blk,A popular item number {i}.\n"
+            )
+            if i % 2 == 0:
+                pricing.write(f"{i},{int(price * 0.8)}-{int(price * 1.2)},stable\n")
+    with open(os.path.join(data_dir, "customer_messages.csv"), "w") as messages:
+        messages.write("message_id,channel,message\n1,email,Where is my order?\n")
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(columnar: bool, data_dir: str, results) -> None:
+    os.environ["PRICING_ENGINE"] = "vectorized"
+    from agents.pricing_agent import pricing_agent
+    from columnar import ColumnarSerializer
+
+    start = time.perf_counter()
+    products, _, pricing = load_sample_data(data_dir=data_dir, columnar=columnar)
+    load_time = time.perf_counter() - start
+
+    # Pricing reads product_data when there is no normalized catalog
+    state = {"product_data": products, "pricing_context": pricing, "sentiment_score": 0.1}
+    start = time.perf_counter()
+    proposals = pricing_agent(state)["pricing_proposals"]
+    node_time = time.perf_counter() - start
+
+    checkpoint_mb = len(ColumnarSerializer().dumps_typed(products)[1]) / 1e6
+    mode = "columnar" if columnar else "dicts"
+    results.put((mode, load_time, node_time, checkpoint_mb, len(proposals), peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 500000])
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("COLUMNAR STATE BENCHMARK (list of dicts vs RecordTable)")
+    print("=" * 70)
+    print(f"{'rows':>9}{'mode':>10}{'load (s)':>10}{'pricing (s)':>13}{'ckpt (MB)':>11}{'peak RSS (MB)':>15}")
+
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as data_dir:
+            write_csvs(data_dir, rows)
+            results = multiprocessing.Queue()
+            for columnar in (False, True):
+                proc = multiprocessing.Process(target=run_mode, args=(columnar, data_dir, results))
+                proc.start()
+                mode, load_time, node_time, checkpoint_mb, count, rss = results.get()
+                proc.join()
+                print(f"{rows:>9}{mode:>10}{load_time:>10.3f}{node_time:>13.3f}{checkpoint_mb:>11.1f}{rss:>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
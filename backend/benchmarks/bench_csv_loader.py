@@ -0,0 +1,93 @@
+"""
+Benchmark: streaming CSV batches vs a full read_csv + to_dict('records').
+
+Writes a synthetic products CSV (salla-style rows, including dirty prices),
+then measures time to first batch, total time and peak RSS of each mode in a
+separate process, so one mode's memory does not leak into the other.
+
+Usage:
+    cd backend
+    python benchmarks/bench_csv_loader.py --rows 2000000 --batch-size 50000
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from data_loader import iter_csv_batches, DATASET_DTYPES
+
+TITLES = ["Slim Fit T-shirt", "Coffee Press", "Ceramic Mug", "Yoga Mat", "Desk Lamp", "Cook Set"]
+PRICES = ["49.99", "ninety", "unknown", "129.5", "35", "19.99 USD"]
+
+
+def write_products_csv(path: str, rows: int, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("product_id,title,category,price,cost,attributes,description\n")
+        for i in range(rows):
+            f.write(
+                f"{1000 + i},{rng.choice(TITLES)},Kitchen & Dining,{rng.choice(PRICES)},"
+                f"{rng.randint(5, 80)},color=blk; size=L,A popular item number {i}.\n"
+            )
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_full(path: str, batch_size: int, results) -> None:
+    import pandas as pd
+    start = time.perf_counter()
+    records = pd.read_csv(path, dtype=DATASET_DTYPES["products"]).to_dict('records')
+    elapsed = time.perf_counter() - start
+    results.put(("full", elapsed, elapsed, len(records), peak_rss_mb()))
+
+
+def run_streaming(path: str, batch_size: int, results) -> None:
+    start = time.perf_counter()
+    first = None
+    rows = 0
+    for batch in iter_csv_batches(path, batch_size, DATASET_DTYPES["products"]):
+        if first is None:
+            first = time.perf_counter() - start
+        rows += len(batch)
+    results.put(("streaming", first, time.perf_counter() - start, rows, peak_rss_mb()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "products_raw.csv")
+        write_products_csv(path, args.rows)
+        size_mb = os.path.getsize(path) / 1e6
+
+        print("\n" + "=" * 70)
+        print(f"CSV LOADER BENCHMARK ({args.rows:,} rows, {size_mb:.0f} MB, batch size {args.batch_size:,})")
+        print("=" * 70)
+        print(f"{'Mode':<12}{'first batch (s)':>17}{'total (s)':>12}{'rows':>12}{'peak RSS (MB)':>16}")
+
+        results = multiprocessing.Queue()
+        for target in (run_full, run_streaming):
+            proc = multiprocessing.Process(target=target, args=(path, args.batch_size, results))
+            proc.start()
+            mode, first, total, rows, rss = results.get()
+            proc.join()
+            print(f"{mode:<12}{first:>17.3f}{total:>12.3f}{rows:>12,}{rss:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
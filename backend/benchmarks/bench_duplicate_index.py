@@ -0,0 +1,80 @@
+"""
+Benchmark: catalog-wide near-duplicate index (agents/duplicate_index.py).
+
+Builds synthetic catalogs where a share of the products are re-listed with a
+small edit (one title word changed, punctuation and case shuffled), indexes
+them with find_duplicate_clusters and reports time per SKU, how many planted
+duplicates were found and how many unrelated products were clustered. Time
+per SKU should stay flat as the catalog grows.
+
+Usage:
+    cd backend
+    python benchmarks/bench_duplicate_index.py --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agents.duplicate_index import find_duplicate_clusters
+
+
+def make_catalog(size: int, duplicate_share: float, seed: int = 7):
+    """size products, the last duplicate_share of them edited copies of earlier ones."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+             for _ in range(50_000)]
+    originals = size - int(size * duplicate_share)
+    products = [{
+        "product_id": i,
+        "title": " ".join(rng.choices(words, k=rng.randint(2, 5))).title(),
+        "attributes": f"color={rng.choice(words)};size={rng.randint(1, 50)}",
+        "description": " ".join(rng.choices(words, k=rng.randint(8, 30))) + "."
+    } for i in range(originals)]
+    planted = []
+    for i in range(originals, size):
+        source = rng.randrange(originals)
+        copy = dict(products[source], product_id=i)
+        copy["title"] = copy["title"].rsplit(" ", 1)[0].upper() + " " + rng.choice(words)
+        copy["description"] = copy["description"].replace(" ", ", ", 1)
+        products.append(copy)
+        planted.append((source, i))
+    return products, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--duplicate-share", type=float, default=0.05, help="Share of products that are edited copies")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("DUPLICATE INDEX BENCHMARK (MinHash + LSH)")
+    print("=" * 70)
+    print(f"{'SKUs':>10}{'index (s)':>12}{'µs / SKU':>10}{'clusters':>10}{'recall':>9}{'false':>8}{'peak MB':>10}")
+
+    for size in args.sizes:
+        products, planted = make_catalog(size, args.duplicate_share)
+        start = time.perf_counter()
+        clusters, _ = find_duplicate_clusters(products)
+        elapsed = time.perf_counter() - start
+
+        cluster_of = {position: n for n, cluster in enumerate(clusters) for position in cluster}
+        found = sum(1 for source, copy in planted if copy in cluster_of and cluster_of.get(source) == cluster_of[copy])
+        recall = found / len(planted) if planted else 1.0
+        # Members that are neither a planted copy nor the source of one
+        related = {position for pair in planted for position in pair}
+        false_members = sum(1 for position in cluster_of if position not in related)
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{size:>10}{elapsed:>12.2f}{elapsed / size * 1e6:>10.1f}{len(clusters):>10}"
+              f"{recall:>9.1%}{false_members:>8}{peak_mb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Benchmark: end-to-end graph runs at catalog scale with the fake LLM.
+
+Synthesizes a merchant at each scale (1k, 10k, 100k, 1M products by default)
+by resampling the rows of data/salla_data. Products, messages and pricing
+context follow the sample distributions, including dirty prices and
+ambiguous messages. It then runs graph.app on it with the deterministic fake
+chat model (LLM_PROVIDER=fake, fixed latency ± jitter). Each scale runs in
+its own process, so peak RSS is per scale.
+
+Reports, per scale, graph latency percentiles, products/s, peak RSS, LLM
+calls and tokens, then per-node latency and LLM calls taken from the node
+metrics (see instrumentation.py). With --baseline, results are compared
+against a stored run. The script exits with status 1 if latency or memory
+grew by more than --tolerance, or if the LLM call count changed.
+
+Usage:
+    cd backend
+    python benchmarks/bench_end_to_end.py --scales 1000 10000 --runs 3
+    python benchmarks/bench_end_to_end.py --scales 1000 10000 --save-baseline
+    python benchmarks/bench_end_to_end.py --scales 1000 10000 --baseline benchmarks/baselines/end_to_end.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+import numpy as np
+import pandas as pd
+
+SAMPLE_DIR = backend_dir.parent / "data" / "salla_data"
+DEFAULT_BASELINE = backend_dir / "benchmarks" / "baselines" / "end_to_end.json"
+SCALES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Latency differences below this are noise on a shared machine
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def synthesize_merchant(data_dir: str, products: int, messages: int, seed: int = 7) -> None:
+    """Resample the salla_data CSVs to the given row counts with fresh, linked IDs."""
+    def resample(name: str, rows: int) -> pd.DataFrame:
+        frame = pd.read_csv(SAMPLE_DIR / name, dtype=str, keep_default_na=False)
+        return frame.sample(n=rows, replace=True, random_state=seed).reset_index(drop=True)
+
+    catalog = resample("products_raw.csv", products)
+    catalog["product_id"] = np.arange(1000, 1000 + products)
+    catalog.to_csv(os.path.join(data_dir, "products_raw.csv"), index=False)
+
+    # Pricing context covers the same products as the catalog
+    pricing = resample("pricing_context.csv", products)
+    pricing["product_id"] = catalog["product_id"]
+    pricing.to_csv(os.path.join(data_dir, "pricing_context.csv"), index=False)
+
+    inbox = resample("customer_messages.csv", messages)
+    inbox["message_id"] = np.arange(1, messages + 1)
+    inbox.to_csv(os.path.join(data_dir, "customer_messages.csv"), index=False)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(values) -> dict:
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) if len(values) else (0.0, 0.0, 0.0)
+    return {"p50_seconds": round(float(p50), 4), "p95_seconds": round(float(p95), 4),
+            "p99_seconds": round(float(p99), 4)}
+
+
+def run_scale(scale: int, data_dir: str, runs: int, env: dict, results) -> None:
+    """Run graph.app `runs` times on one synthesized merchant (in a fresh process)."""
+    events_path = os.path.join(data_dir, "events.jsonl")
+    os.environ.update(env)
+    os.environ.update({
+        "DATA_DIR": data_dir,
+        "PRODUCT_ROW_LIMIT": "0",
+        "MESSAGE_ROW_LIMIT": "0",
+        "PRICING_ROW_LIMIT": "0",
+        "METRICS_EVENTS_PATH": events_path,
+        # Quiet production logging; node progress lines would dominate at 100k+ rows
+        "LOG_LEVEL": "WARNING"
+    })
+
+    from fake_llm import FAKE_LLM_STATS
+    from graph import app
+
+    walls, llm_calls, prompt_tokens, completion_tokens = [], [], [], []
+    nodes = {}
+    for run in range(runs):
+        calls_before = FAKE_LLM_STATS["calls"]
+        start = time.perf_counter()
+        state = app.invoke({"merchant_id": f"bench_{scale}_{run}"})
+        walls.append(time.perf_counter() - start)
+        llm_calls.append(FAKE_LLM_STATS["calls"] - calls_before)
+        llm = state["final_report"]["metrics"]["llm"]
+        prompt_tokens.append(llm["prompt_tokens"])
+        completion_tokens.append(llm["completion_tokens"])
+        for event in state["node_metrics"]:
+            node = nodes.setdefault(event["node"], {"walls": [], "llm_calls": [], "peak_rss_mb": 0.0})
+            node["walls"].append(event["wall_seconds"])
+            node["llm_calls"].append(event["llm"]["llm_calls"])
+            node["peak_rss_mb"] = max(node["peak_rss_mb"], event["memory"]["peak_rss_mb"])
+
+    with open(events_path) as f:
+        call_seconds = [event["seconds"] for event in map(json.loads, f) if event["event"] == "llm_call"]
+
+    results.put({
+        "scale": scale,
+        "graph": {
+            **percentiles(walls),
+            "products_per_second": round(scale / float(np.median(walls)), 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "llm_calls": int(np.median(llm_calls)),
+            "prompt_tokens": int(np.median(prompt_tokens)),
+            "completion_tokens": int(np.median(completion_tokens)),
+            "llm_call_latency": percentiles(call_seconds)
+        },
+        "nodes": {
+            name: {
+                **percentiles(node["walls"]),
+                "llm_calls": int(np.median(node["llm_calls"])),
+                "peak_rss_mb": node["peak_rss_mb"]
+            }
+            for name, node in nodes.items()
+        }
+    })
+
+
+def benchmark_scale(scale: int, runs: int, messages_ratio: float, env: dict) -> dict:
+    with tempfile.TemporaryDirectory() as data_dir:
+        synthesize_merchant(data_dir, scale, max(int(scale * messages_ratio), 1))
+        results = multiprocessing.get_context("spawn").Queue()
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_scale, args=(scale, data_dir, runs, env, results)
+        )
+        process.start()
+        result = results.get()
+        process.join()
+        return result
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Describe every metric that regressed against the baseline."""
+    regressions = []
+
+    def check(label, current, previous, key, minimum=0.0):
+        if previous is None or key not in previous:
+            return
+        if current[key] > previous[key] * (1 + tolerance) and current[key] - previous[key] > minimum:
+            regressions.append(f"{label} {key}: {previous[key]} -> {current[key]}")
+
+    for scale, result in results.items():
+        previous = baseline.get(scale)
+        if previous is None:
+            continue
+        graph, old_graph = result["graph"], previous["graph"]
+        check(f"{scale} graph", graph, old_graph, "p50_seconds", MIN_REGRESSION_SECONDS)
+        check(f"{scale} graph", graph, old_graph, "peak_rss_mb")
+        if graph["llm_calls"] != old_graph["llm_calls"]:
+            regressions.append(f"{scale} graph llm_calls: {old_graph['llm_calls']} -> {graph['llm_calls']}")
+        for name, node in result["nodes"].items():
+            check(f"{scale} {name}", node, previous["nodes"].get(name), "p50_seconds", MIN_REGRESSION_SECONDS)
+    return regressions
+
+
+def print_report(results: dict) -> None:
+    print("\n" + "=" * 70)
+    print("END-TO-END BENCHMARK (graph.app, fake LLM)")
+    print("=" * 70)
+    print(f"{'Products':>10}{'p50 (s)':>10}{'p95 (s)':>10}{'p99 (s)':>10}{'prod/s':>11}"
+          f"{'peak MB':>10}{'LLM calls':>11}{'tokens':>11}")
+    for scale, result in results.items():
+        graph = result["graph"]
+        tokens = graph["prompt_tokens"] + graph["completion_tokens"]
+        print(f"{int(scale):>10,}{graph['p50_seconds']:>10.2f}{graph['p95_seconds']:>10.2f}"
+              f"{graph['p99_seconds']:>10.2f}{graph['products_per_second']:>11,.0f}"
+              f"{graph['peak_rss_mb']:>10.0f}{graph['llm_calls']:>11,}{tokens:>11,}")
+
+    for scale, result in results.items():
+        call = result["graph"]["llm_call_latency"]
+        print(f"\n{int(scale):,} products (LLM call p50 {call['p50_seconds'] * 1000:.0f} ms, "
+              f"p95 {call['p95_seconds'] * 1000:.0f} ms)")
+        print(f"  {'Node':<16}{'p50 (s)':>10}{'p95 (s)':>10}{'LLM calls':>11}{'peak MB':>10}")
+        for name, node in result["nodes"].items():
+            print(f"  {name:<16}{node['p50_seconds']:>10.3f}{node['p95_seconds']:>10.3f}"
+                  f"{node['llm_calls']:>11,}{node['peak_rss_mb']:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES), help="Products per merchant")
+    parser.add_argument("--runs", type=int, default=3, help="Graph runs per scale")
+    parser.add_argument("--messages-ratio", type=float, default=1.0, help="Customer messages per product")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Fake LLM latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="Fake LLM latency jitter")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"Write the results as the new baseline (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown/growth")
+    args = parser.parse_args()
+
+    # Fake LLM, no cross-run caches, so every run does the same work
+    env = {
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MS": str(args.latency_ms),
+        "FAKE_LLM_JITTER_MS": str(args.jitter_ms),
+        "LLM_CACHE_ENABLED": "false",
+        "CATALOG_STORE_ENABLED": "false",
+        "CHECKPOINT_ENABLED": "false",
+        "INSTRUMENTATION_ENABLED": "true"
+    }
+    results = {}
+    for scale in args.scales:
+        print(f"Running {scale:,} products x {args.runs} runs...")
+        results[str(scale)] = benchmark_scale(scale, args.runs, args.messages_ratio, env)
+    print_report(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.save_baseline), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\n❌ Regressions against the baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
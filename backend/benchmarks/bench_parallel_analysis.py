@@ -0,0 +1,73 @@
+"""
+Benchmark: sequential vs parallel Support/Catalog analysis.
+
+Runs the full graph with the deterministic fake LLM (LLM_PROVIDER=fake) and
+compares end-to-end latency of the serial topology against the fan-out one.
+With a fixed per-call latency the parallel graph should take roughly
+max(support, catalog) instead of their sum.
+
+Usage:
+    cd backend
+    python benchmarks/bench_parallel_analysis.py --latency-ms 500 --runs 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+def configure_environment(latency_ms: float) -> None:
+    """Route every LLM call to the fake model and disable local shortcuts."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = "0"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["CATALOG_STORE_ENABLED"] = "false"
+    os.environ["SUPPORT_PRECLASSIFIER_ENABLED"] = "false"
+
+
+def time_runs(app, runs: int) -> list:
+    durations = []
+    for i in range(runs):
+        start = time.perf_counter()
+        app.invoke({"merchant_id": f"bench_{i}"})
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=500, help="Fake LLM latency per call")
+    parser.add_argument("--runs", type=int, default=3, help="Graph runs per topology")
+    args = parser.parse_args()
+
+    configure_environment(args.latency_ms)
+
+    from graph import build_workflow
+
+    serial_app = build_workflow(parallel_analysis=False).compile()
+    parallel_app = build_workflow(parallel_analysis=True).compile()
+
+    serial = time_runs(serial_app, args.runs)
+    parallel = time_runs(parallel_app, args.runs)
+
+    serial_median = statistics.median(serial)
+    parallel_median = statistics.median(parallel)
+
+    print("\n" + "=" * 70)
+    print(f"PARALLEL ANALYSIS BENCHMARK (fake LLM latency {args.latency_ms:.0f} ms, {args.runs} runs)")
+    print("=" * 70)
+    print(f"{'Topology':<12}{'median (s)':>12}{'min (s)':>12}{'max (s)':>12}")
+    print(f"{'serial':<12}{serial_median:>12.3f}{min(serial):>12.3f}{max(serial):>12.3f}")
+    print(f"{'parallel':<12}{parallel_median:>12.3f}{min(parallel):>12.3f}{max(parallel):>12.3f}")
+    print(f"\nSpeedup: {serial_median / parallel_median:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark: per-product loop vs columnar pricing engine.
+
+Times price_products_loop and price_products_vectorized on the same synthetic
+catalogs (half the SKUs with a competitor row) and checks that both produce
+identical proposals.
+
+Usage:
+    cd backend
+    python benchmarks/bench_pricing_engine.py --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agents.pricing_agent import price_products_loop
+from agents.pricing_engine import price_products_vectorized
+
+
+def make_catalog(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    products = []
+    index = {}
+    for i in range(size):
+        price = round(rng.uniform(10, 300), 2)
+        products.append({"id": str(i), "name": f"SKU {i}", "price": price, "cost": round(price * rng.uniform(0.4, 1.0), 2)})
+        if i % 2 == 0:
+            index[str(i)] = round(price * rng.uniform(0.7, 1.3), 2)
+    return products, index
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--sentiment", type=float, default=0.1, help="Sentiment score passed to both engines")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("PRICING ENGINE BENCHMARK (loop vs vectorized)")
+    print("=" * 70)
+    print(f"{'SKUs':>10}{'loop (s)':>12}{'vectorized (s)':>16}{'speedup':>10}{'identical':>11}")
+
+    for size in args.sizes:
+        products, index = make_catalog(size)
+        loop_time, expected = timed(price_products_loop, products, index, args.sentiment)
+        vector_time, actual = timed(price_products_vectorized, products, index, args.sentiment)
+        print(f"{size:>10}{loop_time:>12.3f}{vector_time:>16.3f}{loop_time / vector_time:>9.2f}x{str(actual == expected):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: indexed competitor lookup in the Pricing Agent.
+
+Times pricing_agent + validator_node over synthetic catalogs where every
+product has a pricing_context row, and compares against the previous
+per-product linear scan at the sizes where that is still feasible. Time per
+SKU should stay flat as the catalog grows.
+
+Usage:
+    cd backend
+    python benchmarks/bench_pricing_index.py --sizes 1000 10000 100000
+"""
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agents.pricing_agent import build_pricing_index, pricing_agent
+from nodes import validator_node
+
+
+def make_state(size: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    products = []
+    context = []
+    for i in range(size):
+        price = round(rng.uniform(10, 300), 2)
+        products.append({"id": str(i), "name": f"SKU {i}", "price": price, "cost": round(price * 0.55, 2)})
+        context.append({"product_id": str(i), "competitor_price": round(price * rng.uniform(0.8, 1.2), 2)})
+    rng.shuffle(context)
+    return {"normalized_catalog": products, "pricing_context": context, "sentiment_score": 0.1}
+
+
+def linear_scan_lookup(state: dict) -> None:
+    """The previous O(products × context rows) competitor lookup."""
+    for product in state["normalized_catalog"]:
+        for ctx in state["pricing_context"]:
+            if ctx.get("product_id") == product["id"]:
+                float(ctx.get("competitor_price", 0))
+                break
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    return time.perf_counter() - start
+
+
+def run_indexed(state: dict) -> None:
+    # As in the graph: the coordinator indexes the context, pricing and validator reuse it
+    state = dict(state, pricing_index=build_pricing_index(state["pricing_context"]))
+    state.update(pricing_agent(state))
+    validator_node(state)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--max-linear", type=int, default=5000, help="Largest size to time the linear scan at")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("PRICING INDEX BENCHMARK (pricing_agent + validator_node)")
+    print("=" * 70)
+    print(f"{'SKUs':>10}{'indexed (s)':>14}{'µs / SKU':>12}{'linear scan (s)':>18}")
+
+    for size in args.sizes:
+        state = make_state(size)
+        indexed = timed(run_indexed, state)
+        linear = f"{timed(linear_scan_lookup, state):>18.3f}" if size <= args.max_linear else f"{'skipped':>18}"
+        print(f"{size:>10}{indexed:>14.3f}{indexed / size * 1e6:>12.1f}{linear}")
+
+
+if __name__ == "__main__":
+    main()
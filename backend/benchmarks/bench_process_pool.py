@@ -0,0 +1,84 @@
+"""
+Benchmark: in-process vs process-pool CPU-bound nodes across merchants.
+
+Runs the batch runner over several merchants at once with the deterministic
+fake LLM, first with every node on the event loop's threads, then with the
+coordinator, pricing, validator and resolver nodes in the process pool
+(CPU_POOL_ENABLED). Reports wall time and merchants/min for each mode. The
+speedup grows with the number of cores; on a single core the pool only adds
+its dispatch overhead.
+
+Usage:
+    cd backend
+    python benchmarks/bench_process_pool.py --merchants 16 --products 0
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+def configure_environment(products: int, columnar: bool) -> None:
+    """Fake LLM without latency, full local data, no cross-run caches."""
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY_MS"] = "0"
+    os.environ["FAKE_LLM_JITTER_MS"] = "0"
+    os.environ["LLM_CACHE_ENABLED"] = "false"
+    os.environ["CATALOG_STORE_ENABLED"] = "false"
+    os.environ["PRODUCT_ROW_LIMIT"] = str(products)
+    os.environ["COLUMNAR_STATE"] = "true" if columnar else "false"
+    os.environ.setdefault("DATA_DIR", str(backend_dir.parent / "data" / "salla_data"))
+
+
+def time_batch(cpu_pool: bool, merchants: int) -> float:
+    from batch_runner import run_batch
+    from graph import build_workflow
+
+    app = build_workflow(cpu_pool=cpu_pool).compile()
+    entries = [{"merchant_id": f"bench_{i}", "data_dir": ""} for i in range(merchants)]
+    with tempfile.TemporaryDirectory() as output:
+        start = time.perf_counter()
+        asyncio.run(run_batch(entries, output, concurrency=merchants, app=app))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--merchants", type=int, default=16, help="Merchants run concurrently")
+    parser.add_argument("--products", type=int, default=0, help="PRODUCT_ROW_LIMIT per merchant (0 = all)")
+    parser.add_argument("--columnar", action="store_true", help="Use COLUMNAR_STATE (shared-memory columns)")
+    args = parser.parse_args()
+
+    configure_environment(args.products, args.columnar)
+
+    from process_pool import get_process_pool, shutdown_process_pools
+
+    # Start the workers up front so spawn time is not billed to the first merchant
+    pool = get_process_pool()
+    list(pool.map(abs, range(pool._max_workers)))
+
+    in_process = time_batch(cpu_pool=False, merchants=args.merchants)
+    pooled = time_batch(cpu_pool=True, merchants=args.merchants)
+    shutdown_process_pools()
+
+    print("\n" + "=" * 70)
+    print(f"PROCESS POOL BENCHMARK ({args.merchants} merchants, {os.cpu_count()} CPUs, "
+          f"{pool._max_workers} workers)")
+    print("=" * 70)
+    print(f"{'Mode':<14}{'wall (s)':>12}{'merchants/min':>16}")
+    for mode, seconds in (("in-process", in_process), ("process pool", pooled)):
+        print(f"{mode:<14}{seconds:>12.2f}{args.merchants / seconds * 60:>16.1f}")
+    print(f"\nSpeedup: {in_process / pooled:.2f}x")
+    if (os.cpu_count() or 1) < 2:
+        print("Single CPU: this measures dispatch overhead only; multi-core scaling was not measured.")
+
+
+if __name__ == "__main__":
+    main()
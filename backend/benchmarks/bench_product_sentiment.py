@@ -0,0 +1,74 @@
+"""
+Benchmark: per-product sentiment aggregation (agents/product_sentiment.py).
+
+Builds synthetic catalogs (titles from a random vocabulary, each title listed
+under a few product IDs) and message sets that mention a product title, a
+stray title word, or no product at all, then times the keyword index build
+and aggregate_product_sentiment end to end. 5k products x 5k messages should
+take a fraction of a second.
+
+Usage:
+    cd backend
+    python benchmarks/bench_product_sentiment.py --sizes 5000 50000 500000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agents.product_sentiment import ProductKeywordIndex, aggregate_product_sentiment
+
+FILLER = ["Where is my order?", "The {} broke after a week.", "Love my new {}!", "Is the {} in stock?"]
+
+
+def make_data(size: int, seed: int = 7):
+    """size products and size messages; 3 IDs per title, 80% of messages name a title."""
+    rng = random.Random(seed)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+             for _ in range(max(1000, size // 2))]
+    titles = [" ".join(rng.choices(words, k=rng.randint(2, 4))).title() for _ in range(max(1, size // 3))]
+    products = [{"product_id": i, "title": titles[i % len(titles)]} for i in range(size)]
+    messages = []
+    classifications = []
+    for i in range(size):
+        roll = rng.random()
+        mention = rng.choice(titles) if roll < 0.8 else rng.choice(words) if roll < 0.9 else ""
+        messages.append({"message_id": i, "message": rng.choice(FILLER).format(mention.lower())})
+        complaint = rng.random() < 0.3
+        classifications.append({"id": str(i), "type": "Complaint" if complaint else "Inquiry",
+                                "sentiment": "negative" if complaint else "neutral"})
+    return products, messages, classifications
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000, 500_000],
+                        help="Products (and messages) per run")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("PRODUCT SENTIMENT BENCHMARK (products x messages)")
+    print("=" * 70)
+    print(f"{'size':>10}{'index (ms)':>12}{'aggregate (ms)':>16}{'µs / msg':>10}{'products':>10}")
+
+    for size in args.sizes:
+        products, messages, classifications = make_data(size)
+        start = time.perf_counter()
+        index = ProductKeywordIndex(products)
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        product_sentiment = aggregate_product_sentiment(products, messages, classifications, index)
+        aggregated = time.perf_counter() - start
+
+        print(f"{size:>10}{indexed * 1000:>12.0f}{aggregated * 1000:>16.0f}"
+              f"{aggregated / size * 1e6:>10.1f}{len(product_sentiment):>10}")
+
+
+if __name__ == "__main__":
+    main()
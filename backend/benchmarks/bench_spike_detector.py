@@ -0,0 +1,79 @@
+"""
+Benchmark: streaming complaint-spike detector (agents/spike_detector.py).
+
+Times ComplaintSpikeDetector.observe() on a synthetic event stream, and
+detect_complaint_spikes() end to end on message rows (timestamp parsing,
+topic keywords, sorting). Both should stay in the millions of events per
+minute on one core, with time per event flat as the stream grows.
+
+Usage:
+    cd backend
+    python benchmarks/bench_spike_detector.py --events 100000 1000000 5000000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from agents.spike_detector import ComplaintSpikeDetector, detect_complaint_spikes
+
+CHANNELS = ["email", "chat", "in-app", "whatsapp", "phone"]
+TEXTS = [
+    "My order is delayed again, terrible delivery!",
+    "Refund me, the blender stopped working.",
+    "Do you have this in blue?",
+    "Prices keep increasing every week.",
+    "Great product, thanks!",
+]
+
+
+def make_messages(count: int, per_second: float, seed: int = 7):
+    rng = random.Random(seed)
+    start = 1_700_000_000
+    messages = []
+    classifications = []
+    for i in range(count):
+        text = rng.choice(TEXTS)
+        messages.append({"message_id": i, "channel": rng.choice(CHANNELS), "message": text,
+                         "timestamp": start + i / per_second})
+        classifications.append({"id": str(i), "type": "Complaint" if rng.random() < 0.15 else "Inquiry"})
+    return messages, classifications
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--per-second", type=float, default=50.0, help="Message arrival rate")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 70)
+    print("SPIKE DETECTOR BENCHMARK")
+    print("=" * 70)
+    print(f"{'events':>10}{'observe (s)':>13}{'M ev/min':>10}{'end-to-end (s)':>16}{'M ev/min':>10}")
+
+    for count in args.events:
+        messages, classifications = make_messages(count, args.per_second)
+        complaint = {c["id"]: c["type"] == "Complaint" for c in classifications}
+
+        detector = ComplaintSpikeDetector()
+        start = time.perf_counter()
+        for message in messages:
+            detector.observe(message["timestamp"], complaint[str(message["message_id"])],
+                             message["channel"], "delivery")
+        observe = time.perf_counter() - start
+
+        start = time.perf_counter()
+        detect_complaint_spikes(messages, classifications)
+        end_to_end = time.perf_counter() - start
+
+        print(f"{count:>10}{observe:>13.2f}{count / observe * 60 / 1e6:>10.1f}"
+              f"{end_to_end:>16.2f}{count / end_to_end * 60 / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Per-product fingerprint store for incremental catalog normalization.
+
+Keeps, per merchant and product_id, a fingerprint of the raw catalog row
+together with the normalized output and catalog issues produced for it, so
+only new or changed products need to go back through the LLM. The fingerprint
+also covers the normalizer (prompt template and model), so stored rows are
+redone after either changes.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from batching import get_bool_env
+
+
+DEFAULT_STORE_PATH = os.path.join(os.path.dirname(__file__), ".cache", "catalog_store.sqlite3")
+
+# Raw fields whose changes require re-normalization
+FINGERPRINT_FIELDS = ("title", "name", "category", "price", "cost", "attributes", "description")
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def product_key(product: Dict[str, Any]) -> Optional[str]:
+    """Stable string ID of a raw or normalized product row."""
+    pid = product.get("product_id", product.get("id"))
+    return None if pid is None else str(pid)
+
+
+def normalizer_key(prompt: str, model: Dict[str, Any]) -> str:
+    """Hash of the prompt template text and the provider/model that normalize products."""
+    material = json.dumps({"prompt": prompt, "model": model}, sort_keys=True, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def fingerprint(product: Dict[str, Any], normalizer: str = "") -> str:
+    """Hash of the raw fields that feed normalization and of the normalizer_key."""
+    material = json.dumps(
+        {"fields": {field: product.get(field) for field in FINGERPRINT_FIELDS}, "normalizer": normalizer},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class CatalogStore:
+    """SQLite-backed store of normalized products keyed by merchant and product ID."""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS catalog_products ("
+            " merchant_id TEXT NOT NULL,"
+            " product_id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " normalized TEXT NOT NULL,"
+            " issues TEXT NOT NULL,"
+            " confidence REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (merchant_id, product_id))"
+        )
+        self._conn.commit()
+
+    def load(self, merchant_id: str, product_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch stored entries for the given products."""
+        ids = list(dict.fromkeys(product_ids))
+        entries = {}
+        with self._lock:
+            for start in range(0, len(ids), _LOOKUP_CHUNK):
+                chunk = ids[start:start + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT product_id, fingerprint, normalized, issues, confidence FROM catalog_products"
+                    f" WHERE merchant_id = ? AND product_id IN ({placeholders})",
+                    (merchant_id, *chunk)
+                ).fetchall()
+                for product_id, fp, normalized, issues, confidence in rows:
+                    entries[product_id] = {
+                        "fingerprint": fp,
+                        "normalized": json.loads(normalized),
+                        "issues": json.loads(issues),
+                        "confidence": confidence,
+                    }
+        return entries
+
+    def save(self, merchant_id: str, entries: List[Tuple[str, str, List[Dict], List[Dict], float]]) -> None:
+        """Upsert (product_id, fingerprint, normalized, issues, confidence) entries."""
+        if not entries:
+            return
+        now = time.time()
+        rows = [
+            (merchant_id, pid, fp, json.dumps(normalized, default=str), json.dumps(issues, default=str), confidence, now)
+            for pid, fp, normalized, issues, confidence in entries
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO catalog_products"
+                " (merchant_id, product_id, fingerprint, normalized, issues, confidence, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    def clear(self, merchant_id: Optional[str] = None) -> None:
+        """Forget stored products for one merchant, or for everyone."""
+        with self._lock:
+            if merchant_id is None:
+                self._conn.execute("DELETE FROM catalog_products")
+            else:
+                self._conn.execute("DELETE FROM catalog_products WHERE merchant_id = ?", (merchant_id,))
+            self._conn.commit()
+
+
+_stores: Dict[str, CatalogStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_catalog_store() -> Optional[CatalogStore]:
+    """
+    Process-wide catalog store configured from the environment, or None when disabled.
+
+    Environment Variables:
+    - CATALOG_STORE_ENABLED: "true"/"false" (default: true)
+    - CATALOG_STORE_PATH: SQLite file (default: backend/.cache/catalog_store.sqlite3)
+    """
+    if not get_bool_env("CATALOG_STORE_ENABLED", True):
+        return None
+
+    path = os.getenv("CATALOG_STORE_PATH", DEFAULT_STORE_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = CatalogStore(path)
+        return _stores[path]
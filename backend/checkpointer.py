@@ -0,0 +1,442 @@
+"""
+SQLite-backed LangGraph checkpointer for resumable runs.
+
+Every superstep of a run is checkpointed to a local SQLite file, keyed by
+thread_id = "<merchant_id>:<run_id>" (see checkpoint_config). Re-invoking a
+thread whose run was interrupted (app.invoke(None, config)) resumes from the
+last completed node; writes of nodes that finished in a failed superstep are
+kept too, so e.g. a finished Catalog Agent is not re-run.
+
+Storage is compact: channel values are stored once per version (an unchanged
+product_data is not rewritten at every step), serialized with
+ColumnarSerializer and zlib-compressed above CHECKPOINT_COMPRESS_MIN_BYTES.
+Each thread keeps only its last CHECKPOINT_KEEP_LAST checkpoints, and
+compact() drops expired threads and unreferenced values.
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+from batching import get_bool_env, get_float_env, get_int_env
+from columnar import ColumnarSerializer
+
+
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), ".cache", "checkpoints.sqlite3")
+
+# Suffix marking zlib-compressed payload types
+_ZLIB_SUFFIX = "+zlib"
+
+
+def checkpoint_config(merchant_id: str, run_id: str) -> RunnableConfig:
+    """Graph config addressing the checkpoints of one merchant's run."""
+    return {"configurable": {"thread_id": f"{merchant_id}:{run_id}"}}
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """Checkpoint saver storing checkpoints, channel values and pending writes in SQLite."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CHECKPOINT_PATH,
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        keep_last: int = 2,
+        ttl_seconds: float = 7 * 24 * 3600,
+        compress_min_bytes: int = 4096,
+        compact_every: int = 500
+    ):
+        super().__init__(serde=serde or ColumnarSerializer())
+        self.path = path
+        self.keep_last = max(keep_last, 1)
+        self.ttl_seconds = ttl_seconds
+        self.compress_min_bytes = compress_min_bytes
+        self.compact_every = compact_every
+        self._puts = 0
+        self._lock = threading.RLock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Must precede table creation to take effect; lets compact() return freed pages
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+            " parent_checkpoint_id TEXT, type TEXT NOT NULL, checkpoint BLOB NOT NULL,"
+            " metadata_type TEXT NOT NULL, metadata BLOB NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id));"
+            "CREATE TABLE IF NOT EXISTS checkpoint_blobs ("
+            " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, channel TEXT NOT NULL,"
+            " version TEXT NOT NULL, type TEXT NOT NULL, blob BLOB NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, channel, version));"
+            "CREATE TABLE IF NOT EXISTS checkpoint_writes ("
+            " thread_id TEXT NOT NULL, checkpoint_ns TEXT NOT NULL, checkpoint_id TEXT NOT NULL,"
+            " task_id TEXT NOT NULL, idx INTEGER NOT NULL, channel TEXT NOT NULL,"
+            " type TEXT NOT NULL, blob BLOB NOT NULL, task_path TEXT NOT NULL,"
+            " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx));"
+        )
+        self._conn.commit()
+
+    # --- Serialization ---
+
+    def _dump(self, value: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(value)
+        if self.compress_min_bytes and len(data) >= self.compress_min_bytes:
+            return type_ + _ZLIB_SUFFIX, zlib.compress(data, 6)
+        return type_, data
+
+    def _load(self, type_: str, data: bytes) -> Any:
+        if type_.endswith(_ZLIB_SUFFIX):
+            type_, data = type_[:-len(_ZLIB_SUFFIX)], zlib.decompress(data)
+        return self.serde.loads_typed((type_, data))
+
+    # --- Reads ---
+
+    def _tuple(self, thread_id: str, checkpoint_ns: str, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint = self._load(type_, data)
+        channel_values = {}
+        for channel, version in checkpoint.get("channel_versions", {}).items():
+            blob = self._conn.execute(
+                "SELECT type, blob FROM checkpoint_blobs"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if blob is not None and blob[0] != "empty":
+                channel_values[channel] = self._load(*blob)
+
+        writes = self._conn.execute(
+            "SELECT task_id, idx, channel, type, blob, task_path FROM checkpoint_writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id
+            }},
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self._load(metadata_type, metadata),
+            parent_config=(
+                {"configurable": {
+                    "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id
+                }}
+                if parent_id else None
+            ),
+            pending_writes=[(task_id, channel, self._load(t, b)) for task_id, _, channel, t, b, _ in writes]
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+            " FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+        with self._lock:
+            if checkpoint_id:
+                row = self._conn.execute(
+                    query + " AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    query + " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)
+                ).fetchone()
+            return self._tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint,"
+            " metadata_type, metadata FROM checkpoints WHERE 1 = 1"
+        )
+        params: List[Any] = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(get_checkpoint_id(config))
+        if before and get_checkpoint_id(before):
+            query += " AND checkpoint_id < ?"
+            params.append(get_checkpoint_id(before))
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self._load(row[4], row[5])
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                tuples.append(self._tuple(thread_id, checkpoint_ns, tuple(row)))
+        yield from tuples
+
+    # --- Writes ---
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version),
+             *(self._dump(values[channel]) if channel in values else ("empty", b"")))
+            for channel, version in new_versions.items()
+        ]
+        type_, data = self._dump(checkpoint)
+        metadata_type, metadata_data = self._dump(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint_blobs"
+                " (thread_id, checkpoint_ns, channel, version, type, blob) VALUES (?, ?, ?, ?, ?, ?)",
+                blobs
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id,"
+                " parent_checkpoint_id, type, checkpoint, metadata_type, metadata, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 type_, data, metadata_type, metadata_data, time.time())
+            )
+            self._prune_thread(thread_id, checkpoint_ns, self.keep_last)
+            self._conn.commit()
+            self._puts += 1
+            if self.compact_every and self._puts % self.compact_every == 0:
+                self.compact()
+
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((idx, (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel,
+                               *self._dump(value), task_path)))
+        with self._lock:
+            for idx, row in rows:
+                # Regular writes are kept from the first attempt; special channels are overwritten
+                verb = "INSERT OR IGNORE" if idx >= 0 else "INSERT OR REPLACE"
+                self._conn.execute(
+                    f"{verb} INTO checkpoint_writes (thread_id, checkpoint_ns, checkpoint_id,"
+                    " task_id, idx, channel, type, blob, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row
+                )
+            self._conn.commit()
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # --- Retention ---
+
+    def _prune_thread(self, thread_id: str, checkpoint_ns: str, keep: int) -> None:
+        """Delete all but the newest keep checkpoints (and their writes) of a thread namespace."""
+        stale = [row[0] for row in self._conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, keep)
+        )]
+        for checkpoint_id in stale:
+            for table in ("checkpoints", "checkpoint_writes"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id)
+                )
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        with self._lock:
+            for thread_id in thread_ids:
+                if strategy == "delete":
+                    self.delete_thread(thread_id)
+                    continue
+                namespaces = [row[0] for row in self._conn.execute(
+                    "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                )]
+                for checkpoint_ns in namespaces:
+                    self._prune_thread(thread_id, checkpoint_ns, 1)
+            self._conn.commit()
+            self._collect_blobs()
+
+    def _collect_blobs(self) -> int:
+        """Delete channel values no remaining checkpoint refers to."""
+        referenced = set()
+        for thread_id, checkpoint_ns, type_, data in self._conn.execute(
+            "SELECT thread_id, checkpoint_ns, type, checkpoint FROM checkpoints"
+        ).fetchall():
+            for channel, version in self._load(type_, data).get("channel_versions", {}).items():
+                referenced.add((thread_id, checkpoint_ns, channel, str(version)))
+        stale = [
+            key for key in self._conn.execute(
+                "SELECT thread_id, checkpoint_ns, channel, version FROM checkpoint_blobs"
+            ).fetchall()
+            if key not in referenced
+        ]
+        self._conn.executemany(
+            "DELETE FROM checkpoint_blobs"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+            stale
+        )
+        self._conn.commit()
+        return len(stale)
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Apply the retention policy: drop threads idle for longer than
+        ttl_seconds, unreferenced channel values, and free their pages.
+        """
+        with self._lock:
+            expired = [row[0] for row in self._conn.execute(
+                "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created_at) < ?",
+                (time.time() - self.ttl_seconds,)
+            )] if self.ttl_seconds else []
+            for thread_id in expired:
+                self.delete_thread(thread_id)
+            blobs = self._collect_blobs()
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.commit()
+        return {"expired_threads": len(expired), "deleted_blobs": blobs}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Async API (SQLite calls run in a worker thread) ---
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuples = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in tuples:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = ""
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        return await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+
+_savers: Dict[str, SqliteCheckpointSaver] = {}
+_savers_lock = threading.Lock()
+
+
+def get_checkpointer() -> Optional[SqliteCheckpointSaver]:
+    """
+    Process-wide checkpointer configured from the environment, or None when disabled.
+
+    Environment Variables:
+    - CHECKPOINT_ENABLED: "true"/"false" (default: false)
+    - CHECKPOINT_DB_PATH: SQLite file (default: backend/.cache/checkpoints.sqlite3)
+    - CHECKPOINT_KEEP_LAST: Checkpoints kept per run (default: 2)
+    - CHECKPOINT_TTL_HOURS: Runs idle for longer are dropped by compact() (default: 168)
+    - CHECKPOINT_COMPRESS_MIN_BYTES: zlib-compress larger values, 0 = never (default: 4096)
+    - CHECKPOINT_COMPACT_EVERY: Run compact() every N checkpoints, 0 = never (default: 500)
+    """
+    if not get_bool_env("CHECKPOINT_ENABLED", False):
+        return None
+
+    path = os.getenv("CHECKPOINT_DB_PATH", DEFAULT_CHECKPOINT_PATH)
+    with _savers_lock:
+        if path not in _savers:
+            saver = SqliteCheckpointSaver(
+                path,
+                keep_last=get_int_env("CHECKPOINT_KEEP_LAST", 2),
+                ttl_seconds=get_float_env("CHECKPOINT_TTL_HOURS", 168) * 3600,
+                compress_min_bytes=get_int_env("CHECKPOINT_COMPRESS_MIN_BYTES", 4096),
+                compact_every=get_int_env("CHECKPOINT_COMPACT_EVERY", 500)
+            )
+            saver.compact()
+            _savers[path] = saver
+        return _savers[path]
@@ -0,0 +1,168 @@
+"""
+Columnar record tables for large AgentState payloads.
+
+A RecordTable keeps a dataset as one NumPy array per column and behaves like a
+read-only list of records: indexing yields a lightweight RecordView mapping
+over one row, and slices share the underlying arrays. Nodes that only need a
+few fields read whole columns with column_values() instead of walking
+per-row dicts.
+
+Set COLUMNAR_STATE=true to have the coordinator load product_data,
+customer_messages and pricing_context as tables. Compile the graph with a
+checkpointer using ColumnarSerializer to checkpoint them.
+"""
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+import ormsgpack
+import pandas as pd
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+class RecordView(Mapping):
+    """Read-only mapping over one row of a RecordTable."""
+
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: "RecordTable", row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._table._columns[key][self._row]
+        # NumPy scalars become plain Python values so reprs and JSON match dict rows
+        return value.item() if isinstance(value, np.generic) else value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table._columns)
+
+    def __len__(self) -> int:
+        return len(self._table._columns)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class RecordTable(Sequence):
+    """Column-oriented, read-only sequence of records."""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        self._columns = columns
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "RecordTable":
+        """Wrap a DataFrame's columns without building per-row dicts."""
+        return cls({str(name): frame[name].to_numpy() for name in frame.columns})
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "RecordTable":
+        """Build a table from dict rows; keys missing from a row become NaN."""
+        return cls.from_frame(pd.DataFrame.from_records(list(records)))
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the column buffers (object columns count their pointers only)."""
+        return sum(values.nbytes for values in self._columns.values())
+
+    def column(self, name: str) -> np.ndarray:
+        """The backing array of one column (shared, do not modify)."""
+        return self._columns[name]
+
+    def take(self, positions: Sequence[int]) -> "RecordTable":
+        """Rows at the given positions, as a new table."""
+        positions = np.asarray(positions, dtype=np.intp)
+        return RecordTable({name: values[positions] for name, values in self._columns.items()})
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Materialize plain dict rows, e.g. for JSON responses."""
+        return pd.DataFrame(self._columns, copy=False).to_dict('records')
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return RecordTable({name: values[index] for name, values in self._columns.items()})
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("RecordTable index out of range")
+        return RecordView(self, index)
+
+    def __iter__(self) -> Iterator[RecordView]:
+        for row in range(self._length):
+            yield RecordView(self, row)
+
+    def __add__(self, other):
+        # List reducers (operator.add) may concatenate tables with plain rows
+        if isinstance(other, RecordTable):
+            return concat_tables([self, other])
+        return self.to_records() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.to_records()
+
+    def __repr__(self) -> str:
+        return f"RecordTable(rows={self._length}, columns={self.columns})"
+
+
+def concat_tables(tables: List[RecordTable]) -> RecordTable:
+    """Concatenate tables row-wise; columns missing from a table become NaN."""
+    frames = [pd.DataFrame(table._columns, copy=False) for table in tables]
+    return RecordTable.from_frame(pd.concat(frames, ignore_index=True))
+
+
+def column_values(records: Sequence, name: str, default: Any = None) -> List[Any]:
+    """
+    One field of every record as a list. Reads the column directly for a
+    RecordTable and falls back to record.get(name, default) for dict rows.
+    """
+    if isinstance(records, RecordTable):
+        if name not in records.columns:
+            return [default] * len(records)
+        return records.column(name).tolist()
+    return [record.get(name, default) for record in records]
+
+
+# --- Checkpoint serialization ---
+
+def _encode_column(values: np.ndarray) -> Tuple[str, Any]:
+    if values.dtype == object:
+        return "O", values.tolist()
+    return values.dtype.str, np.ascontiguousarray(values).tobytes()
+
+
+def _decode_column(dtype: str, payload: Any) -> np.ndarray:
+    if dtype == "O":
+        column = np.empty(len(payload), dtype=object)
+        column[:] = payload
+        return column
+    return np.frombuffer(payload, dtype=np.dtype(dtype)).copy()
+
+
+class ColumnarSerializer(JsonPlusSerializer):
+    """
+    Checkpoint serializer that stores RecordTable channel values column by
+    column (numeric columns as raw buffers) and everything else as usual.
+    """
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, RecordTable):
+            payload = [(name, *_encode_column(values)) for name, values in obj._columns.items()]
+            return "columnar", ormsgpack.packb(payload)
+        return super().dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, data_ = data
+        if type_ == "columnar":
+            payload = ormsgpack.unpackb(data_)
+            return RecordTable({name: _decode_column(dtype, values) for name, dtype, values in payload})
+        return super().loads_typed(data)
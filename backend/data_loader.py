@@ -1,77 +1,411 @@
 """
 Data loader for sample datasets.
+
+CSVs are read in chunks (pd.read_csv(chunksize=...)) and yielded as record
+batches, so callers that only need the first N rows stop reading early and
+multi-million-row merchant exports never have to be materialized at once.
+
+Money and other dirty numeric columns ("49.99 USD", "ninety", "109–140")
+are parsed once per chunk with vectorized string ops into float columns;
+ranges also get _min/_max/_mid columns. Unparseable cells become NaN and
+are reported as load issues instead of silently turning into 0.
+
+With DATASET_CACHE_ENABLED=true, parsed datasets are kept in a process-wide
+cache keyed by file path, modification time and row limit, so a long-lived
+server reads each merchant's CSVs once instead of on every run.
 """
+import re
+import threading
+from collections import OrderedDict
 import pandas as pd
 import os
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Iterator, Iterable, Optional, Union, IO, Any
+from batching import get_bool_env, get_int_env
+from columnar import RecordTable
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+DATASET_FILES = {
+    "products": "products_raw.csv",
+    "messages": "customer_messages.csv",
+    "pricing": "pricing_context.csv",
+}
+
+# Free-text columns are always read as str so every batch has the same
+# column types (pandas otherwise infers dtypes per chunk).
+DATASET_DTYPES = {
+    "products": {
+        "title": str, "name": str, "category": str, "attributes": str, "description": str,
+        "price": str, "cost": str
+    },
+    "messages": {"channel": str, "message": str, "timestamp": str},
+    "pricing": {
+        "competitor_avg_price": str, "trend": str, "market_trend": str,
+        "baseline_price": str, "cost": str, "competitor_price": str
+    },
+}
+
+# Numeric columns parsed at load time; a range in one of these becomes its midpoint
+NUMERIC_FIELDS = {
+    "products": ("price", "cost"),
+    "messages": (),
+    "pricing": ("baseline_price", "cost", "competitor_price"),
+}
+
+# Range columns ("109–140", "44-52 USD") expanded into <col>_min/_max/_mid
+RANGE_FIELDS = {
+    "products": (),
+    "messages": (),
+    "pricing": ("competitor_avg_price",),
+}
 
+# Codes may follow the number without a space ("49.99usd")
+CURRENCY_PATTERN = r"(?:usd|sar|aed|eur|gbp|sr)\b|[$€£﷼]|ر\.?س"
+NUMBER_PATTERN = r"^(?P<low>\d+(?:\.\d+)?)(?:\s*(?:[-–—]|to)\s*(?P<high>\d+(?:\.\d+)?))?$"
 
-def load_sample_data() -> Tuple[List[Dict], List[Dict], List[Dict]]:
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40,
+    "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+
+# Fallback sample data used when a CSV file is missing
+FALLBACK_DATA = {
+    "products": [
+        {
+            "id": "P001",
+            "name": "Espresso Maker",
+            "price": 120.00,
+            "cost": 60.00,
+            "category": "Kitchen",
+            "description": "High quality espresso maker"
+        },
+        {
+            "id": "P002",
+            "name": "Coffee Grinder",
+            "price": 45.00,
+            "cost": 20.00,
+            "category": "Kitchen",
+            "description": "Burr coffee grinder"
+        }
+    ],
+    "messages": [
+        {
+            "id": "M001",
+            "message": "When will my order arrive?",
+            "timestamp": "2026-02-05 10:30:00"
+        },
+        {
+            "id": "M002",
+            "message": "The espresso maker is leaking water!",
+            "timestamp": "2026-02-05 11:15:00"
+        }
+    ],
+    "pricing": [
+        {
+            "product_id": "P001",
+            "competitor_price": 115.00,
+            "market_trend": "stable"
+        }
+    ],
+}
+
+
+def get_data_dir() -> str:
     """
-    Load sample data from CSV files.
-    Returns: (product_data, customer_messages, pricing_context)
+    Resolve the sample data directory.
+    DATA_DIR overrides the default (backend/data, then ../data).
     """
+    if os.getenv("DATA_DIR"):
+        return os.getenv("DATA_DIR")
+
     # Try backend/data first, then fall back to ../data (root data directory)
     data_dir = os.path.join(os.path.dirname(__file__), "data")
     if not os.path.exists(data_dir) or not os.listdir(data_dir):
         # Try parent directory's data folder
         data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
-        print(f"Using data directory: {data_dir}")
-    
-    # Load products
-    try:
-        products_df = pd.read_csv(os.path.join(data_dir, "products_raw.csv"))
-        product_data = products_df.to_dict('records')
-    except FileNotFoundError:
-        # Fallback sample data
-        product_data = [
-            {
-                "id": "P001",
-                "name": "Espresso Maker",
-                "price": 120.00,
-                "cost": 60.00,
-                "category": "Kitchen",
-                "description": "High quality espresso maker"
-            },
-            {
-                "id": "P002",
-                "name": "Coffee Grinder",
-                "price": 45.00,
-                "cost": 20.00,
-                "category": "Kitchen",
-                "description": "Burr coffee grinder"
-            }
-        ]
-    
-    # Load customer messages
-    try:
-        messages_df = pd.read_csv(os.path.join(data_dir, "customer_messages.csv"))
-        customer_messages = messages_df.to_dict('records')
-    except FileNotFoundError:
-        customer_messages = [
-            {
-                "id": "M001",
-                "message": "When will my order arrive?",
-                "timestamp": "2026-02-05 10:30:00"
-            },
-            {
-                "id": "M002",
-                "message": "The espresso maker is leaking water!",
-                "timestamp": "2026-02-05 11:15:00"
-            }
-        ]
-    
-    # Load pricing context
-    try:
-        pricing_df = pd.read_csv(os.path.join(data_dir, "pricing_context.csv"))
-        pricing_context = pricing_df.to_dict('records')
-    except FileNotFoundError:
-        pricing_context = [
-            {
-                "product_id": "P001",
-                "competitor_price": 115.00,
-                "market_trend": "stable"
-            }
-        ]
-    
+        logger.debug("Using data directory: %s", data_dir)
+    return data_dir
+
+
+def words_to_number(text: str) -> Optional[float]:
+    """
+    Parse a spelled-out number such as "ninety", "forty-five" or
+    "one hundred and twenty". Returns None if any word is not a number.
+    """
+    total = 0
+    current = 0
+    tokens = [t for t in re.split(r"[\s-]+", text) if t and t != "and"]
+    if not tokens:
+        return None
+    for token in tokens:
+        if token in NUMBER_WORDS:
+            current += NUMBER_WORDS[token]
+        elif token == "hundred":
+            current = (current or 1) * 100
+        elif token == "thousand":
+            total += (current or 1) * 1000
+            current = 0
+        else:
+            return None
+    return float(total + current)
+
+
+def parse_numeric_column(values: pd.Series) -> pd.DataFrame:
+    """
+    Parse a column of dirty numeric text into min/max/mid float columns.
+
+    Handles currency symbols and codes, thousands separators, ranges with a
+    hyphen, en/em dash or "to", and spelled-out numbers. Cells that are not
+    blank but cannot be parsed are NaN with invalid=True.
+    """
+    # Missing cells become "" so every cell is plain text
+    text = values.astype(object).where(values.notna(), "").astype(str).str.strip().str.lower()
+    cleaned = (
+        text.str.replace(CURRENCY_PATTERN, "", regex=True)
+        .str.replace(",", "", regex=False)
+        .str.strip()
+    )
+    parts = cleaned.str.extract(NUMBER_PATTERN)
+    low = pd.to_numeric(parts["low"], errors="coerce").astype("float64")
+    high = pd.to_numeric(parts["high"], errors="coerce").astype("float64").fillna(low)
+
+    # Spelled-out numbers: only the leftover cells, one parse per distinct value
+    leftover = low.isna() & (cleaned != "")
+    if leftover.any():
+        words = cleaned[leftover]
+        parsed = {value: words_to_number(value) for value in words.unique()}
+        spelled = words.map(parsed).astype("float64")
+        low = low.fillna(spelled)
+        high = high.fillna(spelled)
+
+    invalid = low.isna() & (text != "")
+    return pd.DataFrame(
+        {"min": low, "max": high, "mid": (low + high) / 2, "invalid": invalid},
+        index=values.index
+    )
+
+
+def normalize_numeric_fields(
+    frame: pd.DataFrame,
+    dataset: str,
+    issues: Optional[List[Dict[str, Any]]] = None
+) -> pd.DataFrame:
+    """
+    Replace the dataset's numeric columns with parsed floats and expand its
+    range columns into <col>_min/_max/_mid. Each unparseable cell is appended
+    to issues once, as a catalog-style warning.
+    """
+    for column in NUMERIC_FIELDS[dataset] + RANGE_FIELDS[dataset]:
+        if column not in frame.columns:
+            continue
+        parsed = parse_numeric_column(frame[column])
+        if issues is not None and parsed["invalid"].any():
+            issues.extend(_unparseable_issues(frame, column, parsed["invalid"], dataset))
+        if column in RANGE_FIELDS[dataset]:
+            frame[f"{column}_min"] = parsed["min"]
+            frame[f"{column}_max"] = parsed["max"]
+            frame[f"{column}_mid"] = parsed["mid"]
+        else:
+            frame[column] = parsed["mid"]
+    return frame
+
+
+def _unparseable_issues(frame: pd.DataFrame, column: str, invalid: pd.Series, dataset: str) -> List[Dict[str, Any]]:
+    id_column = next((c for c in ("product_id", "id", "message_id") if c in frame.columns), None)
+    ids = frame.loc[invalid, id_column].tolist() if id_column else [None] * int(invalid.sum())
+    return [
+        {
+            "type": "warning",
+            "product_id": pid,
+            "field": column,
+            "dataset": dataset,
+            "message": f"Unparseable {column} {value!r}",
+            "suggestion": f"Provide a numeric {column}"
+        }
+        for pid, value in zip(ids, frame.loc[invalid, column].tolist())
+    ]
+
+
+def iter_csv_frames(
+    source: Union[str, IO[str]],
+    batch_size: Optional[int] = None,
+    dtype: Optional[Dict[str, type]] = None,
+    dataset: Optional[str] = None,
+    issues: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a CSV as DataFrame chunks of batch_size rows.
+    Only one chunk is held in memory; CSV_BATCH_ROWS sets the default size.
+    With dataset set, its dtypes apply and numeric fields are parsed per
+    chunk; unparseable cells are appended to issues.
+    """
+    batch_size = batch_size or get_int_env("CSV_BATCH_ROWS", 50000)
+    if dataset and dtype is None:
+        dtype = DATASET_DTYPES[dataset]
+    with pd.read_csv(source, chunksize=batch_size, dtype=dtype) as reader:
+        for chunk in reader:
+            if dataset:
+                chunk = normalize_numeric_fields(chunk, dataset, issues)
+            yield chunk
+
+
+def iter_csv_batches(
+    source: Union[str, IO[str]],
+    batch_size: Optional[int] = None,
+    dtype: Optional[Dict[str, type]] = None,
+    dataset: Optional[str] = None,
+    issues: Optional[List[Dict[str, Any]]] = None
+) -> Iterator[List[Dict]]:
+    """
+    Yield a CSV as lists of record dicts, batch_size rows at a time.
+    See iter_csv_frames for chunking and numeric parsing.
+    """
+    for chunk in iter_csv_frames(source, batch_size, dtype, dataset, issues):
+        yield chunk.to_dict('records')
+
+
+def stream_dataset(
+    name: str,
+    batch_size: Optional[int] = None,
+    data_dir: Optional[str] = None,
+    issues: Optional[List[Dict[str, Any]]] = None,
+    as_frames: bool = False
+) -> Iterator[Union[List[Dict], pd.DataFrame]]:
+    """
+    Stream one sample dataset ("products", "messages" or "pricing") in batches,
+    as record lists or, with as_frames, as DataFrame chunks.
+    Falls back to the built-in sample rows if the CSV file is missing.
+    """
+    path = os.path.join(data_dir or get_data_dir(), DATASET_FILES[name])
+    if not os.path.exists(path):
+        fallback = list(FALLBACK_DATA[name])
+        yield pd.DataFrame.from_records(fallback) if as_frames else fallback
+        return
+    stream = iter_csv_frames if as_frames else iter_csv_batches
+    yield from stream(path, batch_size, dataset=name, issues=issues)
+
+
+def read_rows(batches: Iterable[List[Dict]], limit: int = 0) -> List[Dict]:
+    """
+    Collect rows from a batch stream, stopping once limit rows are read.
+    A limit of 0 reads the whole stream.
+    """
+    rows = []
+    for batch in batches:
+        rows.extend(batch)
+        if limit and len(rows) >= limit:
+            break
+    if hasattr(batches, "close"):
+        batches.close()
+    return rows[:limit] if limit else rows
+
+
+def read_table(frames: Iterable[pd.DataFrame], limit: int = 0) -> RecordTable:
+    """
+    Collect DataFrame chunks into a columnar RecordTable, stopping once limit
+    rows are read. A limit of 0 reads the whole stream.
+    """
+    chunks = []
+    count = 0
+    for frame in frames:
+        chunks.append(frame)
+        count += len(frame)
+        if limit and count >= limit:
+            break
+    if hasattr(frames, "close"):
+        frames.close()
+    if not chunks:
+        return RecordTable({})
+    frame = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    return RecordTable.from_frame(frame.head(limit) if limit else frame)
+
+
+# Parsed datasets by (realpath, mtime, size, read options) -> (rows, load issues)
+_dataset_cache: "OrderedDict[Tuple, Tuple[Any, List[Dict[str, Any]]]]" = OrderedDict()
+_dataset_cache_lock = threading.Lock()
+
+
+def load_cached(
+    path: str,
+    options: Tuple,
+    read,
+    issues: Optional[List[Dict[str, Any]]] = None
+) -> Any:
+    """
+    Return read(issues) for the CSV at path, parsed at most once per file version.
+
+    The entry is keyed by the file's real path, modification time and size
+    plus options, so an edited or replaced file is read again. Load issues
+    found by the first read are replayed into issues on every hit. Row lists
+    are returned as new lists over shared row dicts, which (like
+    RecordTables) callers must treat as read-only. The least recently used
+    entries beyond DATASET_CACHE_MAX_ENTRIES (default: 64) are dropped.
+    """
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, options)
+    with _dataset_cache_lock:
+        entry = _dataset_cache.get(key)
+        if entry is not None:
+            _dataset_cache.move_to_end(key)
+    if entry is None:
+        found: List[Dict[str, Any]] = []
+        entry = (read(found), found)
+        with _dataset_cache_lock:
+            _dataset_cache[key] = entry
+            while len(_dataset_cache) > max(get_int_env("DATASET_CACHE_MAX_ENTRIES", 64), 1):
+                _dataset_cache.popitem(last=False)
+    rows, found = entry
+    if issues is not None:
+        issues.extend(dict(issue) for issue in found)
+    return list(rows) if isinstance(rows, list) else rows
+
+
+def clear_dataset_cache() -> None:
+    """Drop every cached dataset."""
+    with _dataset_cache_lock:
+        _dataset_cache.clear()
+
+
+def load_sample_data(
+    product_limit: int = 0,
+    message_limit: int = 0,
+    pricing_limit: int = 0,
+    data_dir: Optional[str] = None,
+    issues: Optional[List[Dict[str, Any]]] = None,
+    columnar: bool = False
+) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Load sample data from CSV files.
+    Limits of 0 load every row; otherwise reading stops after that many rows.
+    Unparseable numeric cells in the chunks read are appended to issues.
+    With columnar, each dataset is returned as a RecordTable instead of dicts.
+    With DATASET_CACHE_ENABLED, CSVs are served from the dataset cache (see load_cached).
+    Returns: (product_data, customer_messages, pricing_context)
+    """
+    data_dir = data_dir or get_data_dir()
+    batch_size = get_int_env("CSV_BATCH_ROWS", 50000)
+    cache = get_bool_env("DATASET_CACHE_ENABLED", False)
+
+    def read(name: str, limit: int, issues: Optional[List[Dict[str, Any]]]) -> List[Dict]:
+        # Small limits only need the first chunk of the file
+        size = min(limit, batch_size) if limit else batch_size
+        if columnar:
+            return read_table(stream_dataset(name, size, data_dir, issues, as_frames=True), limit)
+        return read_rows(stream_dataset(name, size, data_dir, issues), limit)
+
+    def load(name: str, limit: int) -> List[Dict]:
+        path = os.path.join(data_dir, DATASET_FILES[name])
+        if not cache or not os.path.exists(path):
+            return read(name, limit, issues)
+        return load_cached(path, (limit, batch_size, columnar), lambda found: read(name, limit, found), issues)
+
+    product_data = load("products", product_limit)
+    customer_messages = load("messages", message_limit)
+    pricing_context = load("pricing", pricing_limit)
+
     return product_data, customer_messages, pricing_context
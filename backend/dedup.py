@@ -0,0 +1,132 @@
+"""
+Input deduplication and in-flight request coalescing for LLM work.
+
+Duplicate-heavy feeds repeat the same content under different IDs, for
+example re-listed products or copy-pasted complaints after a viral post.
+The agents group records whose normalized content is identical
+(group_duplicates), send one representative per group to the LLM and fan
+the result back out to every member.
+
+Separately, identical chain calls that are in flight at the same time share
+one request (with_coalescing). This happens, for example, when two merchants
+in one batch run have the same catalog.
+"""
+import asyncio
+import copy
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.runnables import Runnable, RunnableLambda
+from batching import get_bool_env
+from instrumentation import record
+from llm_cache import LLMCache
+
+
+def normalize_value(value: Any) -> Any:
+    """Case- and whitespace-insensitive form of a field for duplicate detection."""
+    if isinstance(value, str):
+        return " ".join(value.split()).casefold()
+    return value
+
+
+def content_key(row: Dict[str, Any], fields: Sequence[str]) -> str:
+    """Normalized content of the given fields (IDs excluded by the caller)."""
+    return json.dumps([normalize_value(row.get(field)) for field in fields], default=str)
+
+
+def group_duplicates(
+    records: Sequence[Dict[str, Any]],
+    positions: Iterable[int],
+    fields: Sequence[str]
+) -> Tuple[List[int], Dict[int, List[int]]]:
+    """
+    Split positions into representatives (first record of each distinct
+    content, in input order) and a map from representative to the positions
+    of its later duplicates.
+    """
+    first: Dict[str, int] = {}
+    representatives: List[int] = []
+    duplicates: Dict[int, List[int]] = {}
+    for position in positions:
+        key = content_key(records[position], fields)
+        owner = first.setdefault(key, position)
+        if owner == position:
+            representatives.append(position)
+        else:
+            duplicates.setdefault(owner, []).append(position)
+    return representatives, duplicates
+
+
+class InflightRequests:
+    """Identical calls running at the same time share the first caller's result."""
+
+    def __init__(self):
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller must run the call."""
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._futures[key] = Future()
+            return future, True
+
+    def _settle(self, key: str, future: Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._futures.pop(key, None)
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def run(self, key: str, call: Callable[[], Any]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            record(coalesced_calls=1)
+            # Followers get their own copy, so no caller can mutate another's result
+            return copy.deepcopy(future.result())
+        try:
+            result = call()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def arun(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        future, leader = self._join(key)
+        if not leader:
+            record(coalesced_calls=1)
+            return copy.deepcopy(await asyncio.wrap_future(future))
+        try:
+            result = await call()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+
+INFLIGHT = InflightRequests()
+
+
+def with_coalescing(chain: Runnable, prompt: Any, llm: Any) -> Runnable:
+    """
+    Wrap a chain so concurrent calls with the same prompt, model and input
+    share one request (LLM_COALESCE_ENABLED, default: true).
+    """
+    if not get_bool_env("LLM_COALESCE_ENABLED", True):
+        return chain
+
+    def invoke(payload: Dict[str, Any]) -> Any:
+        return INFLIGHT.run(LLMCache.make_key(prompt, llm, payload), lambda: chain.invoke(payload))
+
+    async def ainvoke(payload: Dict[str, Any]) -> Any:
+        return await INFLIGHT.arun(LLMCache.make_key(prompt, llm, payload), lambda: chain.ainvoke(payload))
+
+    return RunnableLambda(invoke, afunc=ainvoke, name="coalesced_chain")
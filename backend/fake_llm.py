@@ -0,0 +1,221 @@
+"""
+Deterministic fake chat model for offline runs and benchmarks.
+
+Answers the Catalog and Support Agent prompts with well-formed JSON derived
+from the records in the prompt, after a configurable simulated latency.
+Select it with LLM_PROVIDER=fake.
+"""
+import ast
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+_ID_RE = re.compile(r"(?<![\w])(?:product_id|message_id|id)['\"]?\s*[:=]\s*['\"]?([\w.-]+)")
+_NAN_RE = re.compile(r"\bnan\b")
+
+# Process-wide call counters (shared by every FakeChatModel instance)
+FAKE_LLM_STATS = {"calls": 0, "input_chars": 0}
+_stats_lock = threading.Lock()
+
+
+def reset_fake_llm_stats() -> None:
+    """Zero the process-wide call counters."""
+    with _stats_lock:
+        FAKE_LLM_STATS["calls"] = 0
+        FAKE_LLM_STATS["input_chars"] = 0
+
+
+def parse_records(text: str) -> List[Dict[str, Any]]:
+    """Recover the record list serialized into a prompt."""
+    lines = [line for line in text.splitlines() if line.strip().startswith("{")]
+    if lines:
+        try:
+            return [json.loads(line) for line in lines]
+        except ValueError:
+            pass
+
+    # Header-once table: a JSON list of column names, then one value list per record
+    rows = [line.strip() for line in text.splitlines() if line.strip().startswith("[")]
+    if len(rows) > 1:
+        try:
+            columns, *values = [json.loads(row) for row in rows]
+            if all(isinstance(c, str) for c in columns):
+                return [
+                    {c: v for c, v in zip(columns, row) if v is not None}
+                    for row in values if isinstance(row, list)
+                ]
+        except ValueError:
+            pass
+
+    start = text.find("[")
+    if start != -1:
+        try:
+            records = ast.literal_eval(_NAN_RE.sub("None", text[start:]))
+            if isinstance(records, list):
+                return [r for r in records if isinstance(r, dict)]
+        except (ValueError, SyntaxError):
+            pass
+
+    return [{"id": match} for match in _ID_RE.findall(text)]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _record_id(record: Dict[str, Any]) -> str:
+    for key in ("product_id", "message_id", "id"):
+        if record.get(key) is not None:
+            return str(record[key])
+    return "unknown"
+
+
+def fake_catalog_response(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Echo products back with numeric price/cost and flag unparseable prices."""
+    normalized = []
+    issues = []
+    for record in records:
+        pid = _record_id(record)
+        price = _to_float(record.get("price"))
+        cost = _to_float(record.get("cost"))
+        normalized.append({
+            "id": pid,
+            "name": record.get("title") or record.get("name") or "Unknown",
+            "price": price if price is not None else 0.0,
+            "cost": cost if cost is not None else (price or 0.0) * 0.5,
+        })
+        if price is None:
+            issues.append({
+                "type": "warning",
+                "product_id": pid,
+                "message": f"Unparseable price {record.get('price')!r}",
+                "suggestion": "Provide a numeric price"
+            })
+    return {"normalized_products": normalized, "issues": issues, "confidence_score": 0.9}
+
+
+# Support labels, checked in order; the first matching intent wins. These
+# are deliberately independent of the pre-classifier lexicon, so the labels
+# of messages it forwards are not derived from its own scores.
+_FAKE_INTENTS = (
+    ("Transactional Request", re.compile(r"\b(?:exchange|cancel|return|swap|resend|(?:change|update) (?:the|my))\b")),
+    ("Complaint", re.compile(
+        r"\b(?:refund|broke|broken|stopped|damaged|ridiculous|terrible|awful|worst|cheap|itchy|late|wrong|increasing)\b"
+        r"|not working|disappoint"
+    )),
+    ("Suggestion", re.compile(r"\b(?:wish|suggest|fyi)\b|(?:could you|please) add|would be (?:nice|great)")),
+)
+_FAKE_POSITIVE = re.compile(r"\b(?:amazing|love|great|excellent|good|perfect(?:ly)?|thanks|happy)\b")
+_FAKE_NEGATIVE = re.compile(
+    r"\b(?:refund|broke|broken|stopped|damaged|ridiculous|terrible|awful|worst|cheap|itchy|boring|wrong|late|increasing)\b"
+)
+_SENTIMENT_VALUES = {"positive": 1.0, "neutral": 0.0, "negative": -1.0}
+
+
+def _fake_support_label(text: str) -> Dict[str, str]:
+    text = text.lower()
+    label = next((intent for intent, pattern in _FAKE_INTENTS if pattern.search(text)), "Inquiry")
+    balance = len(_FAKE_POSITIVE.findall(text)) - len(_FAKE_NEGATIVE.findall(text))
+    sentiment = "positive" if balance > 0 else "negative" if balance < 0 else "neutral"
+    return {"type": label, "sentiment": sentiment}
+
+
+def fake_support_response(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Classify messages with keyword rules of their own; default to Inquiry."""
+    if not records:
+        return {"message_classifications": [], "overall_sentiment": 0.0,
+                "complaint_velocity": 0.0, "trending_topics": [], "spike_detected": False}
+
+    classifications = [
+        {"id": _record_id(record), **_fake_support_label(str(record.get("message", "")))}
+        for record in records
+    ]
+
+    complaints = len([c for c in classifications if c["type"] == "Complaint"])
+    sentiments = [_SENTIMENT_VALUES[c["sentiment"]] for c in classifications]
+    return {
+        "message_classifications": classifications,
+        "overall_sentiment": round(sum(sentiments) / len(sentiments), 3),
+        "complaint_velocity": round(10.0 * complaints / len(classifications), 2),
+        "trending_topics": [],
+        "spike_detected": False
+    }
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that sleeps for latency_ms ± jitter_ms and returns canned JSON."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    seed: int = 0
+    temperature: float = 0.0
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _delay(self) -> float:
+        rng = random.Random(self.seed + FAKE_LLM_STATS["calls"])
+        jitter = rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(self.latency_ms + jitter, 0.0) / 1000.0
+
+    def _respond(self, messages: List[BaseMessage]) -> ChatResult:
+        system = " ".join(str(m.content) for m in messages if m.type == "system").lower()
+        user = str(messages[-1].content) if messages else ""
+        records = parse_records(user)
+
+        if "catalog" in system:
+            payload = fake_catalog_response(records)
+        elif "support" in system:
+            payload = fake_support_response(records)
+        else:
+            payload = {}
+
+        content = json.dumps(payload)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        with _stats_lock:
+            FAKE_LLM_STATS["calls"] += 1
+            FAKE_LLM_STATS["input_chars"] += prompt_chars
+
+        message = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_chars // 4,
+                "output_tokens": len(content) // 4,
+                "total_tokens": prompt_chars // 4 + len(content) // 4,
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._delay())
+        return self._respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._delay())
+        return self._respond(messages)
@@ -0,0 +1,140 @@
+"""
+Local OpenAI-compatible chat completions server for offline tests.
+
+Answers POST /v1/chat/completions with the same canned JSON as the fake chat
+model, after an optional simulated latency, and records how many requests
+and distinct TCP connections it has seen. With requests_per_second set it
+enforces a per-second quota and answers excess requests with 429 and a
+retry-after-ms header, like the real API. Point the real OpenAI client at it
+with OPENAI_BASE_URL=<server.base_url>.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from fake_llm import fake_catalog_response, fake_support_response, parse_records
+
+
+def completion_payload(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a chat.completion response for a request body."""
+    messages = body.get("messages", [])
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system").lower()
+    user = str(messages[-1].get("content", "")) if messages else ""
+    records = parse_records(user)
+
+    if "catalog" in system:
+        content = fake_catalog_response(records)
+    elif "support" in system:
+        content = fake_support_response(records)
+    else:
+        content = {}
+
+    text = json.dumps(content)
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake-chat"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(text) // 4,
+            "total_tokens": prompt_tokens + len(text) // 4
+        }
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.record_connection(self.client_address)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        retry_after = self.server.record_request()
+        if retry_after is not None:
+            payload = json.dumps({"error": {"message": "Rate limit reached", "type": "requests"}}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("retry-after-ms", str(int(retry_after * 1000)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        if self.server.latency_ms:
+            time.sleep(self.server.latency_ms / 1000.0)
+
+        payload = json.dumps(completion_payload(body)).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded fake server; use as a context manager to run it in the background."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        requests_per_second: int = 0
+    ):
+        super().__init__((host, port), _Handler)
+        self.latency_ms = latency_ms
+        self.requests_per_second = requests_per_second
+        self.requests = 0
+        self.rate_limited = 0
+        self.connections = 0
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def record_connection(self, address) -> None:
+        with self._stats_lock:
+            self.connections += 1
+
+    def record_request(self) -> Optional[float]:
+        """Count a request; returns seconds until the next window if it is over quota."""
+        with self._stats_lock:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_count = 0
+            if self.requests_per_second and self._window_count >= self.requests_per_second:
+                self.rate_limited += 1
+                return self._window_start + 1.0 - now
+            self._window_count += 1
+            self.requests += 1
+            return None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
@@ -1,15 +1,44 @@
 """
 LangGraph workflow definition implementing the Gated Pipeline topology.
 """
+from typing import Optional
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from state import AgentState
 from nodes import (
     coordinator_node,
+    analysis_join_node,
     throttler_node,
     validator_node,
     conflict_resolver_node
 )
-from agents import catalog_agent, support_agent, pricing_agent
+from agents import catalog_agent, support_agent, asupport_agent, pricing_agent
+from batching import get_bool_env
+from checkpointer import get_checkpointer
+from instrumentation import instrument_node
+from logger import get_logger
+from process_pool import pooled_node
+
+
+logger = get_logger(__name__)
+
+# State keys each CPU-bound node reads; only these are sent to the process pool.
+# A tuple sends its first key that is set (the node falls back to the next).
+POOLED_NODE_READS = {
+    "coordinator": ("merchant_id", "uploaded_data", "product_data", "data_dir", "merchant_locks"),
+    "pricing_agent": (
+        ("normalized_catalog", "product_data"), ("pricing_index", "pricing_context"),
+        "sentiment_score", "product_sentiment"
+    ),
+    "validator": (
+        "pricing_proposals", ("pricing_index", "pricing_context"), "sentiment_score", "product_sentiment"
+    ),
+    "resolver": (
+        "pricing_proposals", "catalog_issues", "support_summary", "sentiment_score", "product_sentiment",
+        "merchant_locks", "validation_flags", "schema_validation_passed", "retry_count",
+        "throttle_mode_active", "audit_log"
+    )
+}
 
 
 def check_safety_gate(state: AgentState) -> str:
@@ -20,10 +49,10 @@ def check_safety_gate(state: AgentState) -> str:
     spike_detected = state.get("complaint_spike_detected", False)
     
     if spike_detected:
-        print("\n🚨 SAFETY GATE: SPIKE DETECTED - ROUTING TO THROTTLER")
+        logger.warning("🚨 SAFETY GATE: SPIKE DETECTED - ROUTING TO THROTTLER")
         return "unsafe"
     
-    print("\n✅ SAFETY GATE: PASSED - PROCEEDING TO PRICING")
+    logger.info("✅ SAFETY GATE: PASSED - PROCEEDING TO PRICING")
     return "safe"
 
 
@@ -36,61 +65,102 @@ def check_schema_gate(state: AgentState) -> str:
     retry_count = state.get("retry_count", 0)
     
     if not schema_passed and retry_count < 2:
-        print(f"\n⚠️ SCHEMA GATE: VALIDATION FAILED (Retry {retry_count + 1}/2)")
+        logger.warning("⚠️ SCHEMA GATE: VALIDATION FAILED (Retry %d/2)", retry_count + 1)
         return "retry"
     elif not schema_passed:
-        print("\n❌ SCHEMA GATE: MAX RETRIES EXCEEDED")
+        logger.error("❌ SCHEMA GATE: MAX RETRIES EXCEEDED")
         return "invalid"
     
-    print("\n✅ SCHEMA GATE: VALIDATION PASSED")
+    logger.info("✅ SCHEMA GATE: VALIDATION PASSED")
     return "valid"
 
 
-# Build the workflow graph
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("coordinator", coordinator_node)
-workflow.add_node("catalog_agent", catalog_agent)
-workflow.add_node("support_agent", support_agent)
-workflow.add_node("pricing_agent", pricing_agent)
-workflow.add_node("validator", validator_node)
-workflow.add_node("throttler", throttler_node)
-workflow.add_node("resolver", conflict_resolver_node)
-
-# Set entry point
-workflow.set_entry_point("coordinator")
-
-# Coordinator dispatches to parallel analysis
-workflow.add_edge("coordinator", "support_agent")
-workflow.add_edge("support_agent", "catalog_agent")
-
-# Safety Gate: Check for complaint spike
-workflow.add_conditional_edges(
-    "catalog_agent",
-    check_safety_gate,
-    {
-        "unsafe": "throttler",  # Spike detected -> freeze operations
-        "safe": "pricing_agent"  # Safe -> continue to pricing
-    }
-)
+def build_workflow(parallel_analysis: bool = True, cpu_pool: Optional[bool] = None) -> StateGraph:
+    """
+    Build the Gated Pipeline workflow.
+    
+    With parallel_analysis (default), the coordinator fans out to the Support
+    and Catalog Agents, which run concurrently and join before the safety gate.
+    Otherwise they run one after the other (kept for benchmarking).
+    
+    With cpu_pool (default: CPU_POOL_ENABLED), the CPU-bound nodes run in a
+    process pool (see process_pool.py).
+    
+    With INSTRUMENTATION_ENABLED (default: true), every node records timing,
+    token and memory metrics (see instrumentation.py).
+    """
+    if cpu_pool is None:
+        cpu_pool = get_bool_env("CPU_POOL_ENABLED", False)
+    if cpu_pool:
+        def cpu_node(node, name):
+            return pooled_node(node, reads=POOLED_NODE_READS[name])
+    else:
+        def cpu_node(node, name):
+            return node
+    instrument = get_bool_env("INSTRUMENTATION_ENABLED", True)
+    
+    workflow = StateGraph(AgentState)
+    
+    def add_node(name, node):
+        workflow.add_node(name, instrument_node(node, name) if instrument else node)
+    
+    # Add nodes
+    add_node("coordinator", cpu_node(coordinator_node, "coordinator"))
+    add_node("catalog_agent", catalog_agent)
+    # Support Agent exposes an async path so ainvoke() classifies batches on the event loop
+    add_node("support_agent", RunnableLambda(support_agent, afunc=asupport_agent, name="support_agent"))
+    add_node("analysis_join", analysis_join_node)
+    add_node("pricing_agent", cpu_node(pricing_agent, "pricing_agent"))
+    add_node("validator", cpu_node(validator_node, "validator"))
+    add_node("throttler", throttler_node)
+    add_node("resolver", cpu_node(conflict_resolver_node, "resolver"))
+    
+    # Set entry point
+    workflow.set_entry_point("coordinator")
+    
+    if parallel_analysis:
+        # Coordinator dispatches to parallel analysis; both branches join before the gate
+        workflow.add_edge("coordinator", "support_agent")
+        workflow.add_edge("coordinator", "catalog_agent")
+        workflow.add_edge(["support_agent", "catalog_agent"], "analysis_join")
+    else:
+        workflow.add_edge("coordinator", "support_agent")
+        workflow.add_edge("support_agent", "catalog_agent")
+        workflow.add_edge("catalog_agent", "analysis_join")
+    
+    # Safety Gate: Check for complaint spike
+    workflow.add_conditional_edges(
+        "analysis_join",
+        check_safety_gate,
+        {
+            "unsafe": "throttler",  # Spike detected -> freeze operations
+            "safe": "pricing_agent"  # Safe -> continue to pricing
+        }
+    )
+    
+    # Pricing flows to validator, then validator flows to resolver
+    workflow.add_edge("pricing_agent", "validator")
+    workflow.add_edge("validator", "resolver")
+    
+    # Both throttler and resolver end the workflow
+    workflow.add_edge("throttler", END)
+    workflow.add_edge("resolver", END)
+    
+    return workflow
 
-# Pricing flows to validator, then validator flows to resolver
-workflow.add_edge("pricing_agent", "validator")
-workflow.add_edge("validator", "resolver")
 
-# Both throttler and resolver end the workflow
-workflow.add_edge("throttler", END)
-workflow.add_edge("resolver", END)
+# Build the workflow graph
+workflow = build_workflow()
 
-# Compile the graph
-app = workflow.compile()
+# Compile the graph (with the SQLite checkpointer when CHECKPOINT_ENABLED=true;
+# runs then need a thread_id, see checkpointer.checkpoint_config)
+app = workflow.compile(checkpointer=get_checkpointer())
 
 # Export for visualization
 if __name__ == "__main__":
     print("LangGraph workflow compiled successfully!")
     print("\nWorkflow structure:")
-    print("1. Coordinator → Support Agent → Catalog Agent")
+    print("1. Coordinator → (Support Agent ∥ Catalog Agent) → Join")
     print("2. Safety Gate checks for complaint spike")
     print("3a. If spike: → Throttler → END")
     print("3b. If safe: → Pricing Agent → Validator → Resolver → END")
@@ -0,0 +1,88 @@
+"""
+Shared HTTP connection pool for LLM clients.
+
+Every OpenAI/Azure client built by llm_config uses the same httpx clients, so
+batched runs reuse keep-alive TCP/TLS connections instead of opening a new
+session per client. The async side keeps one pool per event loop, since
+pooled connections cannot move between loops. Both sides send through the
+process-wide adaptive rate limiter (rate_limiter.py).
+"""
+import asyncio
+import threading
+import weakref
+from typing import Dict, Tuple
+import httpx
+import openai
+from batching import get_float_env, get_int_env
+from rate_limiter import AsyncRateLimitedTransport, RateLimitedTransport, get_rate_limiter
+
+
+def get_pool_limits() -> httpx.Limits:
+    """
+    Connection pool limits configured from the environment.
+
+    Environment Variables:
+    - LLM_HTTP_MAX_CONNECTIONS: Max open connections per pool (default: 20)
+    - LLM_HTTP_MAX_KEEPALIVE: Max idle keep-alive connections (default: 10)
+    - LLM_HTTP_KEEPALIVE_SECONDS: Idle connection lifetime (default: 30)
+    """
+    max_connections = max(get_int_env("LLM_HTTP_MAX_CONNECTIONS", 20), 1)
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(get_int_env("LLM_HTTP_MAX_KEEPALIVE", 10), max_connections),
+        keepalive_expiry=get_float_env("LLM_HTTP_KEEPALIVE_SECONDS", 30.0)
+    )
+
+
+class LoopLocalTransport(httpx.AsyncBaseTransport):
+    """Async transport that keeps one connection pool per running event loop."""
+
+    def __init__(self, limits: httpx.Limits):
+        self.limits = limits
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    def _pool(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pool = self._pools.get(loop)
+            if pool is None:
+                pool = httpx.AsyncHTTPTransport(limits=self.limits)
+                self._pools[loop] = pool
+            return pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._pool().handle_async_request(request)
+
+    async def aclose(self) -> None:
+        with self._lock:
+            pool = self._pools.pop(asyncio.get_running_loop(), None)
+        if pool is not None:
+            await pool.aclose()
+
+
+_clients: Dict[Tuple, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """
+    Process-wide (sync, async) httpx clients for the configured pool limits
+    and rate limiter. Clients are rebuilt only when the configuration changes.
+    """
+    limits = get_pool_limits()
+    limiter = get_rate_limiter()
+    key = (limits.max_connections, limits.max_keepalive_connections, limits.keepalive_expiry, id(limiter))
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = (
+                openai.DefaultHttpxClient(
+                    transport=RateLimitedTransport(httpx.HTTPTransport(limits=limits), limiter)
+                ),
+                openai.DefaultAsyncHttpxClient(
+                    transport=AsyncRateLimitedTransport(LoopLocalTransport(limits), limiter)
+                )
+            )
+        return _clients[key]
@@ -0,0 +1,335 @@
+"""
+Structured per-node and per-LLM-call instrumentation.
+
+build_workflow() wraps every node with instrument_node(). For each node run it
+records wall time, payload row counts, process memory (RSS at start and end and
+the highest RSS sampled while the node ran) and the LLM activity
+that happened inside the node: calls, latency, prompt/completion tokens,
+response-cache hits and misses, coalesced duplicate calls, rate-limiter queue
+wait, 429s and retries.
+
+Each node event is
+- appended to the node_metrics state channel; terminal nodes summarize the
+  run's events into final_report["metrics"],
+- aggregated in the process-wide registry (get_metrics()),
+- written as one JSON line to METRICS_EVENTS_PATH, if set, together with
+  one "llm_call" event per model call.
+
+LLM-side counters reach the running node through a context variable, so
+concurrent merchants in one process never mix their numbers.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections.abc import Sequence
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from batching import get_float_env
+
+
+# Input channels whose row counts are recorded for every node
+INPUT_CHANNELS = ("product_data", "customer_messages", "pricing_context", "normalized_catalog", "pricing_proposals")
+
+# Counters a node trace accumulates from LLM activity
+LLM_COUNTERS = (
+    "llm_calls", "llm_errors", "llm_seconds", "prompt_tokens", "completion_tokens",
+    "cache_hits", "cache_misses", "coalesced_calls", "queue_wait_seconds", "rate_limited", "retries"
+)
+
+
+class NodeTrace:
+    """LLM counters collected while one node runs (shared by its threads and tasks)."""
+
+    def __init__(self, node: str, merchant_id: str):
+        self.node = node
+        self.merchant_id = merchant_id
+        self.counters: Dict[str, float] = dict.fromkeys(LLM_COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, **counters: float) -> None:
+        with self._lock:
+            for name, value in counters.items():
+                self.counters[name] += value
+
+
+_current_trace: contextvars.ContextVar[Optional[NodeTrace]] = contextvars.ContextVar(
+    "current_node_trace", default=None
+)
+
+
+def record(**counters: float) -> None:
+    """Add LLM counters to the node currently running in this context, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(**counters)
+
+
+# --- Event sink and registry ---
+
+_sink_lock = threading.Lock()
+
+
+def emit(event: Dict[str, Any]) -> None:
+    """Append an event to METRICS_EVENTS_PATH as one JSON line (no-op if unset)."""
+    path = os.getenv("METRICS_EVENTS_PATH")
+    if not path:
+        return
+    line = json.dumps(event, default=str)
+    with _sink_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class MetricsRegistry:
+    """Process-wide aggregates of node events, by node name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.nodes: Dict[str, Dict[str, float]] = {}
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            stats = self.nodes.setdefault(event["node"], {
+                "runs": 0, "wall_seconds": 0.0, "max_wall_seconds": 0.0, **dict.fromkeys(LLM_COUNTERS, 0)
+            })
+            stats["runs"] += 1
+            stats["wall_seconds"] += event["wall_seconds"]
+            stats["max_wall_seconds"] = max(stats["max_wall_seconds"], event["wall_seconds"])
+            for name in LLM_COUNTERS:
+                stats[name] += event["llm"][name]
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {node: dict(stats) for node, stats in self.nodes.items()}
+
+
+METRICS = MetricsRegistry()
+
+
+def get_metrics() -> Dict[str, Dict[str, float]]:
+    """Per-node totals since start-up (or the last reset_metrics())."""
+    return METRICS.snapshot()
+
+
+def reset_metrics() -> None:
+    METRICS.reset()
+
+
+# --- LLM callbacks ---
+
+def _usage(response: LLMResult) -> Dict[str, int]:
+    """Prompt/completion tokens from message usage metadata or provider llm_output."""
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not (prompt or completion):
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt = token_usage.get("prompt_tokens", 0)
+        completion = token_usage.get("completion_tokens", 0)
+    return {"prompt_tokens": prompt, "completion_tokens": completion}
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Times every chat model call and records its token usage on the running node."""
+
+    # Run in the caller's context so the node trace context variable is visible
+    run_inline = True
+
+    def __init__(self):
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs) -> None:
+        seconds = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        usage = _usage(response)
+        record(llm_calls=1, llm_seconds=seconds, **usage)
+        trace = _current_trace.get()
+        emit({
+            "event": "llm_call",
+            "ts": time.time(),
+            "merchant_id": trace.merchant_id if trace else None,
+            "node": trace.node if trace else None,
+            "seconds": round(seconds, 6),
+            **usage
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._started.pop(run_id, None)
+        record(llm_calls=1, llm_errors=1)
+
+
+LLM_METRICS_HANDLER = LLMMetricsHandler()
+
+
+# --- Node wrapper ---
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class RssSampler:
+    """
+    Samples RSS on one background thread while any node runs and keeps the
+    highest value seen during each node (the process-lifetime high-water
+    mark only ever grows, so it cannot tell stages apart). Nodes running at
+    the same time share the process's RSS.
+
+    Environment Variables:
+    - METRICS_RSS_SAMPLE_MS: Sampling interval (default: 10)
+    """
+
+    def __init__(self):
+        self._peaks: Dict[int, float] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, rss: float) -> int:
+        """Begin tracking a node whose RSS at start is rss; returns its handle."""
+        with self._lock:
+            handle = self._next_id
+            self._next_id += 1
+            self._peaks[handle] = rss
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+                self._thread.start()
+        return handle
+
+    def stop(self, handle: int, rss: float) -> float:
+        """Peak RSS in MB since start(handle), including the final reading rss."""
+        with self._lock:
+            return max(self._peaks.pop(handle), rss)
+
+    def _sample(self) -> None:
+        interval = max(get_float_env("METRICS_RSS_SAMPLE_MS", 10.0), 1.0) / 1000
+        while True:
+            rss = _rss_mb()
+            with self._lock:
+                if not self._peaks:
+                    # Idle: exit; the next node starts a new thread
+                    self._thread = None
+                    return
+                for handle, peak in self._peaks.items():
+                    if rss > peak:
+                        self._peaks[handle] = rss
+            time.sleep(interval)
+
+
+RSS_SAMPLER = RssSampler()
+
+
+def _rows(values: Dict[str, Any], names) -> Dict[str, int]:
+    return {
+        name: len(values[name]) for name in names
+        if isinstance(values.get(name), Sequence) and not isinstance(values[name], str)
+    }
+
+
+def summarize_run(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Roll one run's node events up for final_report["metrics"]."""
+    llm = dict.fromkeys(LLM_COUNTERS, 0)
+    nodes = {}
+    for event in events:
+        for name in LLM_COUNTERS:
+            llm[name] += event["llm"][name]
+        node = nodes.setdefault(event["node"], {"runs": 0, "wall_seconds": 0.0, "llm_calls": 0})
+        node["runs"] += 1
+        node["wall_seconds"] = round(node["wall_seconds"] + event["wall_seconds"], 6)
+        node["llm_calls"] += event["llm"]["llm_calls"]
+    started = min((e["started_at"] for e in events), default=time.time())
+    ended = max((e["started_at"] + e["wall_seconds"] for e in events), default=started)
+    return {
+        "run_wall_seconds": round(ended - started, 6),
+        "nodes": nodes,
+        "llm": {name: round(value, 6) for name, value in llm.items()},
+        # Highest RSS sampled while any of this run's nodes was running
+        "peak_rss_mb": round(max((e["memory"]["peak_rss_mb"] for e in events), default=0.0), 1)
+    }
+
+
+def instrument_node(node: Callable, name: str) -> RunnableLambda:
+    """
+    Wrap a node (function or runnable) so each run emits a node event and,
+    when it produces the final report, attaches the run summary to it.
+    """
+    inner: Runnable = node if isinstance(node, Runnable) else RunnableLambda(node, name=name)
+
+    def start(state: Dict[str, Any]):
+        trace = NodeTrace(name, str(state.get("merchant_id", "unknown")))
+        rss_start = _rss_mb()
+        return (trace, _current_trace.set(trace), time.time(), time.perf_counter(), rss_start,
+                RSS_SAMPLER.start(rss_start))
+
+    def finish(state, result, trace, started_at, perf_start, rss_start, sampler) -> Dict[str, Any]:
+        rss_end = _rss_mb()
+        event = {
+            "event": "node",
+            "merchant_id": trace.merchant_id,
+            "node": name,
+            "started_at": started_at,
+            "wall_seconds": round(time.perf_counter() - perf_start, 6),
+            "rows_in": _rows(state, INPUT_CHANNELS),
+            "rows_out": _rows(result, list(result)) if isinstance(result, dict) else {},
+            "llm": {key: round(value, 6) for key, value in trace.counters.items()},
+            "memory": {
+                "rss_start_mb": round(rss_start, 1),
+                "rss_end_mb": round(rss_end, 1),
+                "peak_rss_mb": round(RSS_SAMPLER.stop(sampler, rss_end), 1)
+            }
+        }
+        METRICS.observe(event)
+        emit(event)
+        if not isinstance(result, dict):
+            return result
+        result = {**result, "node_metrics": [event]}
+        if result.get("final_report"):
+            events = list(state.get("node_metrics") or []) + [event]
+            result["final_report"] = {**result["final_report"], "metrics": summarize_run(events)}
+        return result
+
+    def run(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        trace, token, *clock = start(state)
+        try:
+            result = inner.invoke(state, config)
+        except BaseException:
+            RSS_SAMPLER.stop(clock[-1], 0.0)
+            raise
+        finally:
+            _current_trace.reset(token)
+        return finish(state, result, trace, *clock)
+
+    async def arun(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        trace, token, *clock = start(state)
+        try:
+            result = await inner.ainvoke(state, config)
+        except BaseException:
+            RSS_SAMPLER.stop(clock[-1], 0.0)
+            raise
+        finally:
+            _current_trace.reset(token)
+        return finish(state, result, trace, *clock)
+
+    return RunnableLambda(run, afunc=arun, name=name)
@@ -0,0 +1,213 @@
+"""
+Persistent, content-addressed cache for LLM chain results.
+
+Entries are keyed by a hash of the prompt template, the model/deployment and
+temperature of the configured LLM, and the serialized input chunk, so a
+re-run over unchanged data is served locally without network calls.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from langchain_core.runnables import Runnable, RunnableLambda
+from batching import get_bool_env, get_int_env
+from instrumentation import record
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), ".cache", "llm_cache.sqlite3")
+
+
+def describe_llm(llm: Any) -> Dict[str, Any]:
+    """Identify the model behind an LLM instance for cache keys."""
+    model = (
+        getattr(llm, "deployment_name", None)
+        or getattr(llm, "model_name", None)
+        or getattr(llm, "model", None)
+        or type(llm).__name__
+    )
+    return {
+        "provider": type(llm).__name__,
+        "model": str(model),
+        "temperature": getattr(llm, "temperature", None),
+    }
+
+
+def describe_prompt(prompt: Any) -> str:
+    """Stable text form of a prompt template for cache keys."""
+    if hasattr(prompt, "pretty_repr"):
+        return prompt.pretty_repr()
+    return repr(prompt)
+
+
+class LLMCache:
+    """
+    SQLite-backed cache with TTL expiry and size-based LRU eviction.
+    Safe to share across threads; hit/miss counters are kept per process.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: int = 7 * 24 * 3600, max_entries: int = 50_000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(prompt: Any, llm: Any, payload: Dict[str, Any]) -> str:
+        """Content address for one chain call."""
+        material = json.dumps(
+            {"prompt": describe_prompt(prompt), "llm": describe_llm(llm), "input": payload},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a value and evict least recently used entries beyond max_entries."""
+        now = time.time()
+        encoded = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, encoded, now, now)
+            )
+            self.writes += 1
+            if self.max_entries:
+                (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    self._conn.execute(
+                        "DELETE FROM llm_cache WHERE key IN ("
+                        " SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.evictions += overflow
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every entry and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self.hits = self.misses = self.writes = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "entries": size,
+        }
+
+    def wrap(self, chain: Runnable, prompt: Any, llm: Any) -> Runnable:
+        """
+        Return a runnable that serves chain results from the cache.
+        Only successful dict results are stored; errors always propagate.
+        """
+        def lookup(payload: Dict[str, Any]):
+            key = self.make_key(prompt, llm, payload)
+            return key, self.get(key)
+
+        def store(key: str, result: Any) -> Any:
+            if isinstance(result, dict):
+                self.set(key, result)
+            return result
+
+        def invoke(payload: Dict[str, Any]) -> Any:
+            key, cached = lookup(payload)
+            if cached is not None:
+                record(cache_hits=1)
+                return cached
+            record(cache_misses=1)
+            return store(key, chain.invoke(payload))
+
+        async def ainvoke(payload: Dict[str, Any]) -> Any:
+            key, cached = lookup(payload)
+            if cached is not None:
+                record(cache_hits=1)
+                return cached
+            record(cache_misses=1)
+            return store(key, await chain.ainvoke(payload))
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="cached_chain")
+
+
+_caches: Dict[str, LLMCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """
+    Process-wide cache configured from the environment, or None when disabled.
+
+    Environment Variables:
+    - LLM_CACHE_ENABLED: "true"/"false" (default: true)
+    - LLM_CACHE_PATH: SQLite file (default: backend/.cache/llm_cache.sqlite3)
+    - LLM_CACHE_TTL_SECONDS: Entry lifetime, 0 = never expire (default: 7 days)
+    - LLM_CACHE_MAX_ENTRIES: LRU size limit, 0 = unbounded (default: 50000)
+    """
+    if not get_bool_env("LLM_CACHE_ENABLED", True):
+        return None
+
+    path = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = LLMCache(
+                path=path,
+                ttl_seconds=get_int_env("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+                max_entries=get_int_env("LLM_CACHE_MAX_ENTRIES", 50_000)
+            )
+        return _caches[path]
+
+
+def with_llm_cache(chain: Runnable, prompt: Any, llm: Any) -> Runnable:
+    """Wrap a chain with the process-wide cache if caching is enabled."""
+    cache = get_llm_cache()
+    return cache.wrap(chain, prompt, llm) if cache else chain
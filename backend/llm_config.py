@@ -1,9 +1,27 @@
 """
 LLM Configuration - Supports both OpenAI and Azure OpenAI
+
+Clients are built once per provider/model/deployment/temperature and shared
+process-wide, on top of the pooled HTTP clients from http_pool. Compiled
+prompt | llm | parser chains are shared the same way via get_chain().
 """
 import os
-from typing import Optional
+import threading
+from typing import Any, Dict, Optional, Tuple
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI, AzureChatOpenAI
+from batching import get_bool_env
+from http_pool import get_http_clients
+from instrumentation import LLM_METRICS_HANDLER
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+_llms: Dict[Tuple, Any] = {}
+_chains: Dict[Tuple, Runnable] = {}
+_registry_lock = threading.Lock()
 
 
 def get_llm(
@@ -17,9 +35,10 @@ def get_llm(
     Supports:
     - OpenAI (default)
     - Azure OpenAI
+    - Fake (deterministic offline model for tests and benchmarks)
     
     Environment Variables:
-    - LLM_PROVIDER: "openai" or "azure" (default: "openai")
+    - LLM_PROVIDER: "openai", "azure" or "fake" (default: "openai")
     
     For OpenAI:
     - OPENAI_API_KEY: Your OpenAI API key
@@ -30,6 +49,10 @@ def get_llm(
     - AZURE_OPENAI_DEPLOYMENT_NAME: Your deployment name (e.g., gpt-5, gpt-4o-mini)
     - AZURE_OPENAI_API_VERSION: API version (default: 2024-02-15-preview)
     
+    For the fake model:
+    - FAKE_LLM_LATENCY_MS: Simulated latency per call (default: 0)
+    - FAKE_LLM_JITTER_MS: Uniform jitter around the latency (default: 0)
+    
     Args:
         model: Model name (for OpenAI) or ignored (for Azure, uses deployment)
         temperature: Temperature for generation (Note: GPT-5 only supports default value of 1)
@@ -41,7 +64,40 @@ def get_llm(
     Note: For Azure, the model parameter is ignored and the deployment name
           from AZURE_OPENAI_DEPLOYMENT_NAME is used instead.
           GPT-5 models only support temperature=1 (default).
+          Instances are shared: repeated calls with the same configuration
+          return the same client.
     """
+    key = _llm_key(model, temperature, kwargs)
+    with _registry_lock:
+        llm = _llms.get(key) if key is not None else None
+        if llm is None:
+            llm = _build_llm(model, temperature, **kwargs)
+            if key is not None:
+                _llms[key] = llm
+    return llm
+
+
+def _llm_key(model: str, temperature: float, kwargs: Dict[str, Any]) -> Optional[Tuple]:
+    """Registry key for a client configuration, or None if kwargs are unhashable."""
+    provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    if provider == "azure":
+        target = tuple(os.getenv(name) for name in (
+            "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT_NAME", "AZURE_OPENAI_API_VERSION", "AZURE_OPENAI_API_KEY"
+        ))
+    elif provider == "fake":
+        target = (os.getenv("FAKE_LLM_LATENCY_MS"), os.getenv("FAKE_LLM_JITTER_MS"))
+    else:
+        target = (model, os.getenv("OPENAI_BASE_URL"), os.getenv("OPENAI_API_KEY"))
+    key = (provider, target, temperature, tuple(sorted(kwargs.items())), get_http_clients())
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def _build_llm(model: str, temperature: float, **kwargs):
+    """Construct a new client for the configured provider."""
     provider = os.getenv("LLM_PROVIDER", "openai").lower()
     
     # Check if using GPT-5 and adjust temperature
@@ -49,13 +105,30 @@ def get_llm(
     if provider == "azure" and "gpt-5" in deployment.lower():
         # GPT-5 only supports default temperature
         if temperature != 1:
-            print(f"⚠️  GPT-5 only supports temperature=1. Adjusting from {temperature} to 1.")
+            logger.warning("⚠️  GPT-5 only supports temperature=1. Adjusting from %s to 1.", temperature)
             temperature = 1
     
+    if provider in ("openai", "azure"):
+        # Share the pooled keep-alive connections unless the caller brings its own
+        http_client, http_async_client = get_http_clients()
+        kwargs.setdefault("http_client", http_client)
+        kwargs.setdefault("http_async_client", http_async_client)
+        if kwargs["http_client"] is http_client:
+            # The rate-limited transport retries 429s/5xx with backoff; SDK
+            # retries on top would multiply attempts and undo the AIMD window
+            kwargs.setdefault("max_retries", 0)
+    
     if provider == "azure":
-        return get_azure_llm(temperature=temperature, **kwargs)
+        llm = get_azure_llm(temperature=temperature, **kwargs)
+    elif provider == "fake":
+        llm = get_fake_llm(temperature=temperature)
     else:
-        return get_openai_llm(model=model, temperature=temperature, **kwargs)
+        llm = get_openai_llm(model=model, temperature=temperature, **kwargs)
+    
+    # Per-call latency and token usage for the node metrics (see instrumentation)
+    if get_bool_env("INSTRUMENTATION_ENABLED", True):
+        llm.callbacks = [LLM_METRICS_HANDLER]
+    return llm
 
 
 def get_openai_llm(
@@ -123,11 +196,8 @@ def get_azure_llm(
             "AZURE_OPENAI_DEPLOYMENT_NAME environment variable is required when LLM_PROVIDER=azure"
         )
     
-    print(f"🔧 Initializing Azure OpenAI:")
-    print(f"   Endpoint: {endpoint}")
-    print(f"   Deployment: {deployment}")
-    print(f"   API Version: {api_version}")
-    print(f"   Temperature: {temperature}")
+    logger.info("🔧 Initializing Azure OpenAI: endpoint=%s deployment=%s api_version=%s temperature=%s",
+                endpoint, deployment, api_version, temperature)
     
     return AzureChatOpenAI(
         azure_endpoint=endpoint,
@@ -139,6 +209,60 @@ def get_azure_llm(
     )
 
 
+def get_fake_llm(temperature: float = 0):
+    """
+    Get the deterministic fake chat model used for offline runs and benchmarks.
+    
+    Args:
+        temperature: Recorded for cache keys only
+    
+    Returns:
+        FakeChatModel instance
+    """
+    from fake_llm import FakeChatModel
+    
+    return FakeChatModel(
+        temperature=temperature,
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        jitter_ms=float(os.getenv("FAKE_LLM_JITTER_MS", "0"))
+    )
+
+
+def get_chain(prompt: Runnable, llm: Any, output_schema: Optional[type] = None) -> Runnable:
+    """
+    Shared `prompt | llm | JsonOutputParser(output_schema)` chain.
+    Built once per prompt, LLM instance and schema.
+    """
+    key = (id(prompt), id(llm), output_schema)
+    with _registry_lock:
+        chain = _chains.get(key)
+        if chain is None:
+            # The chain holds prompt and llm, so their ids stay unique while cached
+            chain = prompt | llm | JsonOutputParser(pydantic_object=output_schema)
+            _chains[key] = chain
+    return chain
+
+
+def reset_llm_registry() -> None:
+    """Drop all shared clients and chains (e.g. after changing credentials in tests)."""
+    with _registry_lock:
+        _llms.clear()
+        _chains.clear()
+
+
+def describe_model(model: str = "gpt-4o-mini") -> Dict[str, str]:
+    """
+    Provider and model that get_llm(model) would use, read from the
+    environment without building a client (no secrets included).
+    """
+    provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    if provider == "azure":
+        model = f"{os.getenv('AZURE_OPENAI_DEPLOYMENT_NAME')}@{os.getenv('AZURE_OPENAI_API_VERSION', '2024-02-15-preview')}"
+    elif provider == "fake":
+        model = "fake"
+    return {"provider": provider, "model": model}
+
+
 def get_provider_info() -> dict:
     """
     Get information about the configured LLM provider.
@@ -160,6 +284,11 @@ def get_provider_info() -> dict:
                 os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
             )
         }
+    elif provider == "fake":
+        return {
+            "provider": "fake",
+            "configured": True
+        }
     else:
         return {
             "provider": "openai",
@@ -0,0 +1,109 @@
+"""
+Leveled, structured logging for the backend.
+
+Modules log through get_logger(__name__) with lazy %-style arguments
+(logger.info("Normalized %d products", count)). A suppressed level costs one
+cached level check, with no string formatting and no I/O. Records carry the
+run context (merchant_id, run_id) bound with log_context(). The context is a
+context variable, so it follows a run into LangGraph's worker threads and
+tasks, and concurrent merchants keep their own.
+
+Environment Variables:
+- LOG_LEVEL: DEBUG, INFO, WARNING or ERROR (default: INFO; WARNING for quiet production runs)
+- LOG_FORMAT: "text" for console lines or "json" for one JSON object per line (default: text)
+"""
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+ROOT_LOGGER = "salla"
+
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_context", default={})
+_configure_lock = threading.Lock()
+_configured = False
+
+
+@contextmanager
+def log_context(**fields: Any) -> Iterator[None]:
+    """Attach fields (e.g. merchant_id, run_id) to every record logged inside the block."""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def get_log_context() -> Dict[str, Any]:
+    """Fields bound in the current context (to carry a run's context into worker processes)."""
+    return dict(_context.get())
+
+
+class ContextFilter(logging.Filter):
+    """Copy the bound run context onto each record that is actually emitted."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _context.get()
+        return True
+
+
+class TextFormatter(logging.Formatter):
+    """Plain console lines, prefixed with the merchant when one is bound."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        merchant_id = record.context.get("merchant_id")
+        if merchant_id is not None:
+            message = f"[{merchant_id}] {message}"
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        return message
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record for log collectors."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name[len(ROOT_LOGGER) + 1:],
+            "msg": record.getMessage(),
+            **record.context
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> logging.Logger:
+    """(Re)configure the backend loggers from arguments or LOG_LEVEL/LOG_FORMAT."""
+    global _configured
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    with _configure_lock:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(sys.stdout)
+        handler.addFilter(ContextFilter())
+        handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+        root.addHandler(handler)
+        root.setLevel(getattr(logging, level, logging.INFO))
+        # Backend records are not handed on to whatever the host configured
+        root.propagate = False
+        _configured = True
+    return root
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a backend module; configures logging on first use."""
+    if not _configured:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
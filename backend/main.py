@@ -0,0 +1,347 @@
+"""
+Production API server for the merchant operations workflow.
+
+A long-lived FastAPI process that keeps everything a run needs warm: the
+compiled workflow (graph.app), the shared LLM and HTTP clients, and each
+merchant's parsed datasets (DATASET_CACHE_ENABLED). Cold-start cost (imports,
+graph compilation, client construction, CSV parsing) is paid once per worker
+process instead of once per request. Runs execute with app.ainvoke on the
+worker's event loop, so one worker serves many concurrent runs; at most
+SERVER_MAX_CONCURRENT_RUNS execute at once and the rest wait their turn.
+
+Merchants listed in MERCHANT_MANIFEST (the batch runner's CSV/JSON-lines
+manifest: merchant_id[, data_dir]) are mapped to their data directories and
+preloaded at startup; any other merchant_id reads DATA_DIR.
+
+Usage:
+    cd backend
+    uvicorn main:app --host 0.0.0.0 --port 8000 --workers 2
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+# A long-lived process reads each merchant's CSVs once (see data_loader.load_cached)
+os.environ.setdefault("DATASET_CACHE_ENABLED", "true")
+
+import orjson
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+import graph
+from batch_runner import initial_state, load_manifest
+from batching import get_int_env
+from checkpointer import checkpoint_config
+from columnar import RecordTable
+from http_pool import get_http_clients
+from llm_config import get_llm, get_provider_info
+from logger import get_logger, log_context
+from nodes import load_merchant_data
+
+
+logger = get_logger(__name__)
+
+
+class RunRequest(BaseModel):
+    """One workflow run for a merchant, optionally on uploaded CSV text."""
+    merchant_id: str = Field(default="merchant_001", description="Merchant to run")
+    uploaded_data: Optional[Dict[str, str]] = Field(
+        default=None, description="products_csv / messages_csv / pricing_csv file contents"
+    )
+
+
+class StreamRequest(BaseModel):
+    """LangGraph Server style /runs/stream body, as sent by the dashboard."""
+    assistant_id: str = "salla_ops"
+    input: Dict[str, Any] = Field(default_factory=dict)
+    stream_mode: str = "values"
+
+
+# NumPy values serialize natively; NaN (unparseable prices/costs) becomes null
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def to_json(value: Any) -> Any:
+    """orjson default for other state values (columnar tables, exceptions)."""
+    if isinstance(value, RecordTable):
+        return [dict(row) for row in value]
+    return str(value)
+
+
+def dumps(payload: Any) -> str:
+    return orjson.dumps(payload, default=to_json, option=JSON_OPTIONS).decode()
+
+
+def jsonable(payload: Any) -> Any:
+    """Round-trip through JSON so responses never carry non-JSON state values."""
+    return orjson.loads(dumps(payload))
+
+
+class RunRegistry:
+    """
+    Tracks submitted runs and bounds how many execute at once.
+
+    Finished runs are kept for status lookups until more than max_finished
+    have piled up; the oldest are dropped first.
+    """
+
+    def __init__(self, max_concurrent: int, max_finished: int):
+        self.max_concurrent = max_concurrent
+        self.max_finished = max_finished
+        self.runs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.tasks: set = set()
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.completed = 0
+        self.failed = 0
+
+    def create(self, merchant_id: str) -> Dict[str, Any]:
+        record = {
+            "run_id": uuid.uuid4().hex,
+            "merchant_id": merchant_id,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "duration_seconds": None,
+            "result": None,
+            "error": None
+        }
+        self.runs[record["run_id"]] = record
+        return record
+
+    def finish(self, record: Dict[str, Any], result: Optional[Dict[str, Any]] = None,
+               error: Optional[Exception] = None) -> None:
+        # Runs that never got a slot have no duration
+        if record["started_at"] is not None:
+            record["duration_seconds"] = round(time.time() - record["started_at"], 3)
+        if error is None:
+            record["status"] = "completed"
+            record["result"] = summarize_result(result or {})
+            self.completed += 1
+        else:
+            record["status"] = "failed"
+            record["error"] = f"{type(error).__name__}: {error}"
+            self.failed += 1
+        finished = [run_id for run_id, run in self.runs.items() if run["status"] in ("completed", "failed")]
+        for run_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self.runs[run_id]
+
+    def cancel_queued(self, record: Dict[str, Any], reason: str) -> None:
+        """Fail a run that was abandoned while waiting for a slot, so it does not stay queued."""
+        if record["status"] == "queued":
+            self.finish(record, error=asyncio.CancelledError(reason))
+
+    def count(self, status: str) -> int:
+        return sum(1 for run in self.runs.values() if run["status"] == status)
+
+
+def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a final state a client needs (same fields as batch reports)."""
+    return {
+        "final_report": result.get("final_report", {}),
+        "catalog_issues": len(result.get("catalog_issues", [])),
+        "sentiment_score": result.get("sentiment_score"),
+        "complaint_spike_detected": result.get("complaint_spike_detected", False)
+    }
+
+
+# merchant_id -> manifest entry (merchant_id, data_dir), filled at startup
+MERCHANTS: Dict[str, Dict[str, str]] = {}
+SERVER: Dict[str, Any] = {}
+
+
+def run_state(merchant_id: str, uploaded_data: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Initial state for a run; the coordinator loads (cached) merchant data unless files were uploaded."""
+    state = initial_state(MERCHANTS.get(merchant_id, {"merchant_id": merchant_id}))
+    if uploaded_data:
+        state["uploaded_data"] = uploaded_data
+    return state
+
+
+def run_config(record: Dict[str, Any]):
+    """Checkpoint config when the graph was compiled with a checkpointer."""
+    if getattr(graph.app, "checkpointer", None):
+        return checkpoint_config(record["merchant_id"], record["run_id"])
+    return None
+
+
+async def execute(registry: RunRegistry, record: Dict[str, Any], state: Dict[str, Any]) -> None:
+    """Run the warm graph for one record once a concurrency slot is free."""
+    try:
+        async with registry.semaphore:
+            record["status"] = "running"
+            record["started_at"] = time.time()
+            with log_context(merchant_id=record["merchant_id"], run_id=record["run_id"]):
+                try:
+                    result = await graph.app.ainvoke(state, run_config(record))
+                except asyncio.CancelledError as e:
+                    # The client of a synchronous /api/run went away
+                    registry.finish(record, error=e)
+                    raise
+                except Exception as e:
+                    logger.error("✗ Run %s failed: %s: %s", record["run_id"], type(e).__name__, e)
+                    registry.finish(record, error=e)
+                    return
+            registry.finish(record, result)
+    finally:
+        registry.cancel_queued(record, "cancelled while queued")
+
+
+def warm_up() -> Dict[str, Any]:
+    """Build the shared clients and parse every known merchant's datasets once."""
+    start = time.perf_counter()
+    get_http_clients()
+    get_llm(temperature=0)
+
+    manifest = os.getenv("MERCHANT_MANIFEST")
+    if manifest:
+        MERCHANTS.update({entry["merchant_id"]: entry for entry in load_manifest(manifest)})
+    # Every manifest merchant's directory, plus DATA_DIR for merchants not listed
+    data_dirs = {entry.get("data_dir") or None for entry in MERCHANTS.values()} | {None}
+    for data_dir in data_dirs:
+        try:
+            load_merchant_data(data_dir, [])
+        except Exception as e:
+            # A broken merchant export fails its own runs, not the server
+            logger.warning("⚠️  Could not preload %s: %s: %s", data_dir or "DATA_DIR", type(e).__name__, e)
+
+    seconds = round(time.perf_counter() - start, 3)
+    logger.info("🔥 Warm: graph compiled, LLM clients ready, %d datasets preloaded in %.2fs",
+                len(data_dirs), seconds)
+    return {"warmup_seconds": seconds, "preloaded_datasets": len(data_dirs)}
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI):
+    SERVER["registry"] = RunRegistry(
+        max_concurrent=max(get_int_env("SERVER_MAX_CONCURRENT_RUNS", 32), 1),
+        max_finished=max(get_int_env("SERVER_MAX_FINISHED_RUNS", 1000), 0)
+    )
+    SERVER["started_at"] = time.time()
+    SERVER.update(await asyncio.to_thread(warm_up))
+    yield
+    registry: RunRegistry = SERVER["registry"]
+    if registry.tasks:
+        await asyncio.gather(*registry.tasks, return_exceptions=True)
+
+
+app = FastAPI(title="Salla Autonomous Merchant Operations", lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=[origin.strip() for origin in os.getenv("CORS_ALLOW_ORIGINS", "*").split(",")],
+    allow_methods=["*"],
+    allow_headers=["*"]
+)
+
+
+@app.get("/")
+async def root():
+    return {
+        "name": "Salla Autonomous Merchant Operations",
+        "graph": "salla_ops",
+        "endpoints": ["/health", "/api/run", "/api/submit", "/api/status", "/api/status/{run_id}", "/runs/stream"]
+    }
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "warm": "registry" in SERVER}
+
+
+@app.post("/api/run")
+async def run(request: RunRequest):
+    """Run the workflow and wait for its report."""
+    registry: RunRegistry = SERVER["registry"]
+    record = registry.create(request.merchant_id)
+    await execute(registry, record, run_state(request.merchant_id, request.uploaded_data))
+    return jsonable(record)
+
+
+@app.post("/api/submit", status_code=202)
+async def submit(request: RunRequest):
+    """Start the workflow in the background; poll /api/status/{run_id} for the report."""
+    registry: RunRegistry = SERVER["registry"]
+    record = registry.create(request.merchant_id)
+    task = asyncio.create_task(execute(registry, record, run_state(request.merchant_id, request.uploaded_data)))
+    # Keep a reference until the task is done so it is not garbage-collected
+    registry.tasks.add(task)
+    task.add_done_callback(registry.tasks.discard)
+    return {"run_id": record["run_id"], "status": record["status"]}
+
+
+@app.get("/api/status")
+async def status():
+    """Server status: warm-up cost, runs in flight and provider."""
+    registry: RunRegistry = SERVER["registry"]
+    return {
+        "uptime_seconds": round(time.time() - SERVER["started_at"], 1),
+        "warmup_seconds": SERVER.get("warmup_seconds"),
+        "preloaded_datasets": SERVER.get("preloaded_datasets"),
+        "max_concurrent_runs": registry.max_concurrent,
+        "running": registry.count("running"),
+        "queued": registry.count("queued"),
+        "completed": registry.completed,
+        "failed": registry.failed,
+        "llm": get_provider_info()
+    }
+
+
+@app.get("/api/status/{run_id}")
+async def run_status(run_id: str):
+    """Status of one run, with its report once completed."""
+    record = SERVER["registry"].runs.get(run_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run_id: {run_id}")
+    return jsonable(record)
+
+
+def sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+@app.post("/runs/stream")
+async def stream_run(request: StreamRequest):
+    """
+    Stream full state snapshots as Server-Sent Events, in the shape the
+    dashboard expects from `langgraph dev` (metadata, values..., end).
+    """
+    registry: RunRegistry = SERVER["registry"]
+    merchant_id = str(request.input.get("merchant_id") or "merchant_001")
+    state = run_state(merchant_id, request.input.get("uploaded_data"))
+
+    async def events():
+        # Registered once streaming starts, so a response that never starts leaves no record behind
+        record = registry.create(merchant_id)
+        try:
+            yield sse("metadata", {"run_id": record["run_id"]})
+            async with registry.semaphore:
+                record["status"] = "running"
+                record["started_at"] = time.time()
+                values = {}
+                with log_context(merchant_id=merchant_id, run_id=record["run_id"]):
+                    try:
+                        async for values in graph.app.astream(state, run_config(record), stream_mode="values"):
+                            yield sse("values", values)
+                    except Exception as e:
+                        logger.error("✗ Run %s failed: %s: %s", record["run_id"], type(e).__name__, e)
+                        registry.finish(record, error=e)
+                        yield sse("error", {"error": record["error"]})
+                        return
+                    finally:
+                        if record["status"] == "running" and not values.get("final_report"):
+                            # The client disconnected mid-stream
+                            registry.finish(record, error=asyncio.CancelledError("client disconnected"))
+                if record["status"] == "running":
+                    registry.finish(record, values)
+            yield sse("end", None)
+        finally:
+            # The client disconnected while the run waited for a slot
+            registry.cancel_queued(record, "client disconnected while queued")
+
+    return StreamingResponse(events(), media_type="text/event-stream")
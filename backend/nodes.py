@@ -2,59 +2,83 @@
 LangGraph nodes implementing the orchestration logic.
 """
 import re
-from typing import Dict, Any
+from io import StringIO
+from typing import Dict, Any, List, Optional
 from agents.catalog_agent import catalog_agent
 from agents.support_agent import support_agent
-from agents.pricing_agent import pricing_agent
+from agents.pricing_agent import pricing_agent, build_pricing_index
+from agents.product_sentiment import sentiment_for
 # Import the data loader here
-from data_loader import load_sample_data
+from data_loader import load_sample_data, iter_csv_batches, iter_csv_frames, read_rows, read_table
+from batching import get_bool_env, get_int_env
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+
+def load_merchant_data(data_dir: Optional[str] = None, issues: Optional[List[Dict[str, Any]]] = None):
+    """
+    Read a merchant's products, messages and pricing rows with the coordinator's
+    row limits (PRODUCT_ROW_LIMIT, MESSAGE_ROW_LIMIT, PRICING_ROW_LIMIT) and COLUMNAR_STATE.
+    A server calls this at startup to fill the dataset cache for later runs.
+    """
+    return load_sample_data(
+        get_int_env("PRODUCT_ROW_LIMIT", 10), get_int_env("MESSAGE_ROW_LIMIT", 20),
+        get_int_env("PRICING_ROW_LIMIT", 5),
+        data_dir=data_dir, issues=issues, columnar=get_bool_env("COLUMNAR_STATE", False)
+    )
 
 
 def coordinator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Coordinator: Initializes the workflow and prepares data.
     """
-    print("\n" + "="*60)
-    print("🧠 COORDINATOR AGENT: Starting Daily Operations Run")
-    print("="*60)
-    
     merchant_id = state.get("merchant_id", "unknown")
-    print(f"Merchant: {merchant_id}")
+    logger.info("🧠 Coordinator: Starting daily operations run for merchant %s", merchant_id)
     
     # --- NEW LOGIC: SELF-LOADING DATA ---
     # Check if uploaded data is provided, otherwise load from local storage
     updates = {}
     uploaded_data = state.get("uploaded_data")
+    product_limit = get_int_env("PRODUCT_ROW_LIMIT", 10)
+    message_limit = get_int_env("MESSAGE_ROW_LIMIT", 20)
+    pricing_limit = get_int_env("PRICING_ROW_LIMIT", 5)
+    # Unparseable numeric cells found while loading, reported as catalog issues
+    load_issues = []
+    # COLUMNAR_STATE keeps the input datasets as column-backed RecordTables
+    columnar = get_bool_env("COLUMNAR_STATE", False)
+    
+    def read_upload(csv_text: str, dataset: str, limit: int):
+        if columnar:
+            return read_table(iter_csv_frames(StringIO(csv_text), dataset=dataset, issues=load_issues), limit)
+        return read_rows(iter_csv_batches(StringIO(csv_text), dataset=dataset, issues=load_issues), limit)
     
     if uploaded_data:
-        print("📂 Coordinator: Processing uploaded CSV data...")
-        import pandas as pd
-        from io import StringIO
+        logger.info("📂 Coordinator: Processing uploaded CSV data...")
         
         # Parse uploaded CSVs
         product_data = []
         customer_messages = []
         pricing_context = []
         
+        # Stream each CSV and stop reading once the row limit is reached
         if uploaded_data.get("products_csv"):
-            df = pd.read_csv(StringIO(uploaded_data["products_csv"]))
-            product_data = df.to_dict('records')
-            print(f"✓ Loaded {len(product_data)} products from uploaded file")
+            product_data = read_upload(uploaded_data["products_csv"], "products", product_limit)
+            logger.info("✓ Loaded %d products from uploaded file", len(product_data))
         
         if uploaded_data.get("messages_csv"):
-            df = pd.read_csv(StringIO(uploaded_data["messages_csv"]))
-            customer_messages = df.to_dict('records')
-            print(f"✓ Loaded {len(customer_messages)} messages from uploaded file")
+            customer_messages = read_upload(uploaded_data["messages_csv"], "messages", message_limit)
+            logger.info("✓ Loaded %d messages from uploaded file", len(customer_messages))
         
         if uploaded_data.get("pricing_csv"):
-            df = pd.read_csv(StringIO(uploaded_data["pricing_csv"]))
-            pricing_context = df.to_dict('records')
-            print(f"✓ Loaded {len(pricing_context)} pricing contexts from uploaded file")
+            pricing_context = read_upload(uploaded_data["pricing_csv"], "pricing", pricing_limit)
+            logger.info("✓ Loaded %d pricing contexts from uploaded file", len(pricing_context))
         
         updates = {
-            "product_data": product_data[:10] if product_data else [],
-            "customer_messages": customer_messages[:20] if customer_messages else [],
-            "pricing_context": pricing_context[:5] if pricing_context else [],
+            "product_data": product_data,
+            "customer_messages": customer_messages,
+            "pricing_context": pricing_context,
             "competitor_data": [],
             "catalog_issues": [],
             "pricing_proposals": [],
@@ -62,23 +86,31 @@ def coordinator_node(state: Dict[str, Any]) -> Dict[str, Any]:
             "final_report": {}
         }
     elif not state.get("product_data"):
-        print("📂 Coordinator: No input data found. Loading from local storage...")
-        product_data, customer_messages, pricing_context = load_sample_data()
+        logger.info("📂 Coordinator: No input data found. Loading from local storage...")
+        product_data, customer_messages, pricing_context = load_merchant_data(state.get("data_dir"), load_issues)
         
         # We update the state with the loaded data
         updates = {
-            "product_data": product_data[:10],
-            "customer_messages": customer_messages[:20],
-            "pricing_context": pricing_context[:5],
+            "product_data": product_data,
+            "customer_messages": customer_messages,
+            "pricing_context": pricing_context,
             "competitor_data": [],
             "catalog_issues": [],
             "pricing_proposals": [],
             "support_summary": {},
             "final_report": {}
         }
-        print("✓ Data loaded successfully")
+        logger.info("✓ Data loaded successfully")
     # ------------------------------------
     
+    if "pricing_context" in updates:
+        # Index competitor prices once per run; the Pricing Agent and validator reuse it
+        updates["pricing_index"] = build_pricing_index(updates["pricing_context"])
+    
+    if load_issues:
+        logger.warning("⚠️  %d unparseable numeric cells flagged at load time", len(load_issues))
+        updates["catalog_issues"] = load_issues
+    
     # Initialize tracking
     return {
         "retry_count": 0,
@@ -91,14 +123,28 @@ def coordinator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+def analysis_join_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Join: Waits for the parallel Support and Catalog branches before the safety gate.
+    """
+    logger.info("--- 🔗 Analysis Join: Support & Catalog Complete ---")
+    
+    return {
+        "audit_log": [{
+            "action": "analysis_completed",
+            "products_normalized": len(state.get("normalized_catalog", [])),
+            "catalog_issues": len(state.get("catalog_issues", [])),
+            "complaint_spike_detected": state.get("complaint_spike_detected", False)
+        }]
+    }
+
+
 def throttler_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Throttler: Freezes all operations when viral spike detected.
     This is the safety circuit breaker.
     """
-    print("\n" + "!"*60)
-    print("❄️  THROTTLER ACTIVATED: FREEZING ALL OPERATIONS")
-    print("!"*60)
+    logger.warning("❄️  THROTTLER ACTIVATED: FREEZING ALL OPERATIONS")
     
     support_summary = state.get("support_summary", {})
     
@@ -137,20 +183,21 @@ def validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Validator: Performs hallucination checks and contradiction detection.
     This is the verification layer between agent outputs and final resolution.
     """
-    print("\n--- 🕵️ Validator Agent: Pipeline Checks ---")
+    logger.info("--- 🕵️ Validator Agent: Pipeline Checks ---")
     
     proposals = state.get("pricing_proposals", [])
     pricing_context = state.get("pricing_context", [])
     sentiment = state.get("sentiment_score", 0.0)
+    # Map: str(product_id) -> sentiment/complaints of the messages about it
+    product_sentiment = state.get("product_sentiment")
     
     validation_flags = []
     
-    # Convert pricing context to a lookup map for O(1) access
-    # Map: product_id -> competitor_price
-    context_map = {
-        item.get("product_id"): float(item.get("competitor_price", 0)) 
-        for item in pricing_context
-    }
+    # Reuse the coordinator's competitor index for O(1) access
+    # Map: str(product_id) -> competitor_price
+    context_map = state.get("pricing_index")
+    if context_map is None:
+        context_map = build_pricing_index(pricing_context)
     
     for proposal in proposals:
         pid = proposal.get("product_id")
@@ -166,7 +213,7 @@ def validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
                     claimed_price = float(match.group(1))
                     
                     # Verify against source of truth
-                    actual_price = context_map.get(pid)
+                    actual_price = context_map.get(str(pid))
                     
                     if actual_price is None:
                         flag = {
@@ -176,7 +223,7 @@ def validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
                             "message": f"Agent cited competitor price ${claimed_price}, but no competitor data exists for this product."
                         }
                         validation_flags.append(flag)
-                        print(f"🚨 Hallucination detected for {pid}: Claimed context that doesn't exist.")
+                        logger.warning("🚨 Hallucination detected for %s: Claimed context that doesn't exist.", pid)
                     
                     elif abs(claimed_price - actual_price) > 0.01:
                         flag = {
@@ -186,21 +233,22 @@ def validator_node(state: Dict[str, Any]) -> Dict[str, Any]:
                             "message": f"Agent cited competitor price ${claimed_price}, but source data says ${actual_price}."
                         }
                         validation_flags.append(flag)
-                        print(f"🚨 Data Mismatch for {pid}: Claimed ${claimed_price} vs Actual ${actual_price}")
+                        logger.warning("🚨 Data Mismatch for %s: Claimed $%s vs Actual $%s", pid, claimed_price, actual_price)
         
         # --- CHECK 2: CONTRADICTION DETECTION ---
-        # Check: Positive price action vs Negative Sentiment
-        if proposal.get("status") == "INCREASE" and sentiment < -0.3:
+        # Check: Positive price action vs Negative Sentiment (about this product)
+        product_score = sentiment_for(product_sentiment, pid, sentiment)
+        if proposal.get("status") == "INCREASE" and product_score < -0.3:
             flag = {
                 "product_id": pid,
                 "type": "CONTRADICTION",
                 "severity": "MEDIUM",
-                "message": f"Proposed price increase contradicts negative market sentiment ({sentiment:.2f})."
+                "message": f"Proposed price increase contradicts negative market sentiment ({product_score:.2f})."
             }
             validation_flags.append(flag)
-            print(f"⚠️ Contradiction detected for {pid}: Price hike during negative sentiment.")
+            logger.debug("⚠️ Contradiction detected for %s: Price hike during negative sentiment.", pid)
     
-    print(f"✓ Validation complete. Found {len(validation_flags)} flags.")
+    logger.info("✓ Validation complete. Found %d flags.", len(validation_flags))
     
     return {
         "validation_flags": validation_flags,
@@ -216,12 +264,13 @@ def conflict_resolver_node(state: Dict[str, Any]) -> Dict[str, Any]:
     Resolver: Cross-checks outputs and finalizes decisions.
     Applies merchant locks and business logic.
     """
-    print("\n--- ⚖️  Conflict Resolver: Validating & Finalizing ---")
+    logger.info("--- ⚖️  Conflict Resolver: Validating & Finalizing ---")
     
     proposals = state.get("pricing_proposals", [])
     catalog_issues = state.get("catalog_issues", [])
     support_summary = state.get("support_summary", {})
     sentiment = state.get("sentiment_score", 0.0)
+    product_sentiment = state.get("product_sentiment")
     merchant_locks = state.get("merchant_locks", {})
     validation_flags = state.get("validation_flags", [])  # <--- GET FLAGS
     
@@ -250,7 +299,7 @@ def conflict_resolver_node(state: Dict[str, Any]) -> Dict[str, Any]:
                 critical_error_ids.add(pid)
     
     if critical_error_ids:
-        print(f"⚠️  CROSS-CHECK: Found {len(critical_error_ids)} products with critical catalog errors.")
+        logger.warning("⚠️  CROSS-CHECK: Found %d products with critical catalog errors.", len(critical_error_ids))
     # -----------------------------------------------------------
     
     # Process each pricing proposal
@@ -311,13 +360,14 @@ def conflict_resolver_node(state: Dict[str, Any]) -> Dict[str, Any]:
             warnings.append(f"Blocked pricing for {product_id} due to catalog data corruption")
             continue
         
-        # 4. PRIORITY 3: SENTIMENT CHECK
-        if sentiment < -0.3 and proposed_price > current_price:
+        # 4. PRIORITY 3: SENTIMENT CHECK (the product's own sentiment when available)
+        product_score = sentiment_for(product_sentiment, product_id, sentiment)
+        if product_score < -0.3 and proposed_price > current_price:
             final_actions.append({
                 **proposal,
                 "final_price": current_price,
                 "status": "BLOCKED",
-                "note": f"Price increase blocked: negative sentiment ({sentiment:.2f})"
+                "note": f"Price increase blocked: negative sentiment ({product_score:.2f})"
             })
             warnings.append(f"Blocked price increase for {product_id} due to sentiment")
             continue
@@ -357,9 +407,10 @@ def conflict_resolver_node(state: Dict[str, Any]) -> Dict[str, Any]:
     critical_issues_count = len([i for i in catalog_issues if i.get("type") == "critical"])
     alert_level = "RED" if critical_issues_count > 0 else "YELLOW" if warnings else "GREEN"
     
-    print(f"✓ Finalized {len(final_actions)} pricing decisions")
-    print(f"✓ Metrics: Pass Rate {metrics['pricing_pass_rate']}%, Hallucinations {metrics['hallucination_rate']}%")
-    print(f"✓ Alert Level: {alert_level}")
+    logger.info("✓ Finalized %d pricing decisions", len(final_actions))
+    logger.info("✓ Metrics: Pass Rate %s%%, Hallucinations %s%%",
+                metrics["pricing_pass_rate"], metrics["hallucination_rate"])
+    logger.info("✓ Alert Level: %s", alert_level)
     
     # Generate final report
     final_report = {
@@ -405,6 +456,10 @@ def generate_recommendations(state: Dict, actions: list, warnings: list) -> list
     if sentiment < -0.3:
         recommendations.append("⚠️ Address negative customer sentiment before making price increases")
     
+    unhappy = [pid for pid, entry in (state.get("product_sentiment") or {}).items() if entry["sentiment"] < -0.3]
+    if unhappy:
+        recommendations.append(f"🗣️ Review complaints about {len(unhappy)} products with negative sentiment")
+    
     if catalog_issues:
         recommendations.append(f"📦 Review {len(catalog_issues)} catalog data quality issues")
     
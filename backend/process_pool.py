@@ -0,0 +1,235 @@
+"""
+Process-pool execution for CPU-bound graph nodes.
+
+With CPU_POOL_ENABLED=true, build_workflow() wraps the pure-Python nodes
+(coordinator CSV parsing, pricing, validator, resolver) so they run in a
+shared pool of worker processes instead of on the calling thread. Many
+merchants running in one process (batch_runner.py) then use every core
+instead of serializing on the GIL.
+
+Each node is sent only the state keys it reads (see graph.POOLED_NODE_READS),
+so e.g. the resolver never pickles the catalog. Large numeric RecordTable
+columns (COLUMNAR_STATE=true) travel through multiprocessing shared memory in
+both directions instead of being pickled through the pool's pipe; everything
+else is pickled as usual.
+
+Workers are spawned once and inherit the environment at that time, so set
+node settings (PRICING_ENGINE, row limits, ...) before the first run.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+from batching import get_int_env
+from columnar import RecordTable
+from logger import get_log_context, log_context
+
+
+class SharedColumn(NamedTuple):
+    """Location of one column copied into a shared memory block."""
+    block: str
+    dtype: str
+    length: int
+
+
+class SharedTable(NamedTuple):
+    """Picklable stand-in for a RecordTable whose large columns live in shared memory."""
+    columns: Dict[str, Any]
+
+
+def get_shm_min_bytes() -> int:
+    """Columns smaller than CPU_POOL_SHM_MIN_BYTES (default: 1 MiB) are pickled instead."""
+    return get_int_env("CPU_POOL_SHM_MIN_BYTES", 1 << 20)
+
+
+def share_tables(values: Dict[str, Any], blocks: List[shared_memory.SharedMemory]) -> Dict[str, Any]:
+    """
+    Copy the large numeric columns of every RecordTable value into new
+    shared memory blocks (appended to blocks) and replace the table with a
+    SharedTable. Other values are returned unchanged.
+    """
+    if not isinstance(values, dict):
+        return values
+    min_bytes = get_shm_min_bytes()
+    shared = {}
+    for key, value in values.items():
+        if not isinstance(value, RecordTable):
+            shared[key] = value
+            continue
+        columns = {}
+        for name in value.columns:
+            column = value.column(name)
+            if column.dtype == object or column.nbytes < max(min_bytes, 1):
+                columns[name] = column
+                continue
+            block = shared_memory.SharedMemory(create=True, size=column.nbytes)
+            blocks.append(block)
+            np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf)[:] = column
+            columns[name] = SharedColumn(block.name, column.dtype.str, len(column))
+        shared[key] = SharedTable(columns)
+    return shared
+
+
+def attach_tables(
+    values: Dict[str, Any],
+    handles: List[shared_memory.SharedMemory],
+    copy: bool = False
+) -> Dict[str, Any]:
+    """
+    Rebuild RecordTables from SharedTables. Columns are zero-copy views of
+    the shared blocks (kept open in handles) unless copy is set.
+    """
+    if not isinstance(values, dict):
+        return values
+    attached = {}
+    for key, value in values.items():
+        if not isinstance(value, SharedTable):
+            attached[key] = value
+            continue
+        columns = {}
+        for name, column in value.columns.items():
+            if isinstance(column, SharedColumn):
+                block = shared_memory.SharedMemory(name=column.block)
+                handles.append(block)
+                view = np.ndarray((column.length,), dtype=np.dtype(column.dtype), buffer=block.buf)
+                column = view.copy() if copy else view
+            columns[name] = column
+        attached[key] = RecordTable(columns)
+    return attached
+
+
+def release(blocks: List[shared_memory.SharedMemory], unlink: bool = False) -> None:
+    """Close (and optionally unlink) shared memory blocks."""
+    for block in blocks:
+        try:
+            block.close()
+        except BufferError:
+            # A view is still referenced (e.g. from a traceback); the mapping goes with it
+            pass
+        if unlink:
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def run_in_worker(
+    func: Callable[[Dict[str, Any]], Dict[str, Any]],
+    payload: Dict[str, Any],
+    context: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Worker-side entry point: attach shared inputs, run the node (with the
+    caller's log context), share large outputs.
+    """
+    handles: List[shared_memory.SharedMemory] = []
+    try:
+        with log_context(**(context or {})):
+            result = func(attach_tables(payload, handles))
+        blocks: List[shared_memory.SharedMemory] = []
+        # The parent unlinks output blocks once it has copied them
+        shared = share_tables(result, blocks)
+        release(blocks)
+        return shared
+    finally:
+        release(handles)
+
+
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide worker pool.
+
+    Environment Variables:
+    - CPU_POOL_WORKERS: Worker processes (default: number of CPUs)
+    """
+    workers = get_int_env("CPU_POOL_WORKERS", 0) or os.cpu_count() or 1
+    with _pools_lock:
+        if workers not in _pools:
+            # spawn: forking a process that already runs threads (LLM clients, event loops) is unsafe
+            _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pools[workers]
+
+
+def shutdown_process_pools() -> None:
+    """Stop all worker pools (they are recreated on next use)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True)
+
+
+def _submit(func: Callable, state: Dict[str, Any]) -> Tuple[Any, List[shared_memory.SharedMemory]]:
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        future = get_process_pool().submit(
+            run_in_worker, func, share_tables(state, blocks), get_log_context()
+        )
+    except BaseException:
+        release(blocks, unlink=True)
+        raise
+    return future, blocks
+
+
+def _collect(result: Dict[str, Any]) -> Dict[str, Any]:
+    handles: List[shared_memory.SharedMemory] = []
+    try:
+        return attach_tables(result, handles, copy=True)
+    finally:
+        release(handles, unlink=True)
+
+
+def select_state(state: Dict[str, Any], reads: Optional[Sequence[Union[str, Tuple[str, ...]]]]) -> Dict[str, Any]:
+    """
+    The part of state a node reads. Each entry of reads is a key, or a tuple
+    of fallbacks of which only the first one set (not None) is sent, for
+    nodes that read b only when a is missing. reads=None selects the whole
+    state.
+    """
+    if reads is None:
+        return dict(state)
+    selected = {}
+    for entry in reads:
+        for key in (entry,) if isinstance(entry, str) else entry:
+            if state.get(key) is not None:
+                selected[key] = state[key]
+                break
+    return selected
+
+
+def pooled_node(
+    func: Callable[[Dict[str, Any]], Dict[str, Any]],
+    name: Optional[str] = None,
+    reads: Optional[Sequence[Union[str, Tuple[str, ...]]]] = None
+) -> RunnableLambda:
+    """
+    Wrap a module-level node function so invoke() and ainvoke() run it in
+    the worker pool. func must be importable by the workers (no lambdas).
+    Only the state keys in reads (see select_state) are sent to the worker.
+    """
+    def run(state: Dict[str, Any]) -> Dict[str, Any]:
+        future, blocks = _submit(func, select_state(state, reads))
+        try:
+            return _collect(future.result())
+        finally:
+            release(blocks, unlink=True)
+
+    async def arun(state: Dict[str, Any]) -> Dict[str, Any]:
+        future, blocks = _submit(func, select_state(state, reads))
+        try:
+            return _collect(await asyncio.wrap_future(future))
+        finally:
+            release(blocks, unlink=True)
+
+    return RunnableLambda(run, afunc=arun, name=name or func.__name__)
@@ -0,0 +1,154 @@
+"""
+Compact prompt serialization for batched LLM inputs.
+
+Records are packed one per line as minified JSON instead of a Python list
+repr: empty and NaN fields are dropped, and long text fields are cut to a
+character budget. PROMPT_FORMAT=table sends a JSON column header once and
+then one JSON array of values per record, so keys are not repeated. Batch sizes are measured with the model tokenizer
+(tiktoken) when it is available, against a configurable context limit, so
+each request carries as many rows as the model can take.
+"""
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+from batching import estimate_tokens, get_int_env
+from logger import get_logger
+
+
+logger = get_logger(__name__)
+
+# Marker appended to truncated text fields
+TRUNCATION_MARK = "…"
+
+PROMPT_FORMATS = ("jsonl", "table")
+
+_counters: Dict[str, Callable[[str], int]] = {}
+_counters_lock = threading.Lock()
+
+
+def is_empty(value: Any) -> bool:
+    """True for None, NaN and blank strings."""
+    if value is None:
+        return True
+    if isinstance(value, float) and math.isnan(value):
+        return True
+    return isinstance(value, str) and not value.strip()
+
+
+def compact_record(record: Mapping[str, Any], max_field_chars: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Copy of a record without empty fields and with long strings truncated
+    to max_field_chars (PROMPT_FIELD_MAX_CHARS, default 300; 0 = no limit).
+    """
+    if max_field_chars is None:
+        max_field_chars = get_int_env("PROMPT_FIELD_MAX_CHARS", 300)
+    compact = {}
+    for key, value in record.items():
+        if is_empty(value):
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if max_field_chars and len(value) > max_field_chars:
+                value = value[:max_field_chars].rstrip() + TRUNCATION_MARK
+        elif isinstance(value, float) and value.is_integer():
+            value = int(value)
+        compact[key] = value
+    return compact
+
+
+def get_prompt_format() -> str:
+    """PROMPT_FORMAT: "jsonl" (one JSON object per record) or "table" (default: jsonl)."""
+    value = os.getenv("PROMPT_FORMAT", "jsonl").strip().lower() or "jsonl"
+    if value not in PROMPT_FORMATS:
+        logger.warning("⚠️  Invalid value for PROMPT_FORMAT: %r. Using jsonl.", value)
+        return "jsonl"
+    return value
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def serialize_record(record: Mapping[str, Any], prompt_format: Optional[str] = None) -> str:
+    """
+    One record as it appears in a packed prompt: a minified JSON object, or
+    for the table format the JSON array of its values.
+    """
+    compact = compact_record(record)
+    if (prompt_format or get_prompt_format()) == "table":
+        return _dumps(list(compact.values()))
+    return _dumps(compact)
+
+
+def pack_records(records: Iterable[Mapping[str, Any]], prompt_format: Optional[str] = None) -> str:
+    """Records as JSON lines (or a header line plus value rows), ready to drop into a prompt."""
+    if (prompt_format or get_prompt_format()) == "table":
+        rows = [compact_record(record) for record in records]
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        lines = [_dumps(columns)] + [_dumps([row.get(column) for column in columns]) for row in rows]
+        return "\n".join(lines)
+    return "\n".join(_dumps(compact_record(record)) for record in records)
+
+
+def get_token_counter() -> Callable[[str], int]:
+    """
+    Token counting function for prompt budgeting.
+
+    Environment Variables:
+    - PROMPT_TOKENIZER: tiktoken encoding name, or "estimate" for the
+      chars/4 heuristic (default: o200k_base)
+
+    Falls back to the heuristic when tiktoken or the encoding is unavailable
+    (e.g. offline without a cached encoding file).
+    """
+    name = os.getenv("PROMPT_TOKENIZER", "o200k_base").strip() or "o200k_base"
+    with _counters_lock:
+        if name not in _counters:
+            _counters[name] = _load_counter(name)
+        return _counters[name]
+
+
+def _load_counter(name: str) -> Callable[[str], int]:
+    if name == "estimate":
+        return estimate_tokens
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning("⚠️  Tokenizer %r unavailable (%s). Using estimated token counts.", name, type(e).__name__)
+        return estimate_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in text according to the configured tokenizer."""
+    return get_token_counter()(text)
+
+
+def get_batch_token_budget(setting: str, default: int, prompt_tokens: int = 0) -> int:
+    """
+    Record tokens allowed per batch: the agent's own setting (e.g.
+    CATALOG_BATCH_TOKENS), capped by what fits in the model context.
+
+    Environment Variables:
+    - LLM_CONTEXT_TOKENS: Model context window, 0 = no cap (default: 0)
+    - LLM_OUTPUT_RESERVE_TOKENS: Context kept free for the response (default: 4000)
+    """
+    budget = get_int_env(setting, default)
+    context = get_int_env("LLM_CONTEXT_TOKENS", 0)
+    if context:
+        available = context - prompt_tokens - get_int_env("LLM_OUTPUT_RESERVE_TOKENS", 4000)
+        budget = min(budget, max(available, 1))
+    return budget
+
+
+def prompt_overhead_tokens(prompt) -> int:
+    """Tokens taken by a ChatPromptTemplate's fixed text (everything but the records)."""
+    text = "\n".join(
+        getattr(message.prompt, "template", "")
+        for message in prompt.messages
+        if hasattr(message, "prompt")
+    )
+    return count_tokens(text)
@@ -0,0 +1,372 @@
+"""
+Adaptive rate limiting for LLM HTTP calls.
+
+One process-wide AdaptiveRateLimiter sits under every OpenAI/Azure request
+(see RateLimitedTransport in http_pool). It combines:
+- token buckets for requests/min and tokens/min,
+- an AIMD concurrency window: +1 slot per window of successful calls, halved
+  on every 429,
+- retry-after handling and jittered exponential backoff, so 429s are retried
+  instead of failing the run. Transient 5xx responses and connection errors
+  are retried with the same backoff, without shrinking the window.
+
+The transport is the only retry layer: the pooled OpenAI/Azure clients are
+built with max_retries=0 (see llm_config), so SDK retries never multiply
+the attempts or bypass the backoff.
+"""
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+import httpx
+from batching import estimate_tokens, get_float_env, get_int_env, get_max_concurrency
+from instrumentation import record
+
+
+# Status codes treated as "slow down" signals
+RETRY_STATUSES = (429,)
+
+# Transient server errors, retried without shrinking the window
+TRANSIENT_STATUSES = (500, 502, 503, 504)
+
+# How often a waiter re-checks for a free concurrency slot
+SLOT_POLL_SECONDS = 0.01
+
+
+class TokenBucket:
+    """
+    Refills at rate_per_minute / 60 per second up to capacity. A request larger
+    than the capacity is admitted once the bucket is full and leaves it in debt.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float, now: float):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(capacity, 1.0)
+        self.level = self.capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        needed = min(amount, self.capacity)
+        if self.level >= needed:
+            return 0.0
+        return (needed - self.level) / self.rate
+
+
+class AdaptiveRateLimiter:
+    """Requests/min and tokens/min buckets plus an AIMD concurrency window."""
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        burst_seconds: float = 1.0,
+        max_retries: int = 6,
+        retry_base_seconds: float = 0.5,
+        retry_max_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        now = clock()
+        self.clock = clock
+        self.request_bucket = (
+            TokenBucket(requests_per_minute, requests_per_minute / 60.0 * burst_seconds, now)
+            if requests_per_minute else None
+        )
+        self.token_bucket = (
+            TokenBucket(tokens_per_minute, tokens_per_minute / 60.0 * burst_seconds, now)
+            if tokens_per_minute else None
+        )
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = max(min(min_concurrency, self.max_concurrency), 1)
+        self.concurrency = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0, "waited_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    # --- Admission ---
+
+    def try_acquire(self, tokens: int = 0) -> float:
+        """
+        Take a concurrency slot and bucket capacity if available.
+        Returns 0 on success, otherwise the seconds to wait before trying again.
+        """
+        with self._lock:
+            now = self.clock()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.in_flight >= int(self.concurrency):
+                return SLOT_POLL_SECONDS
+
+            waits = []
+            for bucket, amount in ((self.request_bucket, 1), (self.token_bucket, tokens)):
+                if bucket is not None:
+                    bucket.refill(now)
+                    waits.append(bucket.wait_time(amount))
+            wait = max(waits, default=0.0)
+            if wait > 0:
+                return wait
+
+            if self.request_bucket is not None:
+                self.request_bucket.level -= 1
+            if self.token_bucket is not None:
+                self.token_bucket.level -= tokens
+            self.in_flight += 1
+            self.stats["requests"] += 1
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block the calling thread until the request may be sent; returns seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            with self._lock:
+                self.stats["waited_seconds"] += wait
+            waited += wait
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> float:
+        """Wait on the event loop until the request may be sent; returns seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.try_acquire(tokens)
+            if not wait:
+                return waited
+            with self._lock:
+                self.stats["waited_seconds"] += wait
+            waited += wait
+            await asyncio.sleep(wait)
+
+    # --- Feedback ---
+
+    def on_success(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        """Release the slot, settle the token estimate and grow the window additively."""
+        with self._lock:
+            self.in_flight -= 1
+            if self.token_bucket is not None and actual_tokens is not None:
+                self.token_bucket.level -= actual_tokens - estimated_tokens
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Release the slot, halve the window and pause admission for retry_after."""
+        with self._lock:
+            self.in_flight -= 1
+            self.stats["rate_limited"] += 1
+            self.concurrency = max(self.min_concurrency, self.concurrency / 2.0)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, self.clock() + retry_after)
+
+    def on_error(self) -> None:
+        """Release the slot after a transport error."""
+        with self._lock:
+            self.in_flight -= 1
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number attempt (0-based): retry-after, else full-jitter exponential."""
+        with self._lock:
+            self.stats["retries"] += 1
+        if retry_after:
+            # A little jitter keeps waiters from retrying in lockstep
+            return retry_after * random.uniform(1.0, 1.2)
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+def parse_retry_after(headers: httpx.Headers) -> Optional[float]:
+    """Seconds to wait from retry-after-ms / retry-after headers, if present."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return None
+
+
+def estimate_request_tokens(request: httpx.Request) -> int:
+    """Prompt size estimate plus the requested completion budget, if any."""
+    body = request.content.decode("utf-8", errors="ignore") if request.content else ""
+    tokens = estimate_tokens(body)
+    try:
+        payload = json.loads(body) if body else {}
+        tokens += int(payload.get("max_tokens") or payload.get("max_completion_tokens") or 0)
+    except (ValueError, AttributeError, TypeError):
+        pass
+    return tokens
+
+
+def response_tokens(content: bytes) -> Optional[int]:
+    """usage.total_tokens from a chat completion response body."""
+    try:
+        return int(json.loads(content)["usage"]["total_tokens"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class RateLimitedTransport(httpx.BaseTransport):
+    """Sync transport that admits, retries and adapts through an AdaptiveRateLimiter."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: AdaptiveRateLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.limiter.max_retries + 1):
+            last_attempt = attempt == self.limiter.max_retries
+            record(queue_wait_seconds=self.limiter.acquire(tokens))
+            try:
+                response = self.transport.handle_request(request)
+                if response.status_code not in RETRY_STATUSES:
+                    content = response.read()
+            except httpx.TransportError:
+                self.limiter.on_error()
+                if last_attempt:
+                    raise
+                record(retries=1)
+                time.sleep(self.limiter.backoff(attempt))
+                continue
+            except BaseException:
+                self.limiter.on_error()
+                raise
+
+            if response.status_code in TRANSIENT_STATUSES:
+                # A failing upstream must never count as a success that grows the window
+                self.limiter.on_error()
+                if last_attempt:
+                    return response
+                record(retries=1)
+                response.close()
+                time.sleep(self.limiter.backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                self.limiter.on_success(tokens, response_tokens(content))
+                return response
+
+            retry_after = parse_retry_after(response.headers)
+            self.limiter.on_rate_limited(retry_after)
+            record(rate_limited=1)
+            if last_attempt:
+                return response
+            record(retries=1)
+            response.close()
+            time.sleep(self.limiter.backoff(attempt, retry_after))
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncRateLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of RateLimitedTransport."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: AdaptiveRateLimiter):
+        self.transport = transport
+        self.limiter = limiter
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.limiter.max_retries + 1):
+            last_attempt = attempt == self.limiter.max_retries
+            record(queue_wait_seconds=await self.limiter.aacquire(tokens))
+            try:
+                response = await self.transport.handle_async_request(request)
+                if response.status_code not in RETRY_STATUSES:
+                    content = await response.aread()
+            except httpx.TransportError:
+                self.limiter.on_error()
+                if last_attempt:
+                    raise
+                record(retries=1)
+                await asyncio.sleep(self.limiter.backoff(attempt))
+                continue
+            except BaseException:
+                self.limiter.on_error()
+                raise
+
+            if response.status_code in TRANSIENT_STATUSES:
+                # A failing upstream must never count as a success that grows the window
+                self.limiter.on_error()
+                if last_attempt:
+                    return response
+                record(retries=1)
+                await response.aclose()
+                await asyncio.sleep(self.limiter.backoff(attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                self.limiter.on_success(tokens, response_tokens(content))
+                return response
+
+            retry_after = parse_retry_after(response.headers)
+            self.limiter.on_rate_limited(retry_after)
+            record(rate_limited=1)
+            if last_attempt:
+                return response
+            record(retries=1)
+            await response.aclose()
+            await asyncio.sleep(self.limiter.backoff(attempt, retry_after))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+_limiters: Dict[Tuple, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """
+    Process-wide limiter configured from the environment.
+
+    Environment Variables:
+    - LLM_REQUESTS_PER_MINUTE: Request quota, 0 = unlimited (default: 0)
+    - LLM_TOKENS_PER_MINUTE: Token quota, 0 = unlimited (default: 0)
+    - LLM_MAX_CONCURRENCY: Ceiling of the adaptive concurrency window (default: 4)
+    - LLM_RATE_BURST_SECONDS: Bucket capacity in seconds of quota (default: 1)
+    - LLM_RATE_LIMIT_RETRIES: Retries of a 429, 5xx or connection error before it is surfaced (default: 6)
+    - LLM_RETRY_BASE_SECONDS / LLM_RETRY_MAX_SECONDS: Backoff bounds (default: 0.5 / 30)
+    """
+    config = (
+        get_int_env("LLM_REQUESTS_PER_MINUTE", 0),
+        get_int_env("LLM_TOKENS_PER_MINUTE", 0),
+        get_max_concurrency(),
+        get_float_env("LLM_RATE_BURST_SECONDS", 1.0),
+        get_int_env("LLM_RATE_LIMIT_RETRIES", 6),
+        get_float_env("LLM_RETRY_BASE_SECONDS", 0.5),
+        get_float_env("LLM_RETRY_MAX_SECONDS", 30.0),
+    )
+    with _limiters_lock:
+        if config not in _limiters:
+            rpm, tpm, concurrency, burst, retries, base, ceiling = config
+            _limiters[config] = AdaptiveRateLimiter(
+                requests_per_minute=rpm,
+                tokens_per_minute=tpm,
+                max_concurrency=concurrency,
+                burst_seconds=burst,
+                max_retries=retries,
+                retry_base_seconds=base,
+                retry_max_seconds=ceiling
+            )
+        return _limiters[config]
@@ -12,13 +12,18 @@ class AgentState(TypedDict):
     """
     # Merchant Context
     merchant_id: str
+    data_dir: str  # Optional per-merchant CSV directory (defaults to DATA_DIR)
+    uploaded_data: Dict[str, str]  # Optional products_csv / messages_csv / pricing_csv file contents
     
-    # Raw Data Inputs
+    # Raw Data Inputs (RecordTable instead of dicts when COLUMNAR_STATE=true)
     product_data: List[Dict[str, Any]]
     customer_messages: List[Dict[str, Any]]
     pricing_context: List[Dict[str, Any]]
     competitor_data: List[Dict[str, Any]]
     
+    # Support and Catalog Agents run in the same parallel step, so each writes
+    # its own keys; keys both may write (e.g. audit_log) need a reducer.
+    
     # Catalog Agent Outputs
     normalized_catalog: Annotated[List[Dict], operator.add]
     catalog_issues: Annotated[List[Dict], operator.add]
@@ -26,10 +31,13 @@ class AgentState(TypedDict):
     # Support Agent Outputs
     support_summary: Dict[str, Any]
     sentiment_score: float  # -1.0 to 1.0
+    complaint_velocity: float  # 0 to 10, complaint share of the latest window
     complaint_spike_detected: bool
+    product_sentiment: Dict[str, Dict[str, Any]]  # str(product_id) -> sentiment/messages/complaints
     
     # Pricing Agent Outputs
     pricing_proposals: Annotated[List[Dict], operator.add]
+    pricing_index: Dict[str, float]  # str(product_id) -> competitor price, built by the coordinator
     
     # Validation Flags (Hallucination & Contradiction Detection)
     validation_flags: Annotated[List[Dict], operator.add]
@@ -45,3 +53,6 @@ class AgentState(TypedDict):
     # Final Output
     final_report: Dict[str, Any]
     audit_log: Annotated[List[Dict], operator.add]
+    
+    # Per-node timing/token events (see instrumentation.py)
+    node_metrics: Annotated[List[Dict], operator.add]
@@ -0,0 +1,34 @@
+"""
+Environment helpers shared by the test scripts.
+Settings a test needs are applied for that test only and restored afterwards,
+so test modules do not change each other's configuration when run together.
+"""
+import os
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+def set_env(**values: Any) -> Dict[str, Optional[str]]:
+    """Set environment variables (values are str()-ed) and return their previous values."""
+    previous = {name: os.environ.get(name) for name in values}
+    os.environ.update({name: str(value) for name, value in values.items()})
+    return previous
+
+
+def restore_env(previous: Dict[str, Optional[str]]) -> None:
+    """Undo set_env: restore previous values and remove variables that were unset."""
+    for name, value in previous.items():
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+@contextmanager
+def env(**values: Any):
+    """Temporarily set environment variables (also usable as a test decorator)."""
+    previous = set_env(**values)
+    try:
+        yield
+    finally:
+        restore_env(previous)
@@ -0,0 +1,230 @@
+"""
+Test script for the long-lived API server (main.py).
+Checks that startup warms the graph, LLM clients and merchant datasets once,
+that repeated runs reuse the cached datasets, that submitted runs execute
+concurrently and report through the status endpoint, that /runs/stream
+speaks the SSE format the dashboard expects, and that runs abandoned while
+queued do not stay queued.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false",
+    "CHECKPOINT_ENABLED": "false"
+})
+
+from env_helpers import env
+
+# main turns the dataset cache on for the server process; keep that to the server tests
+dataset_cache = os.environ.get("DATASET_CACHE_ENABLED")
+from fastapi.testclient import TestClient
+import data_loader
+import main as server
+if dataset_cache is None:
+    os.environ.pop("DATASET_CACHE_ENABLED", None)
+else:
+    os.environ["DATASET_CACHE_ENABLED"] = dataset_cache
+
+SAMPLE_DIR = backend_dir.parent / "data" / "salla_data"
+
+# Slow enough LLM calls that concurrent runs visibly overlap
+SERVER_ENV = {
+    "FAKE_LLM_LATENCY_MS": "300",
+    "INPUT_DEDUP_ENABLED": "false",
+    "DATASET_CACHE_ENABLED": "true",
+    "DATA_DIR": str(SAMPLE_DIR),
+    "LOG_LEVEL": "WARNING"
+}
+
+
+@contextmanager
+def running_server():
+    """
+    Start the server on a one-merchant manifest; yields the client and the
+    CSV sources parsed so far (the reader is wrapped to count them).
+    """
+    reads = []
+    original = data_loader.iter_csv_batches
+
+    def counting(source, *args, **kwargs):
+        reads.append(source)
+        return original(source, *args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = os.path.join(tmp, "merchants.csv")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write(f"merchant_id,data_dir\nm1,{SAMPLE_DIR}\n")
+        with env(MERCHANT_MANIFEST=manifest, **SERVER_ENV):
+            data_loader.clear_dataset_cache()
+            data_loader.iter_csv_batches = counting
+            try:
+                with TestClient(server.app) as client:
+                    yield client, reads
+            finally:
+                data_loader.iter_csv_batches = original
+                data_loader.clear_dataset_cache()
+                server.MERCHANTS.clear()
+
+
+def test_warm_start_and_cached_datasets():
+    """Datasets are parsed at startup; runs are served from the cache."""
+    print("=" * 70)
+    print("TEST 1: WARM START")
+    print("=" * 70)
+
+    with running_server() as (client, reads):
+        check_warm_start(client, reads)
+
+    print("\n✅ TEST PASSED: Cold start is paid once!")
+
+
+def check_warm_start(client, reads):
+    status = client.get("/api/status").json()
+    print(f"  Warm-up: {status['warmup_seconds']}s, {status['preloaded_datasets']} datasets, "
+          f"{len(reads)} CSV reads")
+    assert client.get("/health").json() == {"status": "ok", "warm": True}, "❌ FAILED: Server not warm!"
+    assert len(reads) == 3, "❌ FAILED: Datasets not preloaded at startup!"
+
+    for _ in range(2):
+        record = client.post("/api/run", json={"merchant_id": "m1"}).json()
+        assert record["status"] == "completed", f"❌ FAILED: Run failed: {record['error']}"
+        assert record["result"]["final_report"]["status"] in ("COMPLETED", "FROZEN"), "❌ FAILED: No report!"
+    print(f"  CSV reads after two runs: {len(reads)}")
+    assert len(reads) == 3, "❌ FAILED: Runs re-read the CSVs!"
+
+
+def test_concurrent_submitted_runs():
+    """Runs submitted together execute concurrently and report through /api/status/{run_id}."""
+    print("\n" + "=" * 70)
+    print("TEST 2: CONCURRENT RUNS")
+    print("=" * 70)
+
+    with running_server() as (client, _):
+        check_concurrent_runs(client)
+
+    print("\n✅ TEST PASSED: One worker serves many concurrent runs!")
+
+
+def check_concurrent_runs(client):
+    runs = 12
+    start = time.perf_counter()
+    run_ids = [client.post("/api/submit", json={"merchant_id": f"m{i}"}).json()["run_id"] for i in range(runs)]
+    pending = set(run_ids)
+    while pending:
+        for run_id in list(pending):
+            if client.get(f"/api/status/{run_id}").json()["status"] in ("completed", "failed"):
+                pending.discard(run_id)
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+
+    records = [client.get(f"/api/status/{run_id}").json() for run_id in run_ids]
+    serial = sum(record["duration_seconds"] for record in records)
+    print(f"  {runs} runs in {elapsed:.2f}s (sum of run durations {serial:.2f}s)")
+    assert all(record["status"] == "completed" for record in records), "❌ FAILED: A submitted run failed!"
+    assert elapsed < serial / 3, "❌ FAILED: Runs did not overlap!"
+    assert client.get("/api/status/unknown").status_code == 404, "❌ FAILED: Unknown run not 404!"
+
+
+def test_stream_matches_dashboard():
+    """/runs/stream emits metadata, state snapshots and end as Server-Sent Events."""
+    print("\n" + "=" * 70)
+    print("TEST 3: SSE STREAM")
+    print("=" * 70)
+
+    with running_server() as (client, _):
+        check_stream(client)
+
+    print("\n✅ TEST PASSED: Stream matches the dashboard protocol!")
+
+
+def check_stream(client):
+    body = {"assistant_id": "salla_ops", "input": {"merchant_id": "m1"}, "stream_mode": "values"}
+    with client.stream("POST", "/runs/stream", json=body) as response:
+        text = "".join(response.iter_text())
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+
+    names = [name for name, _ in events]
+    print(f"  Events: {names[0]}, {names.count('values')} x values, {names[-1]}")
+    assert names[0] == "metadata" and names[-1] == "end", "❌ FAILED: Wrong event framing!"
+    final = [data for name, data in events if name == "values"][-1]
+    assert final["final_report"]["status"] in ("COMPLETED", "FROZEN"), "❌ FAILED: No final report streamed!"
+    assert client.get("/api/status").json()["failed"] == 0, "❌ FAILED: Runs failed!"
+
+
+def test_abandoned_queued_runs():
+    """Runs whose client goes away while waiting for a slot end as failed, not queued."""
+    print("\n" + "=" * 70)
+    print("TEST 4: ABANDONED QUEUED RUNS")
+    print("=" * 70)
+
+    async def abandon():
+        registry = server.RunRegistry(max_concurrent=1, max_finished=10)
+        previous = server.SERVER.get("registry")
+        server.SERVER["registry"] = registry
+        try:
+            await registry.semaphore.acquire()
+            # A streaming client that disconnects after the metadata event
+            events = (await server.stream_run(server.StreamRequest(input={"merchant_id": "m1"}))).body_iterator
+            await events.__anext__()
+            waiting = asyncio.ensure_future(events.__anext__())
+            # A /api/run client that disconnects while its run is queued
+            record = registry.create("m1")
+            run = asyncio.ensure_future(server.execute(registry, record, {"merchant_id": "m1"}))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            run.cancel()
+            await asyncio.gather(waiting, run, return_exceptions=True)
+            registry.semaphore.release()
+            return list(registry.runs.values()), registry
+        finally:
+            server.SERVER["registry"] = previous
+
+    records, registry = asyncio.run(abandon())
+    print(f"  {[(r['status'], r['error'], r['duration_seconds']) for r in records]}")
+    assert len(records) == 2 and registry.count("queued") == 0, "❌ FAILED: Abandoned run stayed queued!"
+    assert all(r["status"] == "failed" and "queued" in r["error"] for r in records), \
+        "❌ FAILED: Abandoned run not failed!"
+    assert all(r["duration_seconds"] is None for r in records), "❌ FAILED: Duration for a run that never started!"
+
+    print("\n✅ TEST PASSED: Abandoned queued runs are closed!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("API SERVER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_warm_start_and_cached_datasets()
+        test_concurrent_submitted_runs()
+        test_stream_matches_dashboard()
+        test_abandoned_queued_runs()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Test script for the multi-merchant batch runner.
+Checks bounded concurrency, per-merchant reports, resume after a partial run,
+retry of failed merchants and isolated state on the real graph (fake LLM).
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false"
+})
+
+from batch_runner import load_manifest, report_path, run_batch
+
+
+class StubApp:
+    """Stands in for the compiled graph; tracks concurrency and can fail merchants."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.seen = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, state, config=None):
+        self.seen.append(state["merchant_id"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if state["merchant_id"] in self.fail:
+                raise RuntimeError("boom")
+            return {"final_report": {"status": "COMPLETED", "merchant": state["merchant_id"]}}
+        finally:
+            self.in_flight -= 1
+
+
+def write_manifest(directory, rows):
+    path = os.path.join(directory, "merchants.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("merchant_id,data_dir\n")
+        for merchant_id, data_dir in rows:
+            f.write(f"{merchant_id},{data_dir}\n")
+    return path
+
+
+def test_bounded_concurrency_and_reports():
+    """Every merchant gets a report and at most `concurrency` run at once."""
+    print("=" * 70)
+    print("TEST 1: BOUNDED CONCURRENCY AND PER-MERCHANT REPORTS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = write_manifest(tmp, [(f"m{i:03d}", "") for i in range(20)] + [("m000", "")])
+        entries = load_manifest(manifest)
+        assert len(entries) == 20, "❌ FAILED: Duplicate manifest rows were not dropped!"
+
+        app = StubApp()
+        output = os.path.join(tmp, "reports")
+        summary = asyncio.run(run_batch(entries, output, concurrency=3, app=app))
+
+        assert summary["completed"] == 20 and summary["failed"] == 0, "❌ FAILED: Not all merchants ran!"
+        assert app.max_in_flight == 3, f"❌ FAILED: {app.max_in_flight} merchants in flight!"
+        with open(report_path(output, "m007")) as f:
+            report = json.load(f)
+        assert report["final_report"]["merchant"] == "m007", "❌ FAILED: Report mixed up merchants!"
+        assert os.path.exists(os.path.join(output, "_summary.json")), "❌ FAILED: No summary written!"
+
+    print("\n✅ TEST PASSED: Reports written with bounded concurrency!")
+
+
+def test_resume_skips_completed():
+    """A second run only retries failed merchants."""
+    print("\n" + "=" * 70)
+    print("TEST 2: RESUME AFTER FAILURES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = load_manifest(write_manifest(tmp, [(f"m{i}", "") for i in range(8)]))
+        output = os.path.join(tmp, "reports")
+
+        first = asyncio.run(run_batch(entries, output, concurrency=4, app=StubApp(fail={"m2", "m5"})))
+        assert first["failed"] == 2, "❌ FAILED: Failures were not counted!"
+        assert os.path.exists(report_path(output, "m2", ".error.json")), "❌ FAILED: No error file!"
+
+        retry_app = StubApp()
+        second = asyncio.run(run_batch(entries, output, concurrency=4, app=retry_app))
+        assert sorted(retry_app.seen) == ["m2", "m5"], f"❌ FAILED: Resumed run redid {retry_app.seen}!"
+        assert second["skipped"] == 6 and second["completed"] == 2, "❌ FAILED: Wrong resume summary!"
+        assert not os.path.exists(report_path(output, "m2", ".error.json")), \
+            "❌ FAILED: Stale error file kept after success!"
+
+    print("\n✅ TEST PASSED: Completed merchants are not redone!")
+
+
+def test_similar_ids_get_own_reports():
+    """IDs that sanitize to the same name still get separate reports, so resume skips none of them."""
+    print("\n" + "=" * 70)
+    print("TEST 3: SIMILAR MERCHANT IDS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ids = ["a/b", "a:b", "a_b", "a b"]
+        entries = load_manifest(write_manifest(tmp, [(merchant_id, "") for merchant_id in ids]))
+        output = os.path.join(tmp, "reports")
+        paths = {report_path(output, merchant_id) for merchant_id in ids}
+        print(f"  Report files: {sorted(os.path.basename(p) for p in paths)}")
+        assert len(paths) == len(ids), "❌ FAILED: Merchant IDs share a report file!"
+
+        first = asyncio.run(run_batch(entries, output, concurrency=2, app=StubApp()))
+        assert first["completed"] == len(ids), f"❌ FAILED: {first}"
+        assert all(os.path.exists(p) for p in paths), "❌ FAILED: Report missing!"
+        for merchant_id in ids:
+            with open(report_path(output, merchant_id)) as f:
+                assert json.load(f)["final_report"]["merchant"] == merchant_id, "❌ FAILED: Report overwritten!"
+
+        rerun = StubApp()
+        second = asyncio.run(run_batch(entries, output, concurrency=2, app=rerun))
+        assert second["skipped"] == len(ids) and not rerun.seen, "❌ FAILED: Resume redid or skipped the wrong merchants!"
+
+    print("\n✅ TEST PASSED: Similar IDs are kept apart!")
+
+
+def test_real_graph_isolated_state():
+    """Merchants with different data directories get their own data and reports."""
+    print("\n" + "=" * 70)
+    print("TEST 4: ISOLATED STATE ON THE REAL GRAPH")
+    print("=" * 70)
+
+    salla_dir = backend_dir.parent / "data" / "salla_data"
+    with tempfile.TemporaryDirectory() as tmp:
+        # A second merchant with its own, smaller catalog
+        small_dir = os.path.join(tmp, "small_merchant")
+        os.makedirs(small_dir)
+        with open(os.path.join(small_dir, "products_raw.csv"), "w", encoding="utf-8") as f:
+            f.write("product_id,title,category,price,cost,attributes,description\n")
+            f.write("9000,Desk Lamp,Home,30,12,color=white,LED desk lamp.\n")
+            f.write("9001,Mug,Kitchen,8,3,size=350ml,Ceramic mug.\n")
+
+        entries = load_manifest(write_manifest(tmp, [
+            ("salla_a", salla_dir), ("small", small_dir), ("salla_b", salla_dir)
+        ]))
+        output = os.path.join(tmp, "reports")
+        summary = asyncio.run(run_batch(entries, output, concurrency=3))
+        assert summary["completed"] == 3, f"❌ FAILED: {summary}"
+
+        reports = {}
+        for entry in entries:
+            with open(report_path(output, entry["merchant_id"])) as f:
+                reports[entry["merchant_id"]] = json.load(f)["final_report"]
+        statuses = {m: r.get("status") for m, r in reports.items()}
+        print(f"  Statuses: {statuses}")
+        assert all(statuses.values()), "❌ FAILED: Missing final report!"
+        for merchant_id, report in reports.items():
+            assert report.pop("audit_log")[0]["merchant_id"] == merchant_id, \
+                "❌ FAILED: Audit log belongs to another merchant!"
+            # Timings differ between runs
+            report.pop("metrics")
+        assert reports["salla_a"] == reports["salla_b"], "❌ FAILED: Same data gave different reports!"
+        assert reports["small"] != reports["salla_a"], "❌ FAILED: Merchant data leaked between runs!"
+
+    print("\n✅ TEST PASSED: Merchant runs are isolated!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("BATCH RUNNER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_bounded_concurrency_and_reports()
+        test_resume_skips_completed()
+        test_similar_ids_get_own_reports()
+        test_real_graph_isolated_state()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
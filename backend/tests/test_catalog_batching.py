@@ -0,0 +1,164 @@
+"""
+Test script for the batched full-catalog mode of the Catalog Agent.
+Uses a stubbed LLM so it runs offline without API keys.
+"""
+import importlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Stubbed LLM responses must not be written to the persistent cache or catalog store
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["CATALOG_STORE_ENABLED"] = "false"
+
+from env_helpers import env
+from langchain_core.runnables import RunnableLambda
+from batching import chunk_by_token_budget
+
+# agents/__init__.py re-exports the function under the module's name
+catalog_module = importlib.import_module("agents.catalog_agent")
+
+
+class StubCatalogLLM:
+    """Echoes back every product ID it receives and tracks concurrency."""
+
+    def __init__(self, fail_on=None, delay=0.02):
+        self.fail_on = fail_on
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, prompt_value):
+        with self.lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            text = prompt_value.to_messages()[-1].content
+            ids = re.findall(r'"product_id":"?([\w-]+)', text)
+            if self.fail_on and self.fail_on in ids:
+                raise RuntimeError(f"stub failure on {self.fail_on}")
+            return json.dumps({
+                "normalized_products": [{"id": pid, "name": f"Product {pid}"} for pid in ids],
+                "issues": [{"type": "info", "product_id": pid, "message": "checked"} for pid in ids],
+                "confidence_score": 0.9
+            })
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def make_products(count):
+    return [
+        {"product_id": f"P{i:04d}", "title": f"Item {i}", "price": 10.0 + i, "cost": 5.0}
+        for i in range(count)
+    ]
+
+
+def run_catalog(products, stub):
+    original = catalog_module.get_llm
+    catalog_module.get_llm = lambda **kwargs: RunnableLambda(stub)
+    try:
+        # These tests count the stubbed LLM's issues only
+        with env(DUPLICATE_DETECTION_ENABLED="false"):
+            return catalog_module.catalog_agent({"product_data": products})
+    finally:
+        catalog_module.get_llm = original
+
+
+def test_chunking_respects_budget():
+    """Batches stay within the token budget and preserve input order."""
+    print("=" * 70)
+    print("TEST 1: TOKEN-BUDGETED CHUNKING")
+    print("=" * 70)
+
+    products = make_products(100)
+    batches = chunk_by_token_budget(products, max_tokens=200)
+
+    flattened = [p for batch in batches for p in batch]
+    assert flattened == products, "❌ FAILED: Chunking changed order or dropped rows!"
+    assert len(batches) > 1, "❌ FAILED: Expected multiple batches!"
+
+    batches = chunk_by_token_budget(products, max_tokens=10_000, max_items=7)
+    assert all(len(batch) <= 7 for batch in batches), "❌ FAILED: max_items not enforced!"
+
+    print(f"✓ {len(products)} products split into {len(batches)} batches")
+    print("\n✅ TEST PASSED: Chunking is order-preserving and bounded!")
+
+
+def test_full_catalog_merged_in_order():
+    """Every product is normalized and results come back in input order."""
+    print("=" * 70)
+    print("TEST 2: FULL CATALOG MERGE ORDER")
+    print("=" * 70)
+
+    products = make_products(95)
+    stub = StubCatalogLLM()
+
+    with env(CATALOG_BATCH_MAX_ITEMS="10", LLM_MAX_CONCURRENCY="3"):
+        result = run_catalog(products, stub)
+
+    ids = [p["id"] for p in result["normalized_catalog"]]
+    assert ids == [p["product_id"] for p in products], "❌ FAILED: Output order differs from input!"
+    assert len(result["catalog_issues"]) == 95, "❌ FAILED: Issues were not merged!"
+    assert stub.calls == 10, f"❌ FAILED: Expected 10 batches, got {stub.calls}"
+    assert stub.max_in_flight <= 3, "❌ FAILED: Concurrency limit exceeded!"
+    assert result["schema_validation_passed"], "❌ FAILED: Schema should pass!"
+
+    print(f"✓ {stub.calls} batches, max {stub.max_in_flight} in flight")
+    print("\n✅ TEST PASSED: Full catalog normalized in input order!")
+
+
+def test_failed_batch_falls_back_to_raw():
+    """A failing batch keeps its raw rows and fails schema validation."""
+    print("=" * 70)
+    print("TEST 3: PER-BATCH FAILURE FALLBACK")
+    print("=" * 70)
+
+    products = make_products(30)
+    stub = StubCatalogLLM(fail_on="P0015")
+
+    with env(CATALOG_BATCH_MAX_ITEMS="10"):
+        result = run_catalog(products, stub)
+
+    catalog = result["normalized_catalog"]
+    assert len(catalog) == 30, "❌ FAILED: Rows were lost!"
+    assert catalog[10] is products[10], "❌ FAILED: Failed batch did not fall back to raw rows!"
+    assert any(i["type"] == "error" for i in result["catalog_issues"]), "❌ FAILED: No error issue!"
+    assert not result["schema_validation_passed"], "❌ FAILED: Schema should fail!"
+
+    print("\n✅ TEST PASSED: Failed batch degraded gracefully!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("CATALOG BATCHING TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_chunking_respects_budget()
+        test_full_catalog_merged_in_order()
+        test_failed_batch_falls_back_to_raw()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
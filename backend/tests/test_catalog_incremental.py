@@ -0,0 +1,173 @@
+"""
+Test script for per-product incremental catalog normalization.
+Uses a temporary catalog store and a stubbed LLM; no API keys needed.
+"""
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Stubbed LLM responses must not be written to the persistent response cache
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from env_helpers import env
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+# agents/__init__.py re-exports the function under the module's name
+catalog_module = importlib.import_module("agents.catalog_agent")
+
+
+class StubCatalogLLM:
+    """Normalizes titles to upper case and records which products it saw."""
+
+    def __init__(self):
+        self.seen = []
+
+    def __call__(self, prompt_value):
+        text = prompt_value.to_messages()[-1].content
+        rows = re.findall(r'"product_id":"([\w-]+)","title":"([^"]*)"', text)
+        self.seen.extend(pid for pid, _ in rows)
+        return json.dumps({
+            "normalized_products": [{"id": pid, "name": title.upper()} for pid, title in rows],
+            "issues": [{"type": "info", "product_id": pid, "message": f"checked {title}"} for pid, title in rows],
+            "confidence_score": 0.9
+        })
+
+
+def make_products(count):
+    return [
+        {"product_id": f"P{i:04d}", "title": f"item {i}", "price": 10.0 + i, "cost": 5.0,
+         "attributes": "color=black", "description": "A product"}
+        for i in range(count)
+    ]
+
+
+def run_catalog(state, stub, store_path, **settings):
+    # These tests count the stubbed LLM's issues only
+    settings = {"CATALOG_STORE_ENABLED": "true", "CATALOG_STORE_PATH": store_path,
+                "DUPLICATE_DETECTION_ENABLED": "false", **settings}
+    original = catalog_module.get_llm
+    catalog_module.get_llm = lambda **kwargs: RunnableLambda(stub)
+    try:
+        with env(**settings):
+            return catalog_module.catalog_agent(state)
+    finally:
+        catalog_module.get_llm = original
+
+
+def test_only_changed_products_renormalized():
+    """A second run sends only new and changed products to the LLM."""
+    print("=" * 70)
+    print("TEST 1: DELTA NORMALIZATION")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "store.sqlite3")
+        products = make_products(50)
+
+        first_stub = StubCatalogLLM()
+        first = run_catalog({"merchant_id": "m1", "product_data": products}, first_stub, store_path)
+        assert len(first_stub.seen) == 50, "❌ FAILED: First run should normalize everything!"
+
+        changed = [dict(p) for p in products]
+        changed[3]["price"] = 99.0
+        changed[40]["title"] = "renamed item"
+        changed.append({"product_id": "P9999", "title": "brand new", "price": 1.0, "cost": 0.5})
+
+        second_stub = StubCatalogLLM()
+        second = run_catalog({"merchant_id": "m1", "product_data": changed}, second_stub, store_path)
+
+    assert sorted(second_stub.seen) == ["P0003", "P0040", "P9999"], f"❌ FAILED: Re-normalized {second_stub.seen}"
+    ids = [p["id"] for p in second["normalized_catalog"]]
+    assert ids == [p["product_id"] for p in changed], "❌ FAILED: Output not in input order!"
+    assert second["normalized_catalog"][40]["name"] == "RENAMED ITEM", "❌ FAILED: Changed product not refreshed!"
+    assert second["catalog_issues"][0] == first["catalog_issues"][0], "❌ FAILED: Stored issues not reused!"
+    assert len(second["catalog_issues"]) == 51, "❌ FAILED: Issues missing after merge!"
+    assert second["schema_validation_passed"], "❌ FAILED: Schema should pass!"
+
+    print(f"✓ Second run re-normalized {len(second_stub.seen)} of {len(changed)} products")
+    print("\n✅ TEST PASSED: Only new and changed products hit the LLM!")
+
+
+def test_store_is_per_merchant():
+    """Stored products from one merchant are never reused for another."""
+    print("=" * 70)
+    print("TEST 2: PER-MERCHANT ISOLATION")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "store.sqlite3")
+        products = make_products(5)
+        run_catalog({"merchant_id": "m1", "product_data": products}, StubCatalogLLM(), store_path)
+
+        other_stub = StubCatalogLLM()
+        run_catalog({"merchant_id": "m2", "product_data": products}, other_stub, store_path)
+
+    assert len(other_stub.seen) == 5, "❌ FAILED: Another merchant's results were reused!"
+
+    print("\n✅ TEST PASSED: Catalog store is isolated per merchant!")
+
+
+def test_prompt_or_model_change_invalidates():
+    """Stored products are re-normalized after the catalog prompt or the model changes."""
+    print("=" * 70)
+    print("TEST 3: PROMPT AND MODEL CHANGES")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "store.sqlite3")
+        products = make_products(5)
+        state = {"merchant_id": "m1", "product_data": products}
+        run_catalog(state, StubCatalogLLM(), store_path, LLM_PROVIDER="fake")
+
+        unchanged = StubCatalogLLM()
+        run_catalog(state, unchanged, store_path, LLM_PROVIDER="fake")
+        assert unchanged.seen == [], "❌ FAILED: Unchanged products re-normalized!"
+
+        new_model = StubCatalogLLM()
+        run_catalog(state, new_model, store_path, LLM_PROVIDER="openai")
+        assert len(new_model.seen) == 5, "❌ FAILED: Results of another model were reused!"
+
+        original_prompt = catalog_module.CATALOG_PROMPT
+        catalog_module.CATALOG_PROMPT = ChatPromptTemplate.from_messages(
+            [*original_prompt.messages[:-1], ("user", "Normalize these products:\n{products}")]
+        )
+        new_prompt = StubCatalogLLM()
+        try:
+            run_catalog(state, new_prompt, store_path, LLM_PROVIDER="openai")
+        finally:
+            catalog_module.CATALOG_PROMPT = original_prompt
+        assert len(new_prompt.seen) == 5, "❌ FAILED: Results of an old prompt were reused!"
+
+    print("\n✅ TEST PASSED: Prompt or model changes invalidate stored products!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("INCREMENTAL CATALOG TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_only_changed_products_renormalized()
+        test_store_is_per_merchant()
+        test_prompt_or_model_change_invalidates()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
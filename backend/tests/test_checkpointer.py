@@ -0,0 +1,231 @@
+"""
+Test script for the SQLite checkpointer.
+Checks that a run interrupted in the Pricing Agent resumes without repeating
+the LLM passes (sync, async and through the batch runner), that channel
+values are stored once and compressed, and that retention keeps the
+database bounded.
+"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import env
+import graph
+from batch_runner import load_manifest, report_path, run_batch
+from checkpointer import SqliteCheckpointSaver, checkpoint_config
+from fake_llm import FAKE_LLM_STATS
+
+# Small runs on the sample data with the instant fake LLM and no cross-run
+# caches, in which every message reaches the LLM
+RUN_ENV = {
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "FAKE_LLM_JITTER_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false",
+    "SUPPORT_PRECLASSIFIER_ENABLED": "false",
+    "DATA_DIR": str(backend_dir.parent / "data" / "salla_data"),
+    "PRODUCT_ROW_LIMIT": "100",
+    "MESSAGE_ROW_LIMIT": "60"
+}
+
+
+class FlakyPricing:
+    """Pricing node that crashes on its first call, like a mid-run failure."""
+
+    def __init__(self, node):
+        self.node = node
+        self.calls = 0
+
+    def __call__(self, state):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("pricing crashed")
+        return self.node(state)
+
+
+def build_app(saver, flaky=None):
+    original = graph.pricing_agent
+    if flaky is not None:
+        graph.pricing_agent = flaky
+    try:
+        return graph.build_workflow().compile(checkpointer=saver)
+    finally:
+        graph.pricing_agent = original
+
+
+def reference_report():
+    return graph.build_workflow().compile().invoke({"merchant_id": "m1"})["final_report"]
+
+
+def strip_audit(report):
+    return {key: value for key, value in report.items() if key not in ("audit_log", "metrics")}
+
+
+@env(**RUN_ENV)
+def test_resume_after_crash():
+    """A crash in pricing resumes from the last node without new LLM calls."""
+    print("=" * 70)
+    print("TEST 1: RESUME AFTER A PRICING CRASH")
+    print("=" * 70)
+
+    expected = reference_report()
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = SqliteCheckpointSaver(os.path.join(tmp, "checkpoints.sqlite3"))
+        app = build_app(saver, FlakyPricing(graph.pricing_agent))
+        config = checkpoint_config("m1", "run-1")
+
+        try:
+            app.invoke({"merchant_id": "m1"}, config)
+            raise AssertionError("❌ FAILED: Flaky pricing did not crash!")
+        except RuntimeError:
+            pass
+        calls_before = FAKE_LLM_STATS["calls"]
+        state = app.get_state(config)
+        print(f"  Interrupted before: {state.next}, {calls_before} LLM calls so far")
+        assert state.next == ("pricing_agent",), "❌ FAILED: Checkpoint is not at the pricing node!"
+
+        result = app.invoke(None, config)
+        assert FAKE_LLM_STATS["calls"] == calls_before, "❌ FAILED: Resume repeated LLM calls!"
+        assert strip_audit(result["final_report"]) == strip_audit(expected), \
+            "❌ FAILED: Resumed run gave a different report!"
+        saver.close()
+
+    print("\n✅ TEST PASSED: Interrupted run resumed from the last completed node!")
+
+
+@env(**RUN_ENV)
+def test_async_resume_and_storage():
+    """ainvoke resumes too; values are stored once per version and compressed."""
+    print("\n" + "=" * 70)
+    print("TEST 2: ASYNC RESUME AND COMPACT STORAGE")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite3")
+        saver = SqliteCheckpointSaver(path, keep_last=2, compress_min_bytes=1024)
+        app = build_app(saver, FlakyPricing(graph.pricing_agent))
+        config = checkpoint_config("m2", "run-1")
+
+        async def run():
+            try:
+                await app.ainvoke({"merchant_id": "m2"}, config)
+            except RuntimeError:
+                pass
+            return await app.ainvoke(None, config)
+
+        result = asyncio.run(run())
+        assert result["final_report"]["status"] == "COMPLETED", "❌ FAILED: Async resume did not finish!"
+
+        conn = sqlite3.connect(path)
+        checkpoints = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        product_blobs = conn.execute(
+            "SELECT COUNT(*) FROM checkpoint_blobs WHERE channel = 'product_data'"
+        ).fetchone()[0]
+        compressed = conn.execute(
+            "SELECT COUNT(*) FROM checkpoint_blobs WHERE type LIKE '%+zlib'"
+        ).fetchone()[0]
+        conn.close()
+        print(f"  checkpoints={checkpoints}, product_data blobs={product_blobs}, compressed blobs={compressed}")
+
+        assert checkpoints == 2, "❌ FAILED: Old checkpoints were not pruned!"
+        assert product_blobs == 1, "❌ FAILED: product_data was stored more than once!"
+        assert compressed > 0, "❌ FAILED: Large values were not compressed!"
+        saver.close()
+
+    print("\n✅ TEST PASSED: Checkpoints are compact!")
+
+
+@env(**RUN_ENV)
+def test_retention():
+    """compact() drops expired runs and unreferenced values."""
+    print("\n" + "=" * 70)
+    print("TEST 3: RETENTION AND COMPACTION")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.sqlite3")
+        saver = SqliteCheckpointSaver(path)
+        app = build_app(saver)
+        for run_id in ("old", "new"):
+            app.invoke({"merchant_id": "m3"}, checkpoint_config("m3", run_id))
+
+        old_thread = checkpoint_config("m3", "old")["configurable"]["thread_id"]
+        saver._conn.execute("UPDATE checkpoints SET created_at = 0 WHERE thread_id = ?", (old_thread,))
+        saver._conn.commit()
+        stats = saver.compact()
+        print(f"  {stats}")
+
+        assert stats["expired_threads"] == 1, "❌ FAILED: Expired run was kept!"
+        assert app.get_state(checkpoint_config("m3", "old")).values == {}, "❌ FAILED: Old run still readable!"
+        assert app.get_state(checkpoint_config("m3", "new")).values["final_report"], \
+            "❌ FAILED: Recent run was dropped!"
+        remaining = saver._conn.execute(
+            "SELECT COUNT(*) FROM checkpoint_blobs WHERE thread_id = ?", (old_thread,)
+        ).fetchone()[0]
+        assert remaining == 0, "❌ FAILED: Values of the expired run were kept!"
+        saver.close()
+
+    print("\n✅ TEST PASSED: Retention keeps the database bounded!")
+
+
+@env(**RUN_ENV)
+def test_batch_runner_resume():
+    """A merchant that crashed mid-run is resumed by the next batch run."""
+    print("\n" + "=" * 70)
+    print("TEST 4: BATCH RUNNER RESUMES FROM CHECKPOINTS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saver = SqliteCheckpointSaver(os.path.join(tmp, "checkpoints.sqlite3"))
+        app = build_app(saver, FlakyPricing(graph.pricing_agent))
+        manifest = os.path.join(tmp, "merchants.csv")
+        with open(manifest, "w") as f:
+            f.write("merchant_id\nm4\n")
+        entries = load_manifest(manifest)
+        output = os.path.join(tmp, "reports")
+
+        first = asyncio.run(run_batch(entries, output, concurrency=1, app=app))
+        assert first["failed"] == 1, "❌ FAILED: Crash was not reported!"
+        calls_before = FAKE_LLM_STATS["calls"]
+
+        second = asyncio.run(run_batch(entries, output, concurrency=1, app=app))
+        assert second["completed"] == 1, "❌ FAILED: Resumed merchant did not complete!"
+        assert FAKE_LLM_STATS["calls"] == calls_before, "❌ FAILED: Resume repeated LLM calls!"
+        assert os.path.exists(report_path(output, "m4")), "❌ FAILED: No report written!"
+        threads = saver._conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        assert threads == 0, "❌ FAILED: Checkpoints of a reported merchant were kept!"
+        saver.close()
+
+    print("\n✅ TEST PASSED: Batch runs resume mid-run merchants!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("CHECKPOINTER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_resume_after_crash()
+        test_async_resume_and_storage()
+        test_retention()
+        test_batch_runner_resume()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Test script for columnar AgentState payloads (RecordTable).
+Checks record views, column access, pricing equivalence and checkpointing.
+"""
+import io
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+import numpy as np
+from columnar import ColumnarSerializer, RecordTable, column_values
+from data_loader import iter_csv_batches, iter_csv_frames, read_rows, read_table
+from agents.pricing_agent import build_pricing_index, price_products_loop
+from agents.pricing_engine import price_products_vectorized
+
+
+PRODUCTS_CSV = """product_id,title,category,price,cost,attributes,description
+1000,Slim Fit T-shirt,Clothes > Mens,49.99,25,color=blk,A popular mens shirt.
+1001,Coffee Press,Kitchen & Dining,ninety,40,capacity=1L,French press.
+1002,Desk Lamp,Home,30,unknown,,
+1003,Yoga Mat,Sports,19.99 USD,8,,Non-slip mat.
+"""
+
+PRICING_CSV = """product_id,competitor_avg_price,trend
+1000,44-52 USD,stable
+1001,65–100,unclear
+1003,15,stable
+"""
+
+
+def same_records(left, right):
+    """Record-by-record equality that treats NaN cells as equal."""
+    def cell_equal(a, b):
+        return a == b or (isinstance(a, float) and isinstance(b, float) and a != a and b != b)
+
+    return len(left) == len(right) and all(
+        dict(a).keys() == dict(b).keys() and all(cell_equal(a[k], b[k]) for k in a)
+        for a, b in zip(left, right)
+    )
+
+
+def load_both(csv_text, dataset):
+    rows = read_rows(iter_csv_batches(io.StringIO(csv_text), dataset=dataset))
+    table = read_table(iter_csv_frames(io.StringIO(csv_text), dataset=dataset))
+    return rows, table
+
+
+def test_table_matches_records():
+    """A RecordTable reads back the same records as the dict loader."""
+    print("=" * 70)
+    print("TEST 1: TABLE MATCHES RECORDS")
+    print("=" * 70)
+
+    rows, table = load_both(PRODUCTS_CSV, "products")
+    assert same_records(table, rows), "❌ FAILED: Table rows differ from dict rows!"
+    assert table[1]["price"] == 90.0 and type(table[0]["product_id"]) is int, \
+        "❌ FAILED: Views should return parsed, plain Python values!"
+    assert repr(table[0]) == repr(rows[0]), "❌ FAILED: View repr differs from dict repr!"
+    assert np.shares_memory(table[1:3].column("price"), table.column("price")), \
+        "❌ FAILED: Slices should share column buffers!"
+    assert column_values(table, "title") == column_values(rows, "title"), "❌ FAILED: column_values differs!"
+    assert column_values(table, "missing", "x") == ["x"] * 4, "❌ FAILED: Missing column default not applied!"
+    assert same_records([] + table, rows), "❌ FAILED: List reducer concatenation broken!"
+
+    print(f"✓ {len(table)} rows, columns: {table.columns}")
+    print("\n✅ TEST PASSED: Table matches records!")
+
+
+def test_pricing_on_table():
+    """Pricing index and both engines give identical results on tables and dicts."""
+    print("=" * 70)
+    print("TEST 2: PRICING ON TABLES")
+    print("=" * 70)
+
+    product_rows, product_table = load_both(PRODUCTS_CSV, "products")
+    pricing_rows, pricing_table = load_both(PRICING_CSV, "pricing")
+
+    index = build_pricing_index(pricing_rows)
+    assert build_pricing_index(pricing_table) == index, "❌ FAILED: Index differs for tables!"
+
+    for sentiment in (-0.5, 0.2):
+        expected = price_products_loop(product_rows, index, sentiment)
+        assert price_products_loop(product_table, index, sentiment) == expected, "❌ FAILED: Loop differs on table!"
+        assert price_products_vectorized(product_table, index, sentiment) == expected, \
+            "❌ FAILED: Vectorized engine differs on table!"
+
+    print(f"✓ Index: {index}")
+    print("\n✅ TEST PASSED: Pricing is identical on tables!")
+
+
+def test_checkpoint_round_trip():
+    """ColumnarSerializer round-trips tables and leaves other values to JsonPlus."""
+    print("=" * 70)
+    print("TEST 3: CHECKPOINT ROUND TRIP")
+    print("=" * 70)
+
+    _, table = load_both(PRODUCTS_CSV, "products")
+    serde = ColumnarSerializer()
+
+    type_, payload = serde.dumps_typed(table)
+    restored = serde.loads_typed((type_, payload))
+    assert type_ == "columnar", "❌ FAILED: Table not stored column by column!"
+    assert isinstance(restored, RecordTable) and same_records(restored, table), "❌ FAILED: Table changed in round trip!"
+    assert restored.column("price").dtype == np.float64, "❌ FAILED: Numeric column dtype lost!"
+
+    value = {"pricing_proposals": [{"product_id": 1000, "status": "HOLD"}]}
+    assert serde.loads_typed(serde.dumps_typed(value)) == value, "❌ FAILED: Plain values broken!"
+
+    print(f"✓ {len(payload)} bytes for {len(table)} rows")
+    print("\n✅ TEST PASSED: Checkpoints round-trip!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("COLUMNAR STATE TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_table_matches_records()
+        test_pricing_on_table()
+        test_checkpoint_round_trip()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
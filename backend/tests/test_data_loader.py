@@ -0,0 +1,198 @@
+"""
+Test script for the streaming CSV loader.
+Checks batch boundaries, stable column types, early stop, fallback data and
+load-time parsing of dirty money/range fields.
+"""
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import env
+import pandas as pd
+from data_loader import (
+    iter_csv_batches, load_sample_data, parse_numeric_column, read_rows, stream_dataset, DATASET_DTYPES
+)
+from agents.pricing_agent import build_pricing_index, pricing_agent
+from nodes import coordinator_node
+
+
+PRODUCTS_CSV = """product_id,title,category,price,cost,attributes,description
+1000,Slim Fit T-shirt,Clothes > Mens,49.99,25,color=blk,A popular mens shirt.
+1001,Coffee Press,Kitchen & Dining,ninety,40,capacity=1L,French press.
+1002,1984,Books,12.5,6,format=paperback,A novel.
+1003,Desk Lamp,Home,30,12,,
+1004,2001,Books,14,7,format=hardcover,Another novel.
+"""
+
+
+def test_batches_match_full_read():
+    """Concatenated batches equal a full read, with free-text columns always str."""
+    print("=" * 70)
+    print("TEST 1: BATCHES MATCH FULL READ")
+    print("=" * 70)
+
+    batches = list(iter_csv_batches(io.StringIO(PRODUCTS_CSV), batch_size=2, dtype=DATASET_DTYPES["products"]))
+    rows = [row for batch in batches for row in batch]
+    full = pd.read_csv(io.StringIO(PRODUCTS_CSV), dtype=DATASET_DTYPES["products"]).to_dict('records')
+
+    assert [len(b) for b in batches] == [2, 2, 1], "❌ FAILED: Unexpected batch sizes!"
+    assert [r["product_id"] for r in rows] == [r["product_id"] for r in full], "❌ FAILED: Rows lost or reordered!"
+    assert all(isinstance(r["title"], str) for r in rows), "❌ FAILED: Numeric-looking titles not kept as str!"
+
+    print(f"✓ {len(rows)} rows in {len(batches)} batches; titles: {[r['title'] for r in rows]}")
+    print("\n✅ TEST PASSED: Batches match the full read!")
+
+
+def test_read_rows_stops_early():
+    """read_rows stops consuming the stream once the limit is reached."""
+    print("=" * 70)
+    print("TEST 2: EARLY STOP")
+    print("=" * 70)
+
+    consumed = []
+
+    def counting_batches():
+        for batch in iter_csv_batches(io.StringIO(PRODUCTS_CSV), batch_size=2):
+            consumed.append(len(batch))
+            yield batch
+
+    rows = read_rows(counting_batches(), limit=3)
+    assert len(rows) == 3, "❌ FAILED: Wrong number of rows returned!"
+    assert consumed == [2, 2], "❌ FAILED: Read past the batch containing the limit!"
+
+    all_rows = read_rows(iter_csv_batches(io.StringIO(PRODUCTS_CSV), batch_size=2), limit=0)
+    assert len(all_rows) == 5, "❌ FAILED: limit=0 should read every row!"
+
+    print("\n✅ TEST PASSED: Reading stops at the limit!")
+
+
+def test_load_sample_data_limits_and_fallback():
+    """load_sample_data honours per-dataset limits and falls back when files are missing."""
+    print("=" * 70)
+    print("TEST 3: LOAD LIMITS AND FALLBACK")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with open(os.path.join(data_dir, "products_raw.csv"), "w") as f:
+            f.write(PRODUCTS_CSV)
+
+        products, messages, pricing = load_sample_data(product_limit=2, data_dir=data_dir)
+        assert [p["product_id"] for p in products] == [1000, 1001], "❌ FAILED: Product limit not applied!"
+        assert messages[0]["id"] == "M001", "❌ FAILED: Missing messages CSV should use fallback data!"
+        assert pricing[0]["product_id"] == "P001", "❌ FAILED: Missing pricing CSV should use fallback data!"
+
+        batches = list(stream_dataset("products", batch_size=4, data_dir=data_dir))
+        assert [len(b) for b in batches] == [4, 1], "❌ FAILED: stream_dataset ignored batch_size!"
+
+    # The coordinator caps competitor rows with PRICING_ROW_LIMIT (0 = every row)
+    pricing_csv = "product_id,competitor_price\n" + "".join(f"{1000 + i},{20 + i}\n" for i in range(8))
+    upload = {"uploaded_data": {"pricing_csv": pricing_csv}}
+    assert len(coordinator_node(upload)["pricing_context"]) == 5, "❌ FAILED: Default pricing limit changed!"
+    with env(PRICING_ROW_LIMIT="0"):
+        assert len(coordinator_node(upload)["pricing_context"]) == 8, "❌ FAILED: PRICING_ROW_LIMIT ignored!"
+
+    print("\n✅ TEST PASSED: Limits and fallback work!")
+
+
+PRICING_CSV = """product_id,baseline_price,cost,competitor_avg_price,trend
+1000,49.99,25,44-52 USD,stable
+1001,91.18,40,65–100,unclear
+1002,12.5,6,??,stable
+"""
+
+
+def test_dirty_numeric_parsing():
+    """Currency suffixes, ranges and spelled-out numbers parse; junk is NaN and flagged."""
+    print("=" * 70)
+    print("TEST 4: DIRTY NUMERIC PARSING")
+    print("=" * 70)
+
+    values = pd.Series(["49.99 USD", "ninety", "unknown", None, "109–140", "44-52 USD", "$1,299", "forty-five SAR",
+                        "49.99usd", "44-52USD"])
+    parsed = parse_numeric_column(values)
+    mid = parsed["mid"].tolist()
+    assert mid[:2] == [49.99, 90.0], "❌ FAILED: Currency suffix or spelled-out number not parsed!"
+    assert mid[4:8] == [124.5, 48.0, 1299.0, 45.0], "❌ FAILED: Ranges or separators not parsed!"
+    assert mid[8:] == [49.99, 48.0], "❌ FAILED: Currency code without a space not stripped!"
+    assert parsed["min"][4] == 109.0 and parsed["max"][4] == 140.0, "❌ FAILED: Range bounds wrong!"
+    assert parsed["invalid"].tolist() == [False, False, True, False, False, False, False, False, False, False], \
+        "❌ FAILED: Only the non-blank unparseable cell should be flagged!"
+
+    issues = []
+    batches = iter_csv_batches(io.StringIO(PRODUCTS_CSV), batch_size=2, dataset="products", issues=issues)
+    products = read_rows(batches)
+    assert products[1]["price"] == 90.0, "❌ FAILED: Product price not parsed at load time!"
+    assert [(i["product_id"], i["field"]) for i in issues] == [], "❌ FAILED: Clean cells were flagged!"
+
+    pricing = read_rows(iter_csv_batches(io.StringIO(PRICING_CSV), dataset="pricing", issues=issues))
+    assert pricing[0]["competitor_avg_price_mid"] == 48.0, "❌ FAILED: Competitor range midpoint missing!"
+    assert [(i["product_id"], i["field"]) for i in issues] == [(1002, "competitor_avg_price")], \
+        "❌ FAILED: Unparseable competitor price not flagged once!"
+
+    print(f"✓ Parsed mids: {mid}")
+    print("\n✅ TEST PASSED: Dirty numeric fields parse at load time!")
+
+
+def test_pricing_uses_parsed_fields():
+    """Pricing indexes competitor range midpoints and skips products without a price."""
+    print("=" * 70)
+    print("TEST 5: PRICING USES PARSED FIELDS")
+    print("=" * 70)
+
+    pricing = read_rows(iter_csv_batches(io.StringIO(PRICING_CSV), dataset="pricing"))
+    index = build_pricing_index(pricing)
+    assert index == {"1000": 48.0, "1001": 82.5}, "❌ FAILED: Index should hold range midpoints only!"
+
+    products = [
+        {"id": 1000, "name": "Shirt", "price": 49.99, "cost": float("nan")},
+        {"id": 1001, "name": "Press", "price": float("nan"), "cost": 40.0},
+    ]
+    result = pricing_agent({"product_data": products, "pricing_context": pricing, "sentiment_score": 0.0})
+    proposals = result["pricing_proposals"]
+    assert [p["product_id"] for p in proposals] == [1000], "❌ FAILED: Unpriced product was priced!"
+    assert proposals[0]["cost"] == 49.99 * 0.5, "❌ FAILED: Missing cost should default to half the price!"
+
+    # The normalized catalog is LLM output: text prices are parsed, unparseable ones skipped
+    catalog = [
+        {"id": 1000, "name": "Shirt", "price": "49.99 USD", "cost": "25"},
+        {"id": 1001, "name": "Press", "price": "unknown", "cost": 40.0},
+        {"id": 1002, "name": "Lamp", "price": 30.0, "cost": None},
+    ]
+    result = pricing_agent({"normalized_catalog": catalog, "pricing_context": pricing, "sentiment_score": 0.0})
+    proposals = {p["product_id"]: p for p in result["pricing_proposals"]}
+    assert sorted(proposals) == [1000, 1002], "❌ FAILED: Text prices not parsed or junk not skipped!"
+    assert proposals[1000]["current_price"] == 49.99 and proposals[1000]["cost"] == 25.0, \
+        "❌ FAILED: Catalog price/cost not parsed!"
+
+    print("\n✅ TEST PASSED: Pricing never falls back to 0!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("STREAMING DATA LOADER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_batches_match_full_read()
+        test_read_rows_stops_early()
+        test_load_sample_data_limits_and_fallback()
+        test_dirty_numeric_parsing()
+        test_pricing_uses_parsed_fields()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Test script for input deduplication and in-flight request coalescing.
+Checks that duplicate products and repeated messages are sent to the LLM
+once and fanned back out to every original ID, and that concurrent
+identical chain calls share one request.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false"
+})
+
+from env_helpers import env
+from langchain_core.runnables import RunnableLambda
+from agents.catalog_agent import catalog_agent
+from agents.support_agent import support_agent
+from dedup import group_duplicates, with_coalescing
+from fake_llm import FAKE_LLM_STATS
+
+COFFEE_PRESS = {"title": "Coffee Press", "category": "Kitchen & Dining", "price": "ninety", "cost": "40",
+                "attributes": "capacity=1L??", "description": "1-liter French press. Maybe borosilcate?"}
+
+
+def test_group_duplicates():
+    """Rows equal after case/whitespace normalization share one representative."""
+    print("=" * 70)
+    print("TEST 1: GROUPING DUPLICATES")
+    print("=" * 70)
+
+    rows = [{"message": "Where is my order?"}, {"message": "Refund please"},
+            {"message": "  where is MY order? "}, {"message": "Where is my order?"}]
+    representatives, duplicates = group_duplicates(rows, range(len(rows)), ("message",))
+    print(f"  representatives={representatives}, duplicates={duplicates}")
+    assert representatives == [0, 1], "❌ FAILED: Wrong representatives!"
+    assert duplicates == {0: [2, 3]}, "❌ FAILED: Duplicates not grouped!"
+
+    print("\n✅ TEST PASSED: Normalized duplicates are grouped!")
+
+
+# Only the LLM's issues are counted
+@env(INPUT_DEDUP_ENABLED="true", DUPLICATE_DETECTION_ENABLED="false")
+def test_catalog_fan_out():
+    """Duplicate products cost one LLM row and every product ID gets its result."""
+    print("\n" + "=" * 70)
+    print("TEST 2: CATALOG FAN-OUT")
+    print("=" * 70)
+
+    products = [{"product_id": 1000, "title": "Yoga Mat", "price": "35", "cost": "10"}]
+    products += [{"product_id": 1001 + i, **COFFEE_PRESS} for i in range(3)]
+    calls_before = FAKE_LLM_STATS["input_chars"]
+    result = catalog_agent({"merchant_id": "m1", "product_data": products})
+    deduplicated_chars = FAKE_LLM_STATS["input_chars"] - calls_before
+
+    with env(INPUT_DEDUP_ENABLED="false"):
+        calls_before = FAKE_LLM_STATS["input_chars"]
+        expected = catalog_agent({"merchant_id": "m1", "product_data": products})
+        full_chars = FAKE_LLM_STATS["input_chars"] - calls_before
+
+    ids = [row["id"] for row in result["normalized_catalog"]]
+    issue_ids = sorted(issue["product_id"] for issue in result["catalog_issues"])
+    print(f"  Prompt chars: {deduplicated_chars} deduplicated vs {full_chars} without")
+    print(f"  Normalized IDs: {ids}, issues for: {issue_ids}")
+    assert ids == ["1000", "1001", "1002", "1003"], "❌ FAILED: Results not fanned out to every ID!"
+    assert result["normalized_catalog"] == expected["normalized_catalog"], "❌ FAILED: Fan-out differs from LLM!"
+    assert issue_ids == ["1001", "1002", "1003"], "❌ FAILED: Issues not fanned out!"
+    assert deduplicated_chars < full_chars, "❌ FAILED: Duplicates were still sent!"
+
+    print("\n✅ TEST PASSED: Duplicate products are normalized once!")
+
+
+# Every message goes to the LLM
+@env(INPUT_DEDUP_ENABLED="true", SUPPORT_PRECLASSIFIER_ENABLED="false")
+def test_support_fan_out():
+    """Repeated complaints are classified once but counted for every message."""
+    print("\n" + "=" * 70)
+    print("TEST 3: SUPPORT FAN-OUT")
+    print("=" * 70)
+
+    viral = "This product broke after one day, terrible quality!"
+    messages = [{"message_id": i, "channel": "email", "message": viral} for i in range(1, 41)]
+    messages += [{"message_id": 41, "channel": "email", "message": "Where is my order?"}]
+    calls_before = FAKE_LLM_STATS["calls"]
+    result = support_agent({"customer_messages": messages})
+    calls = FAKE_LLM_STATS["calls"] - calls_before
+
+    summary = result["support_summary"]
+    ids = [c["id"] for c in summary["classifications"]]
+    print(f"  {calls} LLM call(s), {len(ids)} classifications, "
+          f"{summary['complaint_count']} complaints, spike={result['complaint_spike_detected']}")
+    assert calls == 1, "❌ FAILED: Repeats were sent in extra batches!"
+    assert sorted(ids, key=int) == [str(i) for i in range(1, 42)], "❌ FAILED: Classifications not fanned out!"
+    assert summary["analyzed_messages"] == 41, "❌ FAILED: Repeats not counted!"
+    assert summary["complaint_count"] == 40 and result["complaint_spike_detected"], \
+        "❌ FAILED: A viral repeat must still count toward the spike!"
+
+    print("\n✅ TEST PASSED: Repeated messages are classified once!")
+
+
+def test_inflight_coalescing():
+    """Concurrent identical calls share one request; different inputs do not."""
+    print("\n" + "=" * 70)
+    print("TEST 4: IN-FLIGHT COALESCING")
+    print("=" * 70)
+
+    calls = []
+
+    async def slow_chain(payload):
+        calls.append(payload["products"])
+        await asyncio.sleep(0.05)
+        return {"echo": payload["products"]}
+
+    chain = with_coalescing(RunnableLambda(lambda p: None, afunc=slow_chain), "prompt", "llm")
+
+    async def run():
+        return await asyncio.gather(*(chain.ainvoke({"products": "same"}) for _ in range(5)),
+                                    chain.ainvoke({"products": "other"}))
+
+    results = asyncio.run(run())
+    print(f"  {len(calls)} underlying calls for 6 requests")
+    assert sorted(calls) == ["other", "same"], "❌ FAILED: Identical calls were not coalesced!"
+    assert all(r == {"echo": "same"} for r in results[:5]), "❌ FAILED: Result not shared!"
+    assert results[0] is not results[1], "❌ FAILED: Followers must get their own copy!"
+
+    asyncio.run(chain.ainvoke({"products": "same"}))
+    assert len(calls) == 3, "❌ FAILED: Finished calls must not be reused!"
+
+    print("\n✅ TEST PASSED: In-flight duplicates share one request!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("DEDUP TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_group_duplicates()
+        test_catalog_fan_out()
+        test_support_fan_out()
+        test_inflight_coalescing()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
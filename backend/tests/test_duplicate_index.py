@@ -0,0 +1,144 @@
+"""
+Test script for the catalog-wide near-duplicate index.
+Checks that reworded and re-punctuated listings are clustered while distinct
+products are not, that the Catalog Agent reports duplicates split across LLM
+batches, and that a large catalog is indexed without pairwise comparison.
+"""
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false"
+})
+
+from agents.catalog_agent import catalog_agent
+from agents.duplicate_index import find_duplicate_clusters, lsh_candidate_pairs, minhash_signatures, product_texts
+from columnar import RecordTable
+import numpy as np
+
+PRODUCTS = [
+    {"product_id": 1, "title": "Wireless EarBud Pro", "attributes": "color=black;battery=24h",
+     "description": "Bluetooth 5.3 earbuds with noise cancelling and a charging case."},
+    {"product_id": 2, "title": "Coffee Press", "attributes": "capacity=1L",
+     "description": "1-liter French press made of borosilicate glass."},
+    {"product_id": 3, "title": "wireless earbud PRO!", "attributes": "color = black; battery = 24h",
+     "description": "Bluetooth 5.3 earbuds with noise-cancelling and a charging case"},
+    {"product_id": 4, "title": "Kids Sneakers", "attributes": "size=30",
+     "description": "Light running shoes for kids with velcro straps."},
+    {"product_id": 5, "title": "Wireless EarBuds Pro", "attributes": "color=black;battery=24h",
+     "description": "Bluetooth 5.3 earbuds with noise cancelling and charging case."},
+    {"product_id": 6, "title": "Coffee Grinder", "attributes": "capacity=200g",
+     "description": "Electric burr grinder for coffee beans."},
+]
+
+
+def test_near_duplicates_clustered():
+    """Reworded copies of one listing form a cluster led by the first; distinct products stay apart."""
+    print("=" * 70)
+    print("TEST 1: NEAR-DUPLICATE CLUSTERS")
+    print("=" * 70)
+
+    clusters, _ = find_duplicate_clusters(PRODUCTS)
+    print(f"  Clusters: {clusters}")
+    assert clusters == [[0, 2, 4]], "❌ FAILED: Wrong duplicate clusters!"
+
+    table_clusters, _ = find_duplicate_clusters(RecordTable.from_records(PRODUCTS))
+    assert table_clusters == clusters, "❌ FAILED: Columnar products clustered differently!"
+
+    print("\n✅ TEST PASSED: Near-duplicates are clustered!")
+
+
+def test_catalog_reports_cross_batch_duplicates():
+    """Duplicates in different LLM batches come back as duplicate issues."""
+    print("\n" + "=" * 70)
+    print("TEST 2: CATALOG AGENT DUPLICATE ISSUES")
+    print("=" * 70)
+
+    os.environ["CATALOG_BATCH_MAX_ITEMS"] = "2"
+    try:
+        result = catalog_agent({"merchant_id": "m1", "product_data": PRODUCTS})
+    finally:
+        del os.environ["CATALOG_BATCH_MAX_ITEMS"]
+
+    duplicates = [issue for issue in result["catalog_issues"] if issue["type"] == "duplicate"]
+    for issue in duplicates:
+        print(f"  {issue['product_id']} -> {issue['duplicate_of']}: {issue['message']}")
+    assert [(i["product_id"], i["duplicate_of"]) for i in duplicates] == [("3", "1"), ("5", "1")], \
+        "❌ FAILED: Cross-batch duplicates not reported!"
+    assert all(i["cluster_size"] == 3 and i["similarity"] >= 0.7 for i in duplicates), \
+        "❌ FAILED: Wrong cluster details!"
+
+    os.environ["DUPLICATE_DETECTION_ENABLED"] = "false"
+    try:
+        result = catalog_agent({"merchant_id": "m1", "product_data": PRODUCTS})
+    finally:
+        del os.environ["DUPLICATE_DETECTION_ENABLED"]
+    assert not any(i["type"] == "duplicate" for i in result["catalog_issues"]), \
+        "❌ FAILED: Detection not disabled!"
+
+    print("\n✅ TEST PASSED: Cross-batch duplicates are reported!")
+
+
+def test_large_catalog_is_near_linear():
+    """A 50k-product catalog is indexed in seconds and candidate pairs stay linear."""
+    print("\n" + "=" * 70)
+    print("TEST 3: LARGE CATALOG")
+    print("=" * 70)
+
+    rng = random.Random(7)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+             for _ in range(5000)]
+    products = [{"title": " ".join(rng.choices(words, k=4)), "attributes": f"color={rng.choice(words)}",
+                 "description": " ".join(rng.choices(words, k=15))} for _ in range(50_000)]
+    # Every 100th product is re-listed with a changed title word
+    for i in range(0, len(products), 100):
+        copy = dict(products[i])
+        copy["title"] = copy["title"].rsplit(" ", 1)[0] + " new"
+        products.append(copy)
+
+    start = time.perf_counter()
+    clusters, _ = find_duplicate_clusters(products)
+    elapsed = time.perf_counter() - start
+    signatures, present = minhash_signatures(product_texts(products))
+    candidates = lsh_candidate_pairs(signatures, np.flatnonzero(present), 16)
+
+    print(f"  {len(products)} products: {len(clusters)} clusters, "
+          f"{len(candidates)} candidate pairs, {elapsed:.2f}s")
+    assert len(clusters) >= 480, "❌ FAILED: Re-listed products not found!"
+    assert all(len(cluster) == 2 for cluster in clusters), "❌ FAILED: Unrelated products clustered!"
+    assert len(candidates) < 2 * len(products), "❌ FAILED: Candidate pairs grew quadratically!"
+
+    print("\n✅ TEST PASSED: Large catalogs are indexed without pairwise comparison!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("DUPLICATE INDEX TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_near_duplicates_clustered()
+        test_catalog_reports_cross_batch_duplicates()
+        test_large_catalog_is_near_linear()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Test script for per-node timing and token instrumentation.
+Checks that every node emits an event with wall time, rows and memory, that
+LLM calls, tokens and cache hits are attributed to the node that made them,
+that the run summary lands in final_report and the JSONL sink, and that
+rate-limiter waits and retries are recorded on the calling node.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "FAKE_LLM_JITTER_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false"
+})
+
+from env_helpers import env, restore_env, set_env
+from fake_llm import FAKE_LLM_STATS
+from fake_openai_server import FakeOpenAIServer
+from graph import build_workflow
+from instrumentation import NodeTrace, _current_trace, get_metrics, instrument_node, reset_metrics
+from llm_config import reset_llm_registry
+
+# Small runs on the sample data; set per run so other test modules are unaffected
+RUN_ENV = {
+    "DATA_DIR": str(backend_dir.parent / "data" / "salla_data"),
+    "PRODUCT_ROW_LIMIT": "100",
+    "MESSAGE_ROW_LIMIT": "60"
+}
+
+
+def run_graph(**settings):
+    with env(**{**RUN_ENV, **settings}):
+        return asyncio.run(build_workflow().compile().ainvoke({"merchant_id": "m1"}))
+
+
+def test_node_events_and_report():
+    """Each node emits an event; LLM totals match the fake model's call count."""
+    print("=" * 70)
+    print("TEST 1: NODE EVENTS AND FINAL REPORT METRICS")
+    print("=" * 70)
+
+    reset_metrics()
+    with tempfile.TemporaryDirectory() as tmp:
+        events_path = os.path.join(tmp, "events.jsonl")
+        calls_before = FAKE_LLM_STATS["calls"]
+        result = run_graph(METRICS_EVENTS_PATH=events_path)
+        calls = FAKE_LLM_STATS["calls"] - calls_before
+        with open(events_path) as f:
+            events = [json.loads(line) for line in f]
+
+    nodes = [event["node"] for event in result["node_metrics"]]
+    print(f"  Nodes: {nodes}")
+    assert nodes[0] == "coordinator" and nodes[-1] == "resolver", "❌ FAILED: Node events missing!"
+    coordinator = result["node_metrics"][0]
+    assert coordinator["rows_out"]["product_data"] == 100, "❌ FAILED: Payload rows not counted!"
+    assert coordinator["memory"]["peak_rss_mb"] > 0, "❌ FAILED: Memory not measured!"
+
+    metrics = result["final_report"]["metrics"]
+    print(f"  LLM: {metrics['llm']}")
+    assert metrics["llm"]["llm_calls"] == calls, "❌ FAILED: LLM calls not attributed to nodes!"
+    assert metrics["llm"]["prompt_tokens"] > 0 and metrics["llm"]["completion_tokens"] > 0, \
+        "❌ FAILED: Token usage not recorded!"
+    per_node = metrics["nodes"]
+    assert per_node["catalog_agent"]["llm_calls"] > 0 and per_node["support_agent"]["llm_calls"] > 0, \
+        "❌ FAILED: Calls attributed to the wrong nodes!"
+    assert per_node["pricing_agent"]["llm_calls"] == 0, "❌ FAILED: Parallel branches leaked into pricing!"
+
+    kinds = [event["event"] for event in events]
+    assert kinds.count("node") == len(nodes), "❌ FAILED: JSONL sink missed node events!"
+    assert kinds.count("llm_call") == calls, "❌ FAILED: JSONL sink missed LLM calls!"
+    assert get_metrics()["resolver"]["runs"] == 1, "❌ FAILED: Registry not updated!"
+
+    print("\n✅ TEST PASSED: Every node is timed and LLM usage is attributed!")
+
+
+def test_cache_hits():
+    """A re-run served from the LLM cache records hits and no model calls."""
+    print("\n" + "=" * 70)
+    print("TEST 2: CACHE HITS")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = {"LLM_CACHE_ENABLED": "true", "LLM_CACHE_PATH": os.path.join(tmp, "cache.sqlite3")}
+        first = run_graph(**settings)["final_report"]["metrics"]["llm"]
+        second = run_graph(**settings)["final_report"]["metrics"]["llm"]
+
+    print(f"  First run: {first['cache_misses']} misses, second run: {second['cache_hits']} hits")
+    assert first["cache_misses"] == first["llm_calls"] > 0, "❌ FAILED: Cache misses not recorded!"
+    assert second["cache_hits"] == first["cache_misses"], "❌ FAILED: Cache hits not recorded!"
+    assert second["llm_calls"] == 0, "❌ FAILED: Cached run called the model!"
+
+    print("\n✅ TEST PASSED: Cache hits are counted per run!")
+
+
+def test_rate_limit_retries():
+    """429s and retries from the rate-limited transport land on the calling node."""
+    print("\n" + "=" * 70)
+    print("TEST 3: RATE LIMIT RETRIES")
+    print("=" * 70)
+
+    from llm_config import get_chain, get_llm
+    from agents.support_agent import SUPPORT_PROMPT, SupportAnalysis
+
+    with FakeOpenAIServer(latency_ms=20, requests_per_second=5) as server:
+        previous = set_env(
+            LLM_PROVIDER="openai", OPENAI_API_KEY="test-key", OPENAI_BASE_URL=server.base_url,
+            LLM_RETRY_BASE_SECONDS="0.05", LLM_RATE_LIMIT_RETRIES="20"
+        )
+        trace = NodeTrace("support_agent", "m1")
+        token = _current_trace.set(trace)
+        try:
+            reset_llm_registry()
+            chain = get_chain(SUPPORT_PROMPT, get_llm(temperature=0), SupportAnalysis)
+            payload = {"messages": str([{"message_id": 1, "message": "Where is my order?"}])}
+
+            async def fan_out():
+                return await asyncio.gather(*(chain.ainvoke(payload) for _ in range(15)))
+
+            asyncio.run(fan_out())
+        finally:
+            _current_trace.reset(token)
+            restore_env(previous)
+            reset_llm_registry()
+
+    counters = trace.counters
+    print(f"  {server.rate_limited} 429s from the server, trace: {counters}")
+    assert counters["llm_calls"] == 15, "❌ FAILED: LLM calls not recorded!"
+    assert counters["rate_limited"] == server.rate_limited > 0, "❌ FAILED: 429s not recorded!"
+    assert counters["retries"] == counters["rate_limited"], "❌ FAILED: Retries not recorded!"
+
+    print("\n✅ TEST PASSED: Rate limiting is visible per node!")
+
+
+def allocating_node(state):
+    """Holds 256 MB for a moment, like a stage that builds a large payload."""
+    block = bytearray(256 * 2**20)
+    block[::4096] = b"x" * len(block[::4096])
+    time.sleep(0.2)
+    del block
+    return {"allocated": True}
+
+
+def idle_node(state):
+    time.sleep(0.1)
+    return {"idle": True}
+
+
+def test_peak_memory_per_node():
+    """Peak RSS is measured per node, so a later small node does not inherit an earlier big one."""
+    print("\n" + "=" * 70)
+    print("TEST 4: PEAK MEMORY PER NODE")
+    print("=" * 70)
+
+    big = instrument_node(allocating_node, "allocating").invoke({"merchant_id": "m1"})["node_metrics"][0]
+    small = instrument_node(idle_node, "idle").invoke({"merchant_id": "m1"})["node_metrics"][0]
+    print(f"  allocating: {big['memory']}")
+    print(f"  idle: {small['memory']}")
+    assert big["memory"]["peak_rss_mb"] >= big["memory"]["rss_start_mb"] + 200, \
+        "❌ FAILED: Allocation inside the node not sampled!"
+    assert small["memory"]["peak_rss_mb"] < big["memory"]["peak_rss_mb"] - 200, \
+        "❌ FAILED: Peak carried over from an earlier node!"
+
+    print("\n✅ TEST PASSED: Peak memory is per node!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("INSTRUMENTATION TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_node_events_and_report()
+        test_cache_hits()
+        test_rate_limit_retries()
+        test_peak_memory_per_node()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
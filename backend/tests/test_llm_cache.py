@@ -0,0 +1,141 @@
+"""
+Test script for the persistent content-addressed LLM response cache.
+Uses a temporary SQLite file and a stubbed LLM; no API keys needed.
+"""
+import importlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import env
+from langchain_core.runnables import RunnableLambda
+from llm_cache import LLMCache
+
+# agents/__init__.py re-exports the function under the module's name
+catalog_module = importlib.import_module("agents.catalog_agent")
+
+
+class FakeModel:
+    """Stands in for a configured chat model when building cache keys."""
+
+    def __init__(self, model_name="gpt-4o-mini", temperature=0):
+        self.model_name = model_name
+        self.temperature = temperature
+
+
+def test_key_depends_on_all_inputs():
+    """Prompt, model, temperature and payload all change the cache key."""
+    print("=" * 70)
+    print("TEST 1: CONTENT-ADDRESSED KEYS")
+    print("=" * 70)
+
+    prompt = catalog_module.CATALOG_PROMPT
+    base = LLMCache.make_key(prompt, FakeModel(), {"products": "[1]"})
+
+    assert base == LLMCache.make_key(prompt, FakeModel(), {"products": "[1]"}), "❌ FAILED: Key not deterministic!"
+    assert base != LLMCache.make_key(prompt, FakeModel(), {"products": "[2]"}), "❌ FAILED: Payload ignored!"
+    assert base != LLMCache.make_key(prompt, FakeModel("gpt-4o"), {"products": "[1]"}), "❌ FAILED: Model ignored!"
+    assert base != LLMCache.make_key(prompt, FakeModel(temperature=1), {"products": "[1]"}), "❌ FAILED: Temperature ignored!"
+    assert base != LLMCache.make_key("other prompt", FakeModel(), {"products": "[1]"}), "❌ FAILED: Prompt ignored!"
+
+    print("\n✅ TEST PASSED: Keys cover prompt, model, temperature and input!")
+
+
+def test_ttl_and_lru_eviction():
+    """Expired entries miss and the least recently used entries are evicted."""
+    print("=" * 70)
+    print("TEST 2: TTL EXPIRY AND LRU EVICTION")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = LLMCache(path=os.path.join(tmp, "cache.sqlite3"), ttl_seconds=0, max_entries=2)
+        cache.set("a", {"v": 1})
+        time.sleep(0.01)
+        cache.set("b", {"v": 2})
+        time.sleep(0.01)
+        assert cache.get("a") == {"v": 1}, "❌ FAILED: Stored value not returned!"
+        time.sleep(0.01)
+        cache.set("c", {"v": 3})  # Evicts "b", the least recently used
+
+        assert cache.get("b") is None, "❌ FAILED: LRU entry was not evicted!"
+        assert cache.get("a") == {"v": 1}, "❌ FAILED: Recently used entry evicted!"
+        stats = cache.stats()
+        assert stats["evictions"] == 1 and stats["entries"] == 2, f"❌ FAILED: Wrong stats {stats}"
+        assert stats["hits"] == 2 and stats["misses"] == 1, f"❌ FAILED: Wrong counters {stats}"
+
+        expiring = LLMCache(path=os.path.join(tmp, "ttl.sqlite3"), ttl_seconds=1)
+        expiring.set("k", {"v": 1})
+        expiring._conn.execute("UPDATE llm_cache SET created_at = created_at - 10")
+        assert expiring.get("k") is None, "❌ FAILED: Expired entry returned!"
+
+    print("\n✅ TEST PASSED: TTL and LRU eviction work!")
+
+
+def test_unchanged_catalog_rerun_makes_no_calls():
+    """A second run over the same catalog is served entirely from the cache."""
+    print("=" * 70)
+    print("TEST 3: ZERO LLM CALLS ON UNCHANGED RE-RUN")
+    print("=" * 70)
+
+    calls = []
+
+    def stub(prompt_value):
+        calls.append(1)
+        ids = re.findall(r'"product_id":"?([\w-]+)', prompt_value.to_messages()[-1].content)
+        return json.dumps({
+            "normalized_products": [{"id": pid} for pid in ids],
+            "issues": [],
+            "confidence_score": 0.9
+        })
+
+    products = [{"product_id": f"P{i}", "title": f"Item {i}", "price": 10.0} for i in range(40)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = catalog_module.get_llm
+        catalog_module.get_llm = lambda **kwargs: RunnableLambda(stub)
+        try:
+            with env(LLM_CACHE_ENABLED="true", CATALOG_STORE_ENABLED="false",
+                     LLM_CACHE_PATH=os.path.join(tmp, "cache.sqlite3"), CATALOG_BATCH_MAX_ITEMS="10"):
+                first = catalog_module.catalog_agent({"product_data": products})
+                first_calls = len(calls)
+                second = catalog_module.catalog_agent({"product_data": products})
+        finally:
+            catalog_module.get_llm = original
+
+    assert first_calls == 4, f"❌ FAILED: Expected 4 calls on first run, got {first_calls}"
+    assert len(calls) == first_calls, "❌ FAILED: Re-run made LLM calls!"
+    assert second == first, "❌ FAILED: Cached result differs from original!"
+
+    print(f"✓ First run: {first_calls} calls, re-run: {len(calls) - first_calls} calls")
+    print("\n✅ TEST PASSED: Unchanged catalog served from cache!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("LLM CACHE TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_key_depends_on_all_inputs()
+        test_ttl_and_lru_eviction()
+        test_unchanged_catalog_rerun_makes_no_calls()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Test script for shared LLM clients, chains and the pooled HTTP connections.
+Runs the real OpenAI client against a local fake server, so no API keys are needed.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import restore_env, set_env
+from langchain_core.prompts import ChatPromptTemplate
+from fake_openai_server import FakeOpenAIServer
+from llm_config import get_chain, get_llm, reset_llm_registry
+from agents.support_agent import SUPPORT_PROMPT, SupportAnalysis
+
+
+def test_clients_and_chains_are_shared():
+    """Same configuration returns the same client and compiled chain."""
+    print("=" * 70)
+    print("TEST 1: SHARED CLIENTS AND CHAINS")
+    print("=" * 70)
+
+    previous = set_env(LLM_PROVIDER="openai", OPENAI_API_KEY="test-key")
+    try:
+        reset_llm_registry()
+        llm = get_llm(temperature=0)
+        assert get_llm(temperature=0) is llm, "❌ FAILED: Client rebuilt for the same configuration!"
+        assert get_llm(temperature=0.5) is not llm, "❌ FAILED: Temperature ignored in the registry key!"
+
+        chain = get_chain(SUPPORT_PROMPT, llm, SupportAnalysis)
+        assert get_chain(SUPPORT_PROMPT, llm, SupportAnalysis) is chain, "❌ FAILED: Chain rebuilt!"
+        other_prompt = ChatPromptTemplate.from_messages([("user", "{messages}")])
+        assert get_chain(other_prompt, llm, SupportAnalysis) is not chain, "❌ FAILED: Prompt ignored in chain key!"
+
+        os.environ["OPENAI_API_KEY"] = "rotated-key"
+        assert get_llm(temperature=0) is not llm, "❌ FAILED: Credential change did not rebuild the client!"
+    finally:
+        restore_env(previous)
+        reset_llm_registry()
+
+    print("\n✅ TEST PASSED: Clients and chains are shared!")
+
+
+def test_connections_are_reused():
+    """Sequential and concurrent calls reuse pooled keep-alive connections."""
+    print("=" * 70)
+    print("TEST 2: CONNECTION REUSE")
+    print("=" * 70)
+
+    with FakeOpenAIServer(latency_ms=20) as server:
+        previous = set_env(
+            LLM_PROVIDER="openai", OPENAI_API_KEY="test-key", OPENAI_BASE_URL=server.base_url,
+            LLM_HTTP_MAX_CONNECTIONS="3"
+        )
+        try:
+            reset_llm_registry()
+            chain = get_chain(SUPPORT_PROMPT, get_llm(temperature=0), SupportAnalysis)
+            payload = {"messages": str([{"message_id": 1, "message": "Where is my order?"}])}
+
+            for _ in range(5):
+                result = chain.invoke(payload)
+                assert "message_classifications" in result, "❌ FAILED: Unexpected response!"
+            assert server.connections == 1, f"❌ FAILED: {server.connections} connections for sequential calls!"
+
+            async def fan_out():
+                return await asyncio.gather(*(chain.ainvoke(payload) for _ in range(12)))
+
+            asyncio.run(fan_out())
+            async_connections = server.connections - 1
+            assert server.requests == 17, "❌ FAILED: Requests were lost!"
+            assert async_connections <= 3, f"❌ FAILED: Pool opened {async_connections} connections (limit 3)!"
+        finally:
+            restore_env(previous)
+            reset_llm_registry()
+
+    print(f"✓ {server.requests} requests over {server.connections} connections")
+    print("\n✅ TEST PASSED: Connections are reused!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("LLM CLIENT POOL TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_clients_and_chains_are_shared()
+        test_connections_are_reused()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Test script for the leveled backend logger.
+Checks that suppressed levels skip message formatting, that records carry
+the bound merchant/run context across threads and concurrent tasks, and that
+the JSON format emits one parseable object per record.
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from logger import configure_logging, get_logger, log_context
+
+
+class CountingArg:
+    """Log argument that counts how often it is formatted."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "arg"
+
+
+def capture(level: str, fmt: str) -> io.StringIO:
+    """Reconfigure logging into a buffer."""
+    stream = io.StringIO()
+    root = configure_logging(level, fmt)
+    root.handlers[0].setStream(stream)
+    return stream
+
+
+def test_quiet_mode_skips_formatting():
+    """Suppressed records are never formatted or written."""
+    print("=" * 70)
+    print("TEST 1: QUIET MODE")
+    print("=" * 70)
+
+    stream = capture("WARNING", "text")
+    logger = get_logger("tests.quiet")
+    arg = CountingArg()
+    for _ in range(1000):
+        logger.info("Normalized %s products", arg)
+    logger.warning("⚠️  Kept %s", arg)
+
+    print(f"  Output: {stream.getvalue().strip()!r}, formatted {arg.formatted}x")
+    assert arg.formatted == 1, "❌ FAILED: Suppressed records were formatted!"
+    assert stream.getvalue() == "⚠️  Kept arg\n", "❌ FAILED: Unexpected output!"
+
+    print("\n✅ TEST PASSED: Suppressed levels do no formatting work!")
+
+
+def test_context_follows_the_run():
+    """Bound merchant/run IDs reach records from threads and concurrent tasks."""
+    print("\n" + "=" * 70)
+    print("TEST 2: RUN CONTEXT")
+    print("=" * 70)
+
+    stream = capture("INFO", "json")
+    logger = get_logger("tests.context")
+
+    async def merchant(merchant_id):
+        with log_context(merchant_id=merchant_id, run_id="r1"):
+            await asyncio.sleep(0)
+            # Like LangGraph, run sync work in a thread with a copy of the context
+            with ThreadPoolExecutor(1) as pool:
+                pool.submit(copy_context().run, logger.info, "step for %s", merchant_id).result()
+
+    async def run():
+        await asyncio.gather(merchant("m1"), merchant("m2"))
+
+    asyncio.run(run())
+    logger.info("outside")
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    for record in records:
+        print(f"  {record}")
+    by_message = {record["msg"]: record for record in records}
+    assert by_message["step for m1"]["merchant_id"] == "m1", "❌ FAILED: Context lost in thread!"
+    assert by_message["step for m2"]["merchant_id"] == "m2", "❌ FAILED: Merchants mixed up!"
+    assert by_message["step for m1"]["run_id"] == "r1", "❌ FAILED: run_id missing!"
+    assert "merchant_id" not in by_message["outside"], "❌ FAILED: Context leaked out of the run!"
+    assert by_message["outside"]["logger"] == "tests.context", "❌ FAILED: Logger name missing!"
+
+    print("\n✅ TEST PASSED: Records carry their run's context!")
+
+
+def test_graph_logs_through_logger():
+    """A graph run writes its progress through the logger, not print()."""
+    print("\n" + "=" * 70)
+    print("TEST 3: GRAPH LOGGING")
+    print("=" * 70)
+
+    os.environ.update({
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MS": "0",
+        "LLM_CACHE_ENABLED": "false",
+        "CATALOG_STORE_ENABLED": "false",
+        "DATA_DIR": str(backend_dir.parent / "data" / "salla_data"),
+        "PRODUCT_ROW_LIMIT": "20"
+    })
+    from graph import build_workflow
+
+    stream = capture("INFO", "json")
+    with log_context(merchant_id="m1"):
+        build_workflow().compile().invoke({"merchant_id": "m1"})
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    loggers = {record["logger"] for record in records}
+    print(f"  {len(records)} records from {sorted(loggers)}")
+    assert {"nodes", "agents.catalog_agent", "agents.support_agent", "graph"} <= loggers, \
+        "❌ FAILED: Node output bypassed the logger!"
+    assert all(record.get("merchant_id") == "m1" for record in records), "❌ FAILED: Context missing!"
+
+    stream = capture("WARNING", "text")
+    build_workflow().compile().invoke({"merchant_id": "m1"})
+    assert "Catalog Agent" not in stream.getvalue(), "❌ FAILED: Quiet mode printed progress!"
+
+    print("\n✅ TEST PASSED: The graph logs through the leveled logger!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("LOGGER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_quiet_mode_skips_formatting()
+        test_context_follows_the_run()
+        test_graph_logs_through_logger()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+    finally:
+        configure_logging()
+
+
+if __name__ == "__main__":
+    main()
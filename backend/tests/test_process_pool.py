@@ -0,0 +1,177 @@
+"""
+Test script for process-pool execution of CPU-bound nodes.
+Checks the shared-memory round trip of RecordTable columns, that pooled
+graphs give the same reports as in-process ones (sync and async, dict and
+columnar state), that no shared memory blocks are leaked and that each node
+is sent only the state keys it reads.
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "CATALOG_STORE_ENABLED": "false"
+})
+
+from env_helpers import env
+import numpy as np
+import pandas as pd
+from columnar import RecordTable
+import process_pool
+from process_pool import (
+    SharedTable, attach_tables, release, select_state, share_tables, shutdown_process_pools
+)
+
+
+# Small runs on the sample data with tiny columns in shared memory; workers
+# spawned during a test inherit these
+POOL_ENV = {
+    "DATA_DIR": str(backend_dir.parent / "data" / "salla_data"),
+    "PRODUCT_ROW_LIMIT": "200",
+    "CPU_POOL_WORKERS": "2",
+    "CPU_POOL_SHM_MIN_BYTES": "64"
+}
+
+
+def shm_blocks():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@env(**POOL_ENV)
+def test_shared_memory_round_trip():
+    """Large numeric columns go through shared memory, object columns are kept."""
+    print("=" * 70)
+    print("TEST 1: SHARED MEMORY ROUND TRIP")
+    print("=" * 70)
+
+    table = RecordTable.from_frame(pd.DataFrame({
+        "price": np.linspace(1, 100, 500), "small": np.arange(4.0).repeat(125)[:500], "title": ["x"] * 500
+    }))
+    blocks = []
+    shared = share_tables({"product_data": table, "merchant_id": "m1"}, blocks)
+    assert isinstance(shared["product_data"], SharedTable), "❌ FAILED: Table was not shared!"
+    assert shared["merchant_id"] == "m1", "❌ FAILED: Plain values must pass through!"
+    print(f"  {len(blocks)} shared blocks for {len(table.columns)} columns")
+
+    handles = []
+    restored = attach_tables(shared, handles, copy=True)["product_data"]
+    release(handles)
+    release(blocks, unlink=True)
+
+    assert restored.columns == table.columns, "❌ FAILED: Columns changed!"
+    for name in table.columns:
+        assert np.array_equal(restored.column(name), table.column(name)), f"❌ FAILED: {name} differs!"
+
+    print("\n✅ TEST PASSED: Columns survive the shared memory round trip!")
+
+
+def run_graphs(columnar):
+    from graph import build_workflow
+    with env(COLUMNAR_STATE="true" if columnar else "false"):
+        # Workers read the environment when they are spawned
+        shutdown_process_pools()
+        in_process = build_workflow(cpu_pool=False).compile().invoke({"merchant_id": "m1"})
+        pooled_app = build_workflow(cpu_pool=True).compile()
+        pooled = pooled_app.invoke({"merchant_id": "m1"})
+        pooled_async = asyncio.run(pooled_app.ainvoke({"merchant_id": "m1"}))
+    return in_process, pooled, pooled_async
+
+
+def without_metrics(report):
+    return {key: value for key, value in report.items() if key != "metrics"}
+
+
+@env(**POOL_ENV)
+def test_pooled_graph_matches_in_process():
+    """Pooled nodes produce the same reports for dict and columnar state."""
+    print("\n" + "=" * 70)
+    print("TEST 2: POOLED GRAPH MATCHES IN-PROCESS GRAPH")
+    print("=" * 70)
+
+    before = shm_blocks()
+    for columnar in (False, True):
+        in_process, pooled, pooled_async = run_graphs(columnar)
+        expected = without_metrics(in_process["final_report"])
+        print(f"  columnar={columnar}: {expected['summary']}")
+        assert without_metrics(pooled["final_report"]) == expected, "❌ FAILED: Pooled invoke differs!"
+        assert without_metrics(pooled_async["final_report"]) == expected, "❌ FAILED: Pooled ainvoke differs!"
+        if columnar:
+            assert isinstance(pooled["product_data"], RecordTable), "❌ FAILED: Table lost in transfer!"
+    shutdown_process_pools()
+
+    leaked = shm_blocks() - before
+    assert not leaked, f"❌ FAILED: Leaked shared memory blocks {leaked}!"
+
+    print("\n✅ TEST PASSED: Process pool is transparent to the graph!")
+
+
+@env(**POOL_ENV, COLUMNAR_STATE="false")
+def test_nodes_get_only_what_they_read():
+    """Workers receive each node's read keys, not the whole state."""
+    print("\n" + "=" * 70)
+    print("TEST 3: STATE SENT TO WORKERS")
+    print("=" * 70)
+
+    state = {"normalized_catalog": None, "product_data": [1], "pricing_index": {}, "pricing_context": [2]}
+    assert select_state(state, [("normalized_catalog", "product_data"), ("pricing_index", "pricing_context")]) \
+        == {"product_data": [1], "pricing_index": {}}, "❌ FAILED: Wrong fallback selection!"
+
+    from graph import build_workflow
+    sent = {}
+    submit = process_pool._submit
+
+    def recording_submit(func, payload):
+        sent[func.__name__] = sorted(payload)
+        return submit(func, payload)
+
+    process_pool._submit = recording_submit
+    try:
+        build_workflow(cpu_pool=True).compile().invoke({"merchant_id": "m1"})
+    finally:
+        process_pool._submit = submit
+        shutdown_process_pools()
+
+    for name, keys in sent.items():
+        print(f"  {name}: {keys}")
+    assert set(sent) == {"coordinator_node", "pricing_agent", "validator_node", "conflict_resolver_node"}, \
+        "❌ FAILED: Pooled nodes missing!"
+    assert "customer_messages" not in sum(sent.values(), []), "❌ FAILED: Messages sent to a CPU node!"
+    assert "product_data" not in sent["pricing_agent"], "❌ FAILED: Raw catalog sent next to the normalized one!"
+    for name in ("validator_node", "conflict_resolver_node"):
+        assert not {"product_data", "normalized_catalog", "pricing_context"} & set(sent[name]), \
+            f"❌ FAILED: Catalog pickled for {name}!"
+
+    print("\n✅ TEST PASSED: Nodes get only the state they read!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("PROCESS POOL TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_shared_memory_round_trip()
+        test_pooled_graph_matches_in_process()
+        test_nodes_get_only_what_they_read()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+    finally:
+        shutdown_process_pools()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Test script for per-product sentiment.
+Checks that messages are linked to the catalog products they mention, that
+a complaint about one product only blocks price increases on that product
+(in the Pricing Agent, validator and resolver alike), and that 5k products
+x 5k messages are aggregated quickly.
+"""
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false"
+})
+
+from agents.pricing_agent import pricing_agent
+from agents.product_sentiment import ProductKeywordIndex, aggregate_product_sentiment
+from nodes import validator_node, conflict_resolver_node
+
+PRODUCTS = [
+    {"product_id": 1000, "title": "Slim Fit T-shirt", "price": 50.0, "cost": 20.0},
+    {"product_id": 1001, "title": "Coffee Press", "price": 90.0, "cost": 40.0},
+    {"product_id": 1002, "title": "3pc Cook Set – Steel", "price": 120.0, "cost": 60.0},
+    {"product_id": 1003, "title": "Coffee Press", "price": 95.0, "cost": 40.0},
+    {"product_id": 1004, "title": "Kids Sneakers", "price": 60.0, "cost": 25.0},
+]
+
+MESSAGES = [
+    {"message_id": 1, "message": "My t-shirt arrived but the material feels cheap, kinda itchy."},
+    {"message_id": 2, "message": "That coffee press is amazing!"},
+    {"message_id": 3, "message": "The cook set is good but the lids are a bit loose."},
+    {"message_id": 4, "message": "Where's my order?? This is ridiculous."},
+    {"message_id": 5, "message": "Wrong size again", "product_id": 1004},
+]
+
+CLASSIFICATIONS = [
+    {"id": "1", "type": "Complaint", "sentiment": "negative"},
+    {"id": "2", "type": "Suggestion", "sentiment": "positive"},
+    {"id": "3", "type": "Suggestion", "sentiment": "neutral"},
+    {"id": "4", "type": "Complaint", "sentiment": "negative"},
+    {"id": "5", "type": "Complaint", "sentiment": "negative"},
+]
+
+
+def test_messages_linked_to_products():
+    """Title keywords and explicit product_ids link messages; vague complaints stay unlinked."""
+    print("=" * 70)
+    print("TEST 1: MESSAGE -> PRODUCT LINKS")
+    print("=" * 70)
+
+    index = ProductKeywordIndex(PRODUCTS)
+    links = {m["message_id"]: index.link(m["message"], m.get("product_id")) for m in MESSAGES}
+    print(f"  Links: {links}")
+    assert links == {1: ["1000"], 2: ["1001", "1003"], 3: ["1002"], 4: [], 5: ["1004"]}, \
+        "❌ FAILED: Wrong message links!"
+
+    product_sentiment = aggregate_product_sentiment(PRODUCTS, MESSAGES, CLASSIFICATIONS)
+    print(f"  Per product: {product_sentiment}")
+    assert product_sentiment["1000"] == {"sentiment": -1.0, "messages": 1, "complaints": 1}, \
+        "❌ FAILED: Wrong t-shirt aggregate!"
+    assert product_sentiment["1003"] == {"sentiment": 1.0, "messages": 1, "complaints": 0}, \
+        "❌ FAILED: Same-title listing not linked!"
+    assert "1002" in product_sentiment and len(product_sentiment) == 5, "❌ FAILED: Wrong products aggregated!"
+
+    print("\n✅ TEST PASSED: Messages are linked to products!")
+
+
+def test_pricing_gated_per_product():
+    """Negative merchant-wide sentiment no longer blocks increases on products nobody complained about."""
+    print("\n" + "=" * 70)
+    print("TEST 2: PER-PRODUCT PRICING GATE")
+    print("=" * 70)
+
+    product_sentiment = aggregate_product_sentiment(PRODUCTS, MESSAGES, CLASSIFICATIONS)
+    state = {"product_data": PRODUCTS, "pricing_context": [], "sentiment_score": -0.6,
+             "product_sentiment": product_sentiment}
+
+    for engine in ("loop", "vectorized"):
+        os.environ["PRICING_ENGINE"] = engine
+        try:
+            proposals = pricing_agent(state)["pricing_proposals"]
+        finally:
+            del os.environ["PRICING_ENGINE"]
+        status = {p["product_id"]: p["status"] for p in proposals}
+        print(f"  {engine}: {status}")
+        assert status == {1000: "HOLD", 1001: "INCREASE", 1002: "INCREASE", 1003: "INCREASE", 1004: "HOLD"}, \
+            f"❌ FAILED: Wrong {engine} gate!"
+    assert "sentiment: -1.00" in proposals[0]["signals_used"], "❌ FAILED: Product sentiment not cited!"
+
+    legacy = pricing_agent({**state, "product_sentiment": None})["pricing_proposals"]
+    assert all(p["status"] == "HOLD" for p in legacy), "❌ FAILED: Global fallback changed!"
+
+    # Increases everywhere are contradictions only on the products customers complained about
+    state["pricing_proposals"] = [
+        {**p, "status": "INCREASE", "proposed_price": p["current_price"] + 5} for p in proposals
+    ]
+    flags = validator_node(state)["validation_flags"]
+    assert [f["product_id"] for f in flags] == [1000, 1004], "❌ FAILED: Validator not per product!"
+    actions = conflict_resolver_node({**state, "validation_flags": []})["final_report"]["pricing_actions"]
+    blocked = [a["product_id"] for a in actions if a["status"] == "BLOCKED"]
+    print(f"  Blocked by resolver: {blocked}")
+    assert blocked == [1000, 1004], "❌ FAILED: Resolver not per product!"
+
+    print("\n✅ TEST PASSED: Pricing is gated per product!")
+
+
+def test_5k_by_5k():
+    """5k products x 5k messages are indexed and aggregated in well under a second."""
+    print("\n" + "=" * 70)
+    print("TEST 3: 5K PRODUCTS x 5K MESSAGES")
+    print("=" * 70)
+
+    rng = random.Random(3)
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+             for _ in range(3000)]
+    products = [{"product_id": i, "title": " ".join(rng.choices(words, k=3))} for i in range(5000)]
+    messages = [{"message_id": i, "message": f"The {products[rng.randrange(5000)]['title']} broke, refund please"}
+                for i in range(5000)]
+    classifications = [{"id": str(i), "type": "Complaint", "sentiment": "negative"} for i in range(5000)]
+
+    start = time.perf_counter()
+    product_sentiment = aggregate_product_sentiment(products, messages, classifications)
+    elapsed = time.perf_counter() - start
+
+    print(f"  {len(product_sentiment)} products with signals in {elapsed * 1000:.0f} ms")
+    assert len(product_sentiment) > 3000, "❌ FAILED: Messages not linked!"
+    assert elapsed < 1.0, "❌ FAILED: Aggregation too slow!"
+
+    print("\n✅ TEST PASSED: 5k x 5k aggregated quickly!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("PRODUCT SENTIMENT TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_messages_linked_to_products()
+        test_pricing_gated_per_product()
+        test_5k_by_5k()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
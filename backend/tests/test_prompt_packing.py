@@ -0,0 +1,158 @@
+"""
+Test script for compact prompt packing.
+Checks that records are packed as minified JSON lines without empty fields,
+that long text is truncated, that the header-once table format round-trips,
+that batches respect the context limit, and that both compact formats pack
+more real catalog rows per batch than str().
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import env
+from batching import chunk_by_token_budget
+from data_loader import load_sample_data
+from fake_llm import parse_records
+from prompt_packing import (
+    compact_record, count_tokens, get_batch_token_budget, pack_records, serialize_record, TRUNCATION_MARK
+)
+
+
+def test_compact_records():
+    """Empty and NaN fields are dropped, whole floats lose their '.0'."""
+    print("=" * 70)
+    print("TEST 1: COMPACT JSON LINES")
+    print("=" * 70)
+
+    record = {"product_id": "1000", "title": " Shirt ", "price": 50.0, "cost": float("nan"),
+              "attributes": "", "description": None, "rating": 4.5}
+    line = serialize_record(record)
+    print(f"  {line}")
+
+    assert line == '{"product_id":"1000","title":"Shirt","price":50,"rating":4.5}', \
+        "❌ FAILED: Unexpected compact form!"
+    assert parse_records(pack_records([record, record])) == [compact_record(record)] * 2, \
+        "❌ FAILED: Packed lines do not parse back!"
+
+    print("\n✅ TEST PASSED: Records are packed compactly!")
+
+
+def test_long_fields_truncated():
+    """Long text fields are cut to PROMPT_FIELD_MAX_CHARS."""
+    print("\n" + "=" * 70)
+    print("TEST 2: LONG FIELD TRUNCATION")
+    print("=" * 70)
+
+    record = {"product_id": "1", "description": "word " * 200}
+    with env(PROMPT_FIELD_MAX_CHARS=40):
+        description = compact_record(record)["description"]
+    print(f"  {description!r}")
+
+    assert description.endswith(TRUNCATION_MARK) and len(description) <= 41, \
+        "❌ FAILED: Description was not truncated!"
+    with env(PROMPT_FIELD_MAX_CHARS=0):
+        assert compact_record(record)["description"] == record["description"].strip(), \
+            "❌ FAILED: 0 should disable truncation!"
+
+    print("\n✅ TEST PASSED: Long fields are truncated!")
+
+
+def test_table_format():
+    """The table format sends the columns once and parses back to the same records."""
+    print("\n" + "=" * 70)
+    print("TEST 3: HEADER-ONCE TABLE FORMAT")
+    print("=" * 70)
+
+    records = [
+        {"message_id": 1, "channel": "email", "message": "Where is my order?"},
+        {"message_id": 2, "channel": float("nan"), "message": "Lids don't fit"},
+    ]
+    text = pack_records(records, prompt_format="table")
+    print(text)
+
+    assert text.splitlines()[0] == '["message_id","channel","message"]', "❌ FAILED: Bad header!"
+    assert text.count("message_id") == 1, "❌ FAILED: Keys repeated per row!"
+    assert parse_records(text) == [compact_record(r) for r in records], \
+        "❌ FAILED: Table does not parse back!"
+    with env(PROMPT_FORMAT="table"):
+        assert serialize_record(records[0]) == '[1,"email","Where is my order?"]', \
+            "❌ FAILED: Table rows should carry values only!"
+
+    print("\n✅ TEST PASSED: Table format round-trips!")
+
+
+def test_context_limit_caps_budget():
+    """The batch budget never exceeds the context minus prompt and output reserve."""
+    print("\n" + "=" * 70)
+    print("TEST 4: CONTEXT LIMIT")
+    print("=" * 70)
+
+    with env(CATALOG_BATCH_TOKENS=6000, LLM_CONTEXT_TOKENS=0):
+        assert get_batch_token_budget("CATALOG_BATCH_TOKENS", 3000, 500) == 6000, \
+            "❌ FAILED: Budget should be uncapped without a context limit!"
+    with env(CATALOG_BATCH_TOKENS=6000, LLM_CONTEXT_TOKENS=8000, LLM_OUTPUT_RESERVE_TOKENS=4000):
+        budget = get_batch_token_budget("CATALOG_BATCH_TOKENS", 3000, 500)
+    print(f"  Budget with an 8k context: {budget}")
+    assert budget == 3500, "❌ FAILED: Budget should be capped by the context!"
+
+    print("\n✅ TEST PASSED: Context limit caps batches!")
+
+
+def test_more_rows_per_batch():
+    """On the sample catalog, compact packing fits more rows per batch than str()."""
+    print("\n" + "=" * 70)
+    print("TEST 5: ROWS PER BATCH ON THE SAMPLE CATALOG")
+    print("=" * 70)
+
+    data_dir = backend_dir.parent / "data" / "salla_data"
+    products, _, _ = load_sample_data(product_limit=0, message_limit=1, pricing_limit=1, data_dir=data_dir)
+
+    repr_batches = chunk_by_token_budget(products, max_tokens=1000, count_tokens=count_tokens)
+    repr_tokens = count_tokens(str(products))
+    print(f"  str():  {len(repr_batches):4d} batches, {repr_tokens} tokens")
+
+    for prompt_format in ("jsonl", "table"):
+        packed_batches = chunk_by_token_budget(
+            products, max_tokens=1000, count_tokens=count_tokens,
+            serialize=lambda record: serialize_record(record, prompt_format)
+        )
+        packed_tokens = sum(count_tokens(pack_records(b, prompt_format)) for b in packed_batches)
+        print(f"  {prompt_format}:  {len(packed_batches):4d} batches, {packed_tokens} tokens")
+
+        assert packed_tokens < repr_tokens, f"❌ FAILED: {prompt_format} is not smaller!"
+        assert len(packed_batches) < len(repr_batches), f"❌ FAILED: {prompt_format} needs as many batches!"
+        assert sum(len(b) for b in packed_batches) == len(products), "❌ FAILED: Rows were lost!"
+        for batch in packed_batches:
+            if len(batch) > 1:
+                assert sum(count_tokens(serialize_record(r, prompt_format)) for r in batch) <= 1000, \
+                    "❌ FAILED: Batch exceeds its budget!"
+
+    print("\n✅ TEST PASSED: Compact packing fits more rows per call!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("PROMPT PACKING TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_compact_records()
+        test_long_fields_truncated()
+        test_table_format()
+        test_context_limit_caps_budget()
+        test_more_rows_per_batch()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
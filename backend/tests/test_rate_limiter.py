@@ -0,0 +1,221 @@
+"""
+Test script for the adaptive LLM rate limiter.
+Unit-tests the buckets and AIMD window with a fake clock, then drives the real
+OpenAI client against a local fake server that enforces a quota with 429s.
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from env_helpers import restore_env, set_env
+from fake_openai_server import FakeOpenAIServer
+from llm_config import get_chain, get_llm, reset_llm_registry
+from rate_limiter import AdaptiveRateLimiter, AsyncRateLimitedTransport, RateLimitedTransport, get_rate_limiter
+from agents.support_agent import SUPPORT_PROMPT, SupportAnalysis
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_buckets():
+    """Request and token buckets pace admissions; oversized requests run into debt."""
+    print("=" * 70)
+    print("TEST 1: REQUEST AND TOKEN BUCKETS")
+    print("=" * 70)
+
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(requests_per_minute=600, max_concurrency=100, clock=clock)
+    for _ in range(10):
+        assert limiter.try_acquire() == 0, "❌ FAILED: Burst capacity not available!"
+    wait = limiter.try_acquire()
+    assert abs(wait - 0.1) < 1e-9, f"❌ FAILED: Expected 0.1s wait at 10 req/s, got {wait}!"
+    clock.now += 0.1
+    assert limiter.try_acquire() == 0, "❌ FAILED: Bucket did not refill!"
+
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(tokens_per_minute=6000, max_concurrency=100, clock=clock)
+    assert limiter.try_acquire(tokens=500) == 0, "❌ FAILED: Oversized request not admitted on a full bucket!"
+    wait = limiter.try_acquire(tokens=50)
+    assert abs(wait - 4.5) < 1e-9, f"❌ FAILED: Token debt not repaid before next request (wait {wait})!"
+
+    print("\n✅ TEST PASSED: Buckets pace requests and tokens!")
+
+
+def test_aimd_window():
+    """429s halve the window and honour retry-after; successes grow it back."""
+    print("=" * 70)
+    print("TEST 2: AIMD CONCURRENCY WINDOW")
+    print("=" * 70)
+
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(max_concurrency=8, clock=clock)
+    for _ in range(8):
+        assert limiter.try_acquire() == 0, "❌ FAILED: Window should admit 8 requests!"
+    assert limiter.try_acquire() > 0, "❌ FAILED: Window admitted a 9th request!"
+
+    limiter.on_rate_limited(retry_after=2.0)
+    assert limiter.concurrency == 4, "❌ FAILED: Window not halved on 429!"
+    for _ in range(7):
+        limiter.on_success()
+    clock.now += 1.0
+    assert abs(limiter.try_acquire() - 1.0) < 1e-9, "❌ FAILED: retry-after not honoured!"
+    clock.now += 1.0
+    assert limiter.try_acquire() == 0, "❌ FAILED: Admission did not resume after retry-after!"
+
+    grown = limiter.concurrency
+    assert 4 < grown < 8, f"❌ FAILED: Window should grow additively (got {grown})!"
+    for _ in range(100):
+        limiter.on_success()
+        limiter.in_flight += 1
+    assert limiter.concurrency == 8, "❌ FAILED: Window exceeded or never reached the ceiling!"
+
+    print(f"✓ Window after 429 and 7 successes: {grown:.2f}")
+    print("\n✅ TEST PASSED: AIMD window adapts!")
+
+
+def run_fan_out(server, requests, **env):
+    """Send concurrent support calls through the real OpenAI client; return the limiter."""
+    previous = set_env(
+        LLM_PROVIDER="openai", OPENAI_API_KEY="test-key", OPENAI_BASE_URL=server.base_url,
+        LLM_MAX_CONCURRENCY="8", LLM_RETRY_BASE_SECONDS="0.05", **env
+    )
+    try:
+        reset_llm_registry()
+        limiter = get_rate_limiter()
+        chain = get_chain(SUPPORT_PROMPT, get_llm(temperature=0), SupportAnalysis)
+        payload = {"messages": str([{"message_id": 1, "message": "Where is my order?"}])}
+
+        async def fan_out():
+            return await asyncio.gather(*(chain.ainvoke(payload) for _ in range(requests)))
+
+        results = asyncio.run(fan_out())
+        assert all("message_classifications" in r for r in results), "❌ FAILED: A call failed!"
+        return limiter
+    finally:
+        restore_env(previous)
+        reset_llm_registry()
+
+
+def test_fake_server_quota():
+    """Calls adapt to a server quota without failing, and proactive limits avoid 429s."""
+    print("=" * 70)
+    print("TEST 3: FAKE SERVER QUOTA")
+    print("=" * 70)
+
+    with FakeOpenAIServer(latency_ms=20, requests_per_second=10) as server:
+        limiter = run_fan_out(server, 30, LLM_RATE_LIMIT_RETRIES="20")
+        assert server.requests == 30, "❌ FAILED: Not every call completed!"
+        assert server.rate_limited > 0, "❌ FAILED: Server quota was never hit!"
+        assert limiter.stats["rate_limited"] == server.rate_limited, "❌ FAILED: Limiter missed 429s!"
+        print(f"✓ Reactive: 30 calls, {server.rate_limited} 429s retried, window {limiter.concurrency:.1f}")
+
+    with FakeOpenAIServer(latency_ms=20, requests_per_second=10) as server:
+        limiter = run_fan_out(server, 20, LLM_REQUESTS_PER_MINUTE="540", LLM_RATE_BURST_SECONDS="0.1")
+        assert server.requests == 20, "❌ FAILED: Not every call completed!"
+        assert server.rate_limited == 0, f"❌ FAILED: {server.rate_limited} 429s despite the request quota!"
+        print(f"✓ Proactive: 20 calls at 9 req/s, no 429s")
+
+    print("\n✅ TEST PASSED: Runs survive the quota!")
+
+
+def test_single_retry_layer():
+    """Only the transport retries: the SDK does not multiply attempts, and 5xx/connection errors are retried."""
+    print("=" * 70)
+    print("TEST 4: SINGLE RETRY LAYER")
+    print("=" * 70)
+
+    with FakeOpenAIServer(requests_per_second=1) as server:
+        previous = set_env(
+            LLM_PROVIDER="openai", OPENAI_API_KEY="test-key", OPENAI_BASE_URL=server.base_url,
+            LLM_RATE_LIMIT_RETRIES="0"
+        )
+        try:
+            reset_llm_registry()
+            llm = get_llm(temperature=0)
+            assert llm.max_retries == 0, "❌ FAILED: Pooled client keeps SDK retries!"
+            chain = get_chain(SUPPORT_PROMPT, llm, SupportAnalysis)
+            payload = {"messages": str([{"message_id": 1, "message": "Where is my order?"}])}
+            chain.invoke(payload)
+            try:
+                chain.invoke(payload)
+                surfaced = False
+            except Exception:
+                surfaced = True
+        finally:
+            restore_env(previous)
+            reset_llm_registry()
+        assert surfaced, "❌ FAILED: Exhausted 429 was retried by the SDK!"
+        assert (server.requests, server.rate_limited) == (1, 1), \
+            f"❌ FAILED: {server.requests + server.rate_limited} attempts instead of 2!"
+        print("✓ Exhausted 429 surfaced after one attempt")
+
+    replies = [httpx.ConnectError("reset"), 503, 200]
+
+    def flaky(request):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return httpx.Response(reply, json={})
+
+    limiter = AdaptiveRateLimiter(max_retries=2, retry_base_seconds=0.01)
+    with httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(flaky), limiter)) as client:
+        response = client.get("http://llm.test/v1/models")
+    assert response.status_code == 200 and not replies, "❌ FAILED: Transient errors not retried!"
+    assert limiter.stats["retries"] == 2 and limiter.in_flight == 0, "❌ FAILED: Wrong retry accounting!"
+    print("✓ Connection error and 503 retried by the transport")
+
+    def failing(request):
+        return httpx.Response(503, json={})
+
+    limiter = AdaptiveRateLimiter(max_concurrency=8, max_retries=1, retry_base_seconds=0.01)
+    limiter.concurrency = 4.0
+    with httpx.Client(transport=RateLimitedTransport(httpx.MockTransport(failing), limiter)) as client:
+        response = client.get("http://llm.test/v1/models")
+
+    async def fail_async():
+        transport = AsyncRateLimitedTransport(httpx.MockTransport(failing), limiter)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("http://llm.test/v1/models")
+
+    async_response = asyncio.run(fail_async())
+    assert response.status_code == async_response.status_code == 503, "❌ FAILED: Last 503 not surfaced!"
+    assert limiter.concurrency == 4.0 and limiter.in_flight == 0, \
+        f"❌ FAILED: Failed requests grew the window to {limiter.concurrency:.2f}!"
+    print("✓ A 503 on every attempt is surfaced without growing the window")
+
+    print("\n✅ TEST PASSED: One retry layer!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("RATE LIMITER TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_buckets()
+        test_aimd_window()
+        test_fake_server_quota()
+        test_single_retry_layer()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
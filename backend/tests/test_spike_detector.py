@@ -0,0 +1,164 @@
+"""
+Test script for the streaming complaint-spike detector.
+Checks that a burst on one channel/topic stands out against the baseline
+while normal noise does not, that the Support Agent's spike flag and velocity
+come from the detector rather than the LLM, and that the detector keeps up
+with millions of events per minute.
+"""
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+os.environ.update({
+    "LLM_PROVIDER": "fake",
+    "FAKE_LLM_LATENCY_MS": "0",
+    "LLM_CACHE_ENABLED": "false"
+})
+
+from agents.spike_detector import ComplaintSpikeDetector, message_topic
+from agents.support_agent import support_agent
+
+CHANNELS = ["email", "chat", "in-app"]
+TOPICS = ["other", "quality", "refund", "delivery"]
+
+COMPLAINT = "My order is delayed again, terrible delivery!"
+CALM = "Do you have this in blue?"
+
+
+def simulate(seed: int, burst_from=None, minutes: int = 240) -> ComplaintSpikeDetector:
+    """About 20 messages a minute, 10% complaints; optionally 6 extra delivery complaints a minute on email."""
+    rng = random.Random(seed)
+    detector = ComplaintSpikeDetector()
+    for minute in range(minutes):
+        count = rng.randint(10, 30)
+        for i in range(count):
+            burst = burst_from is not None and minute >= burst_from and i < 6
+            detector.observe(
+                minute * 60 + i * 60 / count,
+                burst or rng.random() < 0.1,
+                "email" if burst else rng.choice(CHANNELS),
+                "delivery" if burst else rng.choice(TOPICS)
+            )
+    return detector
+
+
+def test_burst_stands_out():
+    """A complaint burst flags its channel and topic; normal noise flags nothing."""
+    print("=" * 70)
+    print("TEST 1: BURST VS BASELINE")
+    print("=" * 70)
+
+    false_alarms = sum(bool(simulate(seed).current_spikes()) for seed in range(10))
+    print(f"  Calm streams with a spike: {false_alarms}/10")
+    assert false_alarms == 0, "❌ FAILED: Normal noise flagged as a spike!"
+
+    detector = simulate(0, burst_from=230)
+    spikes = {spike["series"]: spike for spike in detector.current_spikes()}
+    for spike in spikes.values():
+        print(f"  {spike}")
+    assert {"channel:email", "topic:delivery"} <= set(spikes), "❌ FAILED: Burst not flagged!"
+    assert not any(series.startswith("channel:chat") for series in spikes), "❌ FAILED: Calm channel flagged!"
+    assert detector.velocity() > simulate(0).velocity(), "❌ FAILED: Velocity did not rise!"
+
+    print("\n✅ TEST PASSED: Bursts stand out against the baseline!")
+
+
+def test_support_agent_uses_detector():
+    """The spike flag and velocity follow the message timeline deterministically."""
+    print("\n" + "=" * 70)
+    print("TEST 2: SUPPORT AGENT SPIKE FLAG")
+    print("=" * 70)
+
+    start = 1_700_000_000
+    # Two hours of one message a minute, every tenth a complaint
+    calm = [{"message_id": i, "channel": "email", "timestamp": start + 60 * i,
+             "message": COMPLAINT if i % 10 == 0 else CALM} for i in range(120)]
+    # Then ten minutes with three delivery complaints a minute
+    burst = [{"message_id": 1000 + i, "channel": "chat", "timestamp": start + 60 * (120 + i // 3),
+              "message": f"{COMPLAINT} #{i}"} for i in range(30)]
+
+    quiet = support_agent({"customer_messages": calm})
+    loud = support_agent({"customer_messages": calm + burst})
+    again = support_agent({"customer_messages": list(reversed(calm + burst))})
+
+    print(f"  calm: spike={quiet['complaint_spike_detected']}, velocity={quiet['complaint_velocity']}")
+    print(f"  burst: spike={loud['complaint_spike_detected']}, velocity={loud['complaint_velocity']}, "
+          f"series={[s['series'] for s in loud['support_summary']['spikes']]}")
+    assert not quiet["complaint_spike_detected"], "❌ FAILED: Calm timeline flagged!"
+    assert loud["complaint_spike_detected"], "❌ FAILED: Burst missed!"
+    assert loud["complaint_velocity"] > quiet["complaint_velocity"], "❌ FAILED: Velocity did not rise!"
+    assert again["complaint_spike_detected"] and again["complaint_velocity"] == loud["complaint_velocity"], \
+        "❌ FAILED: Result depends on message order!"
+    assert message_topic(COMPLAINT) == "delivery", "❌ FAILED: Topic not recognized!"
+
+    print("\n✅ TEST PASSED: The spike flag comes from the detector!")
+
+
+def test_throughput():
+    """The detector handles well over a million events per minute."""
+    print("\n" + "=" * 70)
+    print("TEST 3: THROUGHPUT")
+    print("=" * 70)
+
+    rng = random.Random(1)
+    events = [(i * 0.01, rng.random() < 0.1, CHANNELS[i % 3], TOPICS[i % 4]) for i in range(300_000)]
+    detector = ComplaintSpikeDetector()
+    start = time.perf_counter()
+    for event in events:
+        detector.observe(*event)
+    per_minute = len(events) / (time.perf_counter() - start) * 60
+
+    print(f"  {per_minute / 1e6:.1f}M events per minute")
+    assert per_minute > 2_000_000, "❌ FAILED: Detector too slow!"
+
+    print("\n✅ TEST PASSED: Millions of events per minute!")
+
+
+def test_explicit_zero_settings():
+    """An explicit 0 is used as given instead of falling back to the environment default."""
+    print("\n" + "=" * 70)
+    print("TEST 4: EXPLICIT ZERO SETTINGS")
+    print("=" * 70)
+
+    detector = ComplaintSpikeDetector(z_threshold=0.0, ratio_threshold=0.0, min_complaints=0)
+    assert detector.z_threshold == 0.0, "❌ FAILED: z_threshold=0 replaced by the default!"
+    assert detector.ratio_threshold == 0.0, "❌ FAILED: ratio_threshold=0 replaced by the default!"
+    for setting in ({"bucket_seconds": 0.0}, {"alpha": 0.0}):
+        try:
+            ComplaintSpikeDetector(**setting)
+        except ValueError as e:
+            print(f"  {setting}: {e}")
+        else:
+            raise AssertionError(f"❌ FAILED: {setting} silently accepted!")
+
+    print("\n✅ TEST PASSED: Explicit zeros are honoured or rejected!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("SPIKE DETECTOR TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_burst_stands_out()
+        test_support_agent_uses_detector()
+        test_throughput()
+        test_explicit_zero_settings()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()
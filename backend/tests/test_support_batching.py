@@ -0,0 +1,226 @@
+"""
+Test script for concurrent batched message classification in the Support Agent.
+Uses a stubbed LLM so it runs offline without API keys.
+"""
+import asyncio
+import importlib
+import json
+import os
+import re
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+# Add parent directory to path to import backend modules
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Stubbed LLM responses must not be written to the persistent response cache
+os.environ["LLM_CACHE_ENABLED"] = "false"
+
+from env_helpers import env
+from langchain_core.runnables import RunnableLambda
+
+# agents/__init__.py re-exports the function under the module's name
+support_module = importlib.import_module("agents.support_agent")
+
+
+class StubSupportLLM:
+    """Classifies even message IDs as complaints and reports batch sentiment."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, prompt_value):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            text = prompt_value.to_messages()[-1].content
+            ids = [int(i) for i in re.findall(r'"message_id":(\d+)', text)]
+            if self.fail_on in ids:
+                raise RuntimeError(f"stub failure on {self.fail_on}")
+            complaints = [i for i in ids if i % 2 == 0]
+            return json.dumps({
+                "message_classifications": [
+                    {"id": str(i), "type": "Complaint" if i % 2 == 0 else "Inquiry",
+                     "sentiment": "negative" if i % 2 == 0 else "neutral"}
+                    for i in ids
+                ],
+                "overall_sentiment": -len(complaints) / len(ids),
+                "complaint_velocity": 10 * len(complaints) / len(ids),
+                "trending_topics": ["shipping"],
+                "spike_detected": False
+            })
+        finally:
+            self.in_flight -= 1
+
+
+@contextmanager
+def stub_llm(stub):
+    original = support_module.get_llm
+    support_module.get_llm = lambda **kwargs: RunnableLambda(lambda x: None, afunc=stub)
+    try:
+        yield
+    finally:
+        support_module.get_llm = original
+
+
+def make_messages(ids):
+    return [{"message_id": i, "channel": "email", "message": f"message {i}"} for i in ids]
+
+
+def test_all_messages_classified():
+    """Every message is classified and ordering follows the input."""
+    print("=" * 70)
+    print("TEST 1: FULL MESSAGE SET CLASSIFICATION")
+    print("=" * 70)
+
+    # 3 complaints out of 100 messages: ids 0, 2, 4 are even, the rest are odd
+    ids = [0, 2, 4] + [2 * i + 1 for i in range(97)]
+    messages = make_messages(ids)
+    stub = StubSupportLLM()
+
+    with env(SUPPORT_BATCH_MAX_ITEMS="10", LLM_MAX_CONCURRENCY="4"), stub_llm(stub):
+        result = support_module.support_agent({"customer_messages": messages})
+
+    summary = result["support_summary"]
+    classified_ids = [int(c["id"]) for c in summary["classifications"]]
+    assert classified_ids == ids, "❌ FAILED: Classifications not merged in input order!"
+    assert stub.calls == 10, f"❌ FAILED: Expected 10 batches, got {stub.calls}"
+    assert stub.max_in_flight <= 4, "❌ FAILED: Concurrency limit exceeded!"
+    assert summary["complaint_count"] == 3, "❌ FAILED: Complaint count not computed over all messages!"
+    assert abs(result["sentiment_score"] - (-0.03)) < 1e-9, "❌ FAILED: Sentiment not weighted over all messages!"
+    assert not result["complaint_spike_detected"], "❌ FAILED: No spike expected!"
+
+    print(f"✓ {len(classified_ids)} messages classified in {stub.calls} batches")
+    print("\n✅ TEST PASSED: Full message set classified concurrently!")
+
+
+def test_spike_uses_whole_set():
+    """The complaint ratio that drives spike detection covers every message."""
+    print("=" * 70)
+    print("TEST 2: SPIKE DETECTION OVER ALL MESSAGES")
+    print("=" * 70)
+
+    # The first 20 messages are calm; complaints dominate the rest
+    ids = [2 * i + 1 for i in range(20)] + [2 * i for i in range(60)]
+    stub = StubSupportLLM()
+
+    with env(SUPPORT_BATCH_MAX_ITEMS="20"), stub_llm(stub):
+        result = support_module.support_agent({"customer_messages": make_messages(ids)})
+
+    assert result["support_summary"]["complaint_ratio"] == 0.75, "❌ FAILED: Wrong complaint ratio!"
+    assert result["complaint_spike_detected"], "❌ FAILED: Spike beyond first 20 messages missed!"
+
+    print("\n✅ TEST PASSED: Spike detected from the whole message set!")
+
+
+def test_partial_failure_keeps_other_batches():
+    """A failing batch does not discard the batches that succeeded."""
+    print("=" * 70)
+    print("TEST 3: PARTIAL BATCH FAILURE")
+    print("=" * 70)
+
+    ids = [2 * i + 1 for i in range(30)]
+    stub = StubSupportLLM(fail_on=ids[15])
+
+    with env(SUPPORT_BATCH_MAX_ITEMS="10"), stub_llm(stub):
+        result = support_module.support_agent({"customer_messages": make_messages(ids)})
+
+    summary = result["support_summary"]
+    assert summary["failed_batches"] == 1, "❌ FAILED: Failure not recorded!"
+    assert summary["analyzed_messages"] == 20, "❌ FAILED: Successful batches were lost!"
+
+    print("\n✅ TEST PASSED: Partial failures degrade gracefully!")
+
+
+def test_async_entry_point():
+    """asupport_agent can run on an existing event loop."""
+    print("=" * 70)
+    print("TEST 4: ASYNC ENTRY POINT")
+    print("=" * 70)
+
+    stub = StubSupportLLM()
+    with stub_llm(stub):
+        result = asyncio.run(support_module.asupport_agent({"customer_messages": make_messages([1, 2])}))
+
+    assert len(result["support_summary"]["classifications"]) == 2, "❌ FAILED: Async path broken!"
+
+    print("\n✅ TEST PASSED: Async entry point works!")
+
+
+def test_order_with_preclassified_messages():
+    """LLM classifications interleave with locally labelled messages in input order."""
+    print("=" * 70)
+    print("TEST 5: INPUT ORDER AROUND PRE-CLASSIFIED MESSAGES")
+    print("=" * 70)
+
+    # Even positions are obvious complaints, odd positions go to the LLM in one batch
+    messages = make_messages(range(12))
+    for message in messages[::2]:
+        message["message"] = "Refund me. The blender stopped working after 3 uses."
+    stub = StubSupportLLM()
+
+    with env(SUPPORT_PRECLASSIFIER_ENABLED="true"), stub_llm(stub):
+        result = support_module.support_agent({"customer_messages": messages})
+
+    summary = result["support_summary"]
+    classified_ids = [int(c["id"]) for c in summary["classifications"]]
+    assert summary["preclassified_messages"] == 6, "❌ FAILED: Obvious messages not labelled locally!"
+    assert stub.calls == 1, f"❌ FAILED: Expected 1 batch, got {stub.calls}"
+    assert classified_ids == list(range(12)), f"❌ FAILED: Classifications out of input order: {classified_ids}"
+
+    print("\n✅ TEST PASSED: Mixed local and LLM classifications keep input order!")
+
+
+def test_all_batches_failed():
+    """When every batch fails the result has the same keys as a successful run."""
+    print("=" * 70)
+    print("TEST 6: ALL BATCHES FAILED")
+    print("=" * 70)
+
+    products = [{"product_id": 1, "name": "Blender"}]
+    stub = StubSupportLLM(fail_on=1)
+
+    with env(SUPPORT_PRECLASSIFIER_ENABLED="false"), stub_llm(stub):
+        failed = support_module.support_agent({"customer_messages": make_messages([1]), "product_data": products})
+    with env(SUPPORT_PRECLASSIFIER_ENABLED="false"), stub_llm(StubSupportLLM()):
+        passed = support_module.support_agent({"customer_messages": make_messages([1]), "product_data": products})
+
+    assert failed["support_summary"]["error_type"] == "RuntimeError", "❌ FAILED: Error not reported!"
+    assert set(failed) == set(passed), f"❌ FAILED: Keys differ: {set(failed) ^ set(passed)}"
+    assert failed["product_sentiment"] == {}, "❌ FAILED: Product sentiment missing!"
+    assert failed["support_summary"]["spikes"] == [], "❌ FAILED: Spike fields missing!"
+
+    print("\n✅ TEST PASSED: Failed runs return the full set of keys!")
+
+
+def main():
+    print("\n" + "=" * 70)
+    print("SUPPORT BATCHING TEST SUITE")
+    print("=" * 70)
+
+    try:
+        test_all_messages_classified()
+        test_spike_uses_whole_set()
+        test_partial_failure_keeps_other_batches()
+        test_async_entry_point()
+        test_order_with_preclassified_messages()
+        test_all_batches_failed()
+
+        print("\n" + "=" * 70)
+        print("🎉 ALL TESTS PASSED!")
+        print("=" * 70)
+
+    except AssertionError as e:
+        print(f"\n{e}")
+        return False
+
+
+if __name__ == "__main__":
+    main()